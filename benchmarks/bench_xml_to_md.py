@@ -0,0 +1,105 @@
+"""
+Benchmark for the XML-to-Markdown conversion.
+
+Compares the previous string-concatenation converter (xml_to_md_legacy.py)
+with the current prepare_data/xml_to_md.py on the xml.etree and, if
+installed, the lxml backend. Every Markdown output is checked to be
+identical to the legacy output, and so are the metadata keys the legacy
+converter produces (newer keys such as randnummern or zitate are not
+compared).
+
+Usage:
+    python benchmarks/bench_xml_to_md.py prepare_data/data/extracted --largest 50
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'prepare_data'))
+
+import xml_to_md
+import xml_to_md_legacy
+
+def find_xml_files(paths, largest):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                files.extend(os.path.join(dirpath, f) for f in filenames if f.lower().endswith('.xml'))
+        else:
+            files.append(path)
+    # Long decisions are where the converters differ most
+    files.sort(key=os.path.getsize, reverse=True)
+    return files[:largest] if largest else files
+
+def get_implementations():
+    implementations = {
+        'legacy': xml_to_md_legacy.convert_xml_to_md_text,
+        'etree': lambda path: xml_to_md.convert_xml_to_md_text(path, backend='etree'),
+    }
+    if xml_to_md.lxml_etree is not None:
+        implementations['lxml'] = lambda path: xml_to_md.convert_xml_to_md_text(path, backend='lxml')
+    else:
+        print("lxml not installed, skipping the lxml backend.")
+    return implementations
+
+def comparable(output, legacy_keys):
+    markdown, metadata = output
+    return markdown, {key: metadata.get(key) for key in legacy_keys}
+
+def run(files, repeat):
+    implementations = get_implementations()
+    total_bytes = sum(os.path.getsize(f) for f in files)
+    results = {}
+    mismatches = []
+
+    expected = {f: xml_to_md_legacy.convert_xml_to_md_text(f) for f in files}
+
+    for name, convert in implementations.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for f in files:
+                output = convert(f)
+                legacy_markdown, legacy_metadata = expected[f]
+                if comparable(output, legacy_metadata) != (legacy_markdown, legacy_metadata):
+                    mismatches.append((name, f))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {
+            'seconds': best,
+            'files_per_second': len(files) / best,
+            'mb_per_second': total_bytes / best / (1024 * 1024),
+        }
+    return results, total_bytes, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the XML-to-Markdown converters.")
+    parser.add_argument('paths', nargs='+', help="XML files or directories containing XML files")
+    parser.add_argument('--largest', type=int, default=50, help="only use the N largest files (0 = all)")
+    parser.add_argument('--repeat', type=int, default=3, help="repetitions, the best run counts")
+    args = parser.parse_args()
+
+    files = find_xml_files(args.paths, args.largest)
+    if not files:
+        print("No XML files found.")
+        sys.exit(1)
+
+    results, total_bytes, mismatches = run(files, args.repeat)
+
+    print(f"{len(files)} files, {total_bytes / (1024 * 1024):.1f} MB, best of {args.repeat}:")
+    baseline = results['legacy']['seconds']
+    for name, r in results.items():
+        print(f"  {name:<8} {r['seconds']:8.3f}s  {r['files_per_second']:8.1f} files/s  "
+              f"{r['mb_per_second']:6.2f} MB/s  x{baseline / r['seconds']:.2f}")
+
+    if mismatches:
+        print(f"\n{len(mismatches)} outputs differ from the legacy converter:")
+        for name, f in mismatches[:10]:
+            print(f"  {name}: {f}")
+        sys.exit(1)
+    print("All outputs identical to the legacy converter.")
+
+if __name__ == "__main__":
+    main()
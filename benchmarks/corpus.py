@@ -0,0 +1,170 @@
+"""
+Generator for a synthetic corpus of court decisions in the XML format of
+rechtsprechung-im-internet.de.
+
+The decisions are random but reproducible for a given seed and resemble
+the real ones closely enough for benchmarking: metadata (doknr, gertyp,
+norm, ...), Randnummern as nested <dl> lists, tables, enumerations and
+long Gründe, with a long tail of very large decisions.
+
+Usage:
+    python benchmarks/corpus.py /tmp/corpus --count 1000 --seed 42
+"""
+import os
+import random
+import argparse
+from xml.sax.saxutils import escape
+
+COURTS = [
+    ('BGH', ['1. Zivilsenat', '6. Zivilsenat', '9. Zivilsenat', '3. Strafsenat', 'Kartellsenat']),
+    ('BVerwG', ['1. Senat', '3. Senat', '8. Senat']),
+    ('BFH', ['I. Senat', 'IV. Senat', 'X. Senat']),
+    ('BAG', ['2. Senat', '5. Senat', '9. Senat']),
+    ('BSG', ['1. Senat', '12. Senat', 'B 14 AS']),
+    ('BVerfG', ['1. Senat', '2. Senat', '1. Kammer des Ersten Senats']),
+    ('BPatG', ['10. Senat', '35. Senat']),
+]
+REGISTERS = ['ZR', 'ZB', 'StR', 'C', 'R', 'AZR', 'KR', 'BvR', 'W (pat)']
+LAWS = ['BGB', 'ZPO', 'StGB', 'StPO', 'InsO', 'HGB', 'GG', 'VwGO', 'AO', 'EStG', 'SGB II', 'KSchG', 'UWG', 'PatG']
+WORDS = """
+Anspruch Beklagte Kläger Klägerin Schuldner Gläubiger Vertrag Kündigung Wohnung Mietvertrag
+Insolvenzverfahren Insolvenzverwalter Schadensersatz Verletzung Pflicht Berufung Revision
+Beschwerde Rechtsbeschwerde Urteil Beschluss Vorschrift Auslegung Gesetzgeber Gericht Senat
+Landgericht Oberlandesgericht Amtsgericht Verfahren Entscheidung Sachverhalt Tatsachen
+Feststellungen Beweisaufnahme Zeuge Sachverständige Gutachten Frist Zustellung Antrag
+Zulassung Rechtsmittel Verwaltungsakt Behörde Bescheid Steuer Einkommen Arbeitnehmer
+Arbeitgeber Arbeitsverhältnis Sozialleistung Grundrecht Verfassungsbeschwerde Patent
+Erfindung Wettbewerb Unterlassung Eigentum Besitz Kaufpreis Mangel Gewährleistung Rücktritt
+Minderung Verjährung Hemmung Zinsen Kosten Streitwert Vollstreckung Pfändung Haftung
+Verschulden Fahrlässigkeit Vorsatz Rechtsfolge Tatbestand Voraussetzung Ausnahme Maßstab
+""".split()
+FILLER = """
+der die das und ist nicht nach mit auf für von zu den dem des ein eine einer im in als
+auch sich hat wird wurde kann muss dass daher jedoch insoweit ferner zudem allerdings
+""".split()
+
+def sentence(rng, min_words=8, max_words=30):
+    words = [rng.choice(WORDS) if rng.random() < 0.45 else rng.choice(FILLER)
+             for _ in range(rng.randint(min_words, max_words))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+def norm_ref(rng):
+    paragraph = f"§ {rng.randint(1, 1000)}"
+    if rng.random() < 0.5:
+        paragraph += f" Abs {rng.randint(1, 5)}"
+    if rng.random() < 0.3:
+        paragraph += f" S {rng.randint(1, 3)}"
+    return f"{paragraph} {rng.choice(LAWS)}"
+
+def paragraph(rng, sentences):
+    text = escape(" ".join(sentence(rng) for _ in range(sentences)))
+    if rng.random() < 0.3:
+        text += f" Vgl. {norm_ref(rng)}."
+    # Inline markup as found in the real documents
+    if rng.random() < 0.2:
+        text = f"<i>{rng.choice(WORDS)}</i> " + text
+    return f"<p>{text}</p>"
+
+def table(rng):
+    columns = rng.randint(2, 5)
+    rows = ["<tr>" + "".join(f"<th>{rng.choice(WORDS)}</th>" for _ in range(columns)) + "</tr>"]
+    for _ in range(rng.randint(2, 12)):
+        rows.append("<tr>" + "".join(f"<td>{rng.randint(1, 99999)},{rng.randint(0, 99):02d} €</td>"
+                                     for _ in range(columns)) + "</tr>")
+    return "<table>" + "".join(rows) + "</table>"
+
+def enumeration(rng):
+    items = "".join(f"<li><p>{escape(sentence(rng, 5, 15))}</p></li>" for _ in range(rng.randint(2, 6)))
+    return f"<ol>{items}</ol>"
+
+def randnummern(rng, start, count, depth=0):
+    """A <dl class="RandNummer"> block with count Randnummern, optionally with nested lists."""
+    items = []
+    for rn in range(start, start + count):
+        content = [paragraph(rng, rng.randint(2, 8))]
+        roll = rng.random()
+        if roll < 0.05:
+            content.append(table(rng))
+        elif roll < 0.12:
+            content.append(enumeration(rng))
+        elif roll < 0.16 and depth < 2:
+            # Nested Randnummern-like list, e.g. quoted passages
+            content.append(randnummern(rng, 1, rng.randint(1, 3), depth + 1))
+        items.append(f'<dt><a name="rd_{rn}">{rn}</a></dt><dd>{"".join(content)}</dd>')
+    return '<dl class="RandNummer">' + "".join(items) + "</dl>"
+
+def decision_size(rng):
+    # Most decisions are short, a few run to hundreds of Randnummern
+    return min(600, max(3, int(rng.lognormvariate(3.0, 0.9))))
+
+def generate_decision(rng, number):
+    """Return (doknr, XML string) of one synthetic decision."""
+    gertyp, senates = rng.choice(COURTS)
+    year = rng.randint(2000, 2025)
+    doknr = f"KORE{number:06d}{year}"
+    az = f"{rng.choice(['I', 'II', 'III', 'IV', 'V', 'VI', 'VIII', 'IX', 'X', 'XII'])} " \
+         f"{rng.choice(REGISTERS)} {rng.randint(1, 400)}/{year % 100:02d}"
+    datum = f"{year}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+    norms = ", ".join(norm_ref(rng) for _ in range(rng.randint(1, 5)))
+    count = decision_size(rng)
+
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<dokument>',
+        f'<doknr>{doknr}</doknr>',
+        f'<ecli>ECLI:DE:{gertyp}:{year}:{datum[4:]}{number}.{escape(az.replace(" ", "").replace("/", "."))}.0</ecli>',
+        f'<gertyp>{gertyp}</gertyp>',
+        '<gerort></gerort>',
+        f'<spruchkoerper>{rng.choice(senates)}</spruchkoerper>',
+        f'<entsch-datum>{datum}</entsch-datum>',
+        f'<aktenzeichen>{escape(az)}</aktenzeichen>',
+        f'<doktyp>{rng.choice(["Urteil", "Beschluss"])}</doktyp>',
+        f'<norm>{escape(norms)}</norm>',
+        f'<vorinstanz><p>vorgehend LG {rng.choice(["Berlin", "Köln", "München I", "Aachen"])}, '
+        f'{datum[:4]}, Az: {rng.randint(1, 40)} O {rng.randint(1, 900)}/{year % 100:02d}</p></vorinstanz>',
+        f'<titelzeile><p>{escape(sentence(rng, 6, 14))}</p></titelzeile>',
+    ]
+    if rng.random() < 0.4:
+        parts.append(f'<leitsatz>{"".join(paragraph(rng, rng.randint(1, 3)) for _ in range(rng.randint(1, 3)))}</leitsatz>')
+    parts.append(f'<tenor>{"".join(paragraph(rng, 2) for _ in range(rng.randint(1, 3)))}</tenor>')
+    if rng.random() < 0.5:
+        # Urteil: Tatbestand and Entscheidungsgründe
+        split = max(1, count // 3)
+        parts.append(f'<tatbestand>{randnummern(rng, 1, split)}</tatbestand>')
+        parts.append(f'<entscheidungsgruende>{randnummern(rng, split + 1, count - split)}</entscheidungsgruende>')
+    else:
+        parts.append(f'<gruende>{randnummern(rng, 1, count)}</gruende>')
+    parts.append('</dokument>')
+    return doknr, "\n".join(parts)
+
+def write_corpus(out_dir, count, seed=42):
+    """
+    Write count decisions to out_dir, one folder per decision like
+    data/extracted/ (FOLDER/FILE.xml). Returns the list of XML paths.
+    """
+    rng = random.Random(seed)
+    paths = []
+    for number in range(count):
+        doknr, xml = generate_decision(rng, number)
+        folder = os.path.join(out_dir, doknr)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{doknr}.xml")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(xml)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus of court decisions.")
+    parser.add_argument('out_dir', help="target directory")
+    parser.add_argument('--count', type=int, default=1000, help="number of decisions")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
+    paths = write_corpus(args.out_dir, args.count, args.seed)
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    print(f"Wrote {len(paths)} decisions ({total_bytes / (1024 * 1024):.1f} MB) to {args.out_dir}.")
+
+if __name__ == "__main__":
+    main()
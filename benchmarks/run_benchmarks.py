@@ -0,0 +1,209 @@
+"""
+Reproducible benchmark suite for the whole pipeline on a synthetic corpus
+(see corpus.py):
+
+  xml_to_md        prepare_data/xml_to_md.convert_xml_to_md_text
+  parse_case_file  mcp/src/parser.parse_case_file on the converted Markdown
+  ingest_full      ingest.generate_actions with an empty manifest
+  ingest_delta     ingest.generate_actions with an up-to-date manifest
+  tool_*           latency of the search_decisions / get_decision_by_doknr
+                   tools against the embedded SQLite backend as a local
+                   stand-in for OpenSearch (search cache disabled)
+
+Results are written as JSON, so runs can be compared across releases.
+
+Usage:
+    python benchmarks/run_benchmarks.py --count 500 --output results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'prepare_data'))
+sys.path.insert(0, os.path.join(ROOT, 'mcp', 'src'))
+
+import corpus
+
+def throughput(seconds, items, total_bytes):
+    return {
+        'seconds': seconds,
+        'items': items,
+        'items_per_second': items / seconds,
+        'mb_per_second': total_bytes / seconds / (1024 * 1024),
+    }
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    return {
+        'calls': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        'max_ms': samples[-1] * 1000,
+    }
+
+def bench_xml_to_md(xml_paths, markdown_dir, repeat):
+    import xml_to_md
+
+    total_bytes = sum(os.path.getsize(p) for p in xml_paths)
+    seconds = best_of(repeat, lambda: [xml_to_md.convert_xml_to_md_text(p) for p in xml_paths])
+
+    # Write the output like convert_all_to_md.py for the following benchmarks
+    for path in xml_paths:
+        markdown_content, metadata = xml_to_md.convert_xml_to_md_text(path)
+        folder = os.path.join(markdown_dir, os.path.basename(os.path.dirname(path)))
+        os.makedirs(folder, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        with open(os.path.join(folder, stem + '.md'), 'w', encoding='utf-8') as f:
+            f.write(markdown_content)
+        with open(os.path.join(folder, stem + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+    return throughput(seconds, len(xml_paths), total_bytes)
+
+def bench_parse_case_file(md_paths, repeat):
+    from parser import parse_case_file
+
+    total_bytes = sum(os.path.getsize(p) for p in md_paths)
+    seconds = best_of(repeat, lambda: [parse_case_file(p) for p in md_paths])
+    return throughput(seconds, len(md_paths), total_bytes)
+
+def bench_generate_actions(repeat):
+    import ingest
+
+    def run(manifest):
+        stats = {'changed': 0, 'unchanged': 0, 'removed': 0, 'bytes': 0}
+        for (op, rel_path, entry), _ in ingest.generate_actions(manifest, stats, 'bench'):
+            if op == 'index':
+                manifest[rel_path] = entry
+        return stats
+
+    full_manifest = {}
+    stats = run(full_manifest)
+    full = best_of(repeat, lambda: run({}))
+    delta = best_of(repeat, lambda: run(dict(full_manifest)))
+    return {
+        'ingest_full': throughput(full, stats['changed'], stats['bytes']),
+        'ingest_delta': throughput(delta, len(full_manifest), 0),
+    }
+
+def bench_tools(doknrs, calls, seed):
+    import ingest
+    import server
+
+    ingest.build_sqlite(os.environ['SQLITE_PATH'])
+    # Measure the backend, not the cache
+    server.search_cache.max_entries = 0
+
+    rng = random.Random(seed)
+    queries = [" ".join(rng.sample(corpus.WORDS, rng.randint(1, 3))) for _ in range(calls)]
+    lookups = [rng.choice(doknrs) for _ in range(calls)]
+
+    async def measure(tool, args):
+        samples = []
+        for arg in args:
+            start = time.perf_counter()
+            await tool(arg)
+            samples.append(time.perf_counter() - start)
+        return latency_summary(samples)
+
+    async def run():
+        # Warm-up opens the connection and the page cache
+        await server.search_decisions(queries[0])
+        return {
+            'tool_search_decisions': await measure(server.search_decisions, queries),
+            'tool_get_decision_by_doknr': await measure(server.get_decision_by_doknr, lookups),
+        }
+    return asyncio.run(run())
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite on a synthetic corpus.")
+    parser.add_argument('--count', type=int, default=500, help="number of synthetic decisions")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for corpus and queries")
+    parser.add_argument('--repeat', type=int, default=3, help="repetitions, the best run counts")
+    parser.add_argument('--calls', type=int, default=200, help="tool calls per latency benchmark")
+    parser.add_argument('--output', default='benchmark-results.json', help="JSON result file")
+    parser.add_argument('--keep', action='store_true', help="keep the generated corpus")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='court-decisions-bench-')
+    xml_dir = os.path.join(work_dir, 'extracted')
+    markdown_dir = os.path.join(work_dir, 'markdown')
+    # ingest.py and the SQLite backend read their paths at import time
+    os.environ['MARKDOWN_DIR'] = markdown_dir
+    os.environ['MANIFEST_FILE'] = os.path.join(work_dir, '.ingest-manifest.json')
+    os.environ['SQLITE_PATH'] = os.path.join(work_dir, 'court-decisions.sqlite')
+    os.environ['SEARCH_BACKEND'] = 'sqlite'
+
+    try:
+        print(f"Generating {args.count} decisions in {work_dir}...")
+        xml_paths = corpus.write_corpus(xml_dir, args.count, args.seed)
+        doknrs = [os.path.basename(os.path.dirname(p)) for p in xml_paths]
+
+        results = {}
+        print("Benchmarking xml_to_md...")
+        results['xml_to_md'] = bench_xml_to_md(xml_paths, markdown_dir, args.repeat)
+        md_paths = [os.path.join(markdown_dir, d, d + '.md') for d in doknrs]
+        print("Benchmarking parse_case_file...")
+        results['parse_case_file'] = bench_parse_case_file(md_paths, args.repeat)
+        print("Benchmarking generate_actions...")
+        results.update(bench_generate_actions(args.repeat))
+        print("Benchmarking tool latency...")
+        results.update(bench_tools(doknrs, args.calls, args.seed))
+    finally:
+        if args.keep:
+            print(f"Corpus kept in {work_dir}.")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'count': args.count,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'calls': args.calls,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for name, r in results.items():
+        if 'items_per_second' in r:
+            print(f"  {name:<28} {r['seconds']:8.3f}s  {r['items_per_second']:9.1f} items/s  {r['mb_per_second']:7.2f} MB/s")
+        else:
+            print(f"  {name:<28} p50 {r['p50_ms']:7.2f}ms  p95 {r['p95_ms']:7.2f}ms  max {r['max_ms']:7.2f}ms")
+    print(f"Results written to {args.output}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import re
+import calendar
+
+# 'opensearch' (default) or 'sqlite' for an embedded SQLite FTS5 database
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'opensearch')
+
+# Accepted date formats for the date filters: YYYY, YYYY-MM, YYYY-MM-DD or YYYYMMDD
+DATE_RE = re.compile(r'(\d{4})(?:-?(\d{2})(?:-?(\d{2}))?)?')
+
+def parse_date(value, end=False):
+    """
+    Turn a (possibly partial) date into YYYYMMDD, the format of the datum
+    field. Partial dates are expanded to the first day of the period, or
+    to the last day if end is set, so date_to='2019' includes all of 2019.
+    """
+    match = DATE_RE.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Invalid date '{value}', use YYYY, YYYY-MM or YYYY-MM-DD.")
+    year = int(match.group(1))
+    month = int(match.group(2) or (12 if end else 1))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid date '{value}'.")
+    last_day = calendar.monthrange(year, month)[1]
+    day = int(match.group(3)) if match.group(3) else (last_day if end else 1)
+    if not 1 <= day <= last_day:
+        raise ValueError(f"Invalid date '{value}'.")
+    return f"{year:04d}{month:02d}{day:02d}"
+
+def build_filters(gericht=None, spruchkoerper=None, date_from=None, date_to=None, doknr_prefix=None):
+    """
+    Normalize the structured filters of search_decisions into a dict with
+    only the filters actually set (dates as YYYYMMDD). Raises ValueError
+    for invalid values.
+    """
+    filters = {}
+    for key, value in (('gericht', gericht), ('spruchkoerper', spruchkoerper), ('doknr_prefix', doknr_prefix)):
+        if value and value.strip():
+            filters[key] = value.strip()
+    for key, value, end in (('date_from', date_from, False), ('date_to', date_to, True)):
+        if value and value.strip():
+            filters[key] = parse_date(value, end)
+    return filters
+
+class SearchBackend:
+    """
+    Interface between the MCP tools and the search engine holding the
+    decisions. Documents are dicts with the fields produced by
+    ingest.build_document; full_text may be missing and is then rebuilt
+    by the caller (see documents.with_full_text).
+    """
+
+    # Shown in error messages
+    name = 'search backend'
+
+    async def generation(self):
+        """
+        Return a value that changes whenever the index is rebuilt, or None
+        if it cannot be determined right now. Used to invalidate caches.
+        """
+        raise NotImplementedError
+
+    async def search(self, query, limit, filters=None, page=None):
+        """
+        Full-text search, optionally restricted by the filters from
+        build_filters; query may be empty if filters are given.
+
+        Returns (hits, took, next_page): hits is a list of {'source',
+        'score', 'snippets'} dicts, best match first. source only has the
+        documents.SEARCH_SOURCE_FIELDS; snippets maps section fields (or
+        'full_text' if the backend cannot tell sections apart) to lists of
+        highlighted fragments and may be empty. took is the time in
+        seconds the engine reports for the query itself, or None if it
+        has no such figure. next_page is None on the last page, otherwise
+        a JSON-serializable value to pass as page for the following hits.
+        """
+        raise NotImplementedError
+
+    async def lookup(self, kind, value, limit, filters=None):
+        """
+        Exact lookup of a reference detected by references.detect_reference
+        (kind 'az', 'ecli' or 'doknr'), ignoring case and whitespace.
+        Returns (hits, took) like search.
+        """
+        raise NotImplementedError
+
+    async def search_passages(self, query, limit, filters=None):
+        """
+        Hybrid (BM25 + vector) search over the Randnummer passages (see
+        passages.py). Returns (hits, took) with hits as {'source', 'score'}
+        dicts; source has the passage fields without the embedding.
+        """
+        raise NotImplementedError
+
+    async def stats(self, query, filters, size):
+        """
+        Facet counts of the decisions matching the query (may be empty) and
+        filters. Returns (stats, took) with stats as {'total': n, 'gericht':
+        {court: count}, 'spruchkoerper': {panel: count}, 'jahr': {year:
+        count}}; the term facets hold the size largest buckets, largest
+        first, the years are complete and in ascending order.
+        """
+        raise NotImplementedError
+
+    async def search_by_norm(self, keys, limit, filters=None):
+        """
+        Decisions citing all of the given norm keys (see norms.py), newest
+        first, optionally restricted by the filters. Returns (hits, took)
+        like search, without snippets.
+        """
+        raise NotImplementedError
+
+    async def get(self, doknr):
+        """Return the document with the given DokNr or None."""
+        raise NotImplementedError
+
+    async def get_fields(self, doknr, fields):
+        """
+        Return only the given fields of the document with the given DokNr
+        (plus the 'randnummern' offsets), or None if there is none.
+        """
+        raise NotImplementedError
+
+    async def mget(self, doknrs):
+        """Return a list of (doknr, document or None) in the order requested."""
+        raise NotImplementedError
+
+def get_backend():
+    if SEARCH_BACKEND == 'sqlite':
+        from sqlite_backend import SqliteBackend
+        return SqliteBackend()
+    if SEARCH_BACKEND != 'opensearch':
+        raise ValueError(f"Unknown SEARCH_BACKEND '{SEARCH_BACKEND}', use 'opensearch' or 'sqlite'.")
+    from opensearch_backend import OpenSearchBackend
+    return OpenSearchBackend()
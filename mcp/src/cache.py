@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+
+def normalize_query(query):
+    """Normalize a free-text query so trivially different spellings share a cache entry."""
+    return " ".join(query.split()).casefold()
+
+class SearchCache:
+    """
+    Small in-process LRU cache for rendered search results.
+
+    Entries expire after `ttl` seconds. Memory is bounded both by the number
+    of entries and by the total size of the cached result strings; the least
+    recently used entries are evicted first. The cache is tied to an index
+    generation (see `check_generation`) and is flushed as soon as the
+    generation changes, e.g. after the index has been rebuilt.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=50 * 1024 * 1024, ttl=600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value, size in bytes)
+        self._bytes = 0
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query, limit, **filters):
+        # Filters with value None are treated as "not set"
+        filter_items = tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+        return (normalize_query(query), limit, filter_items)
+
+    def check_generation(self, generation):
+        """Flush the cache if the index generation differs from the one the entries were built on."""
+        if generation != self.generation:
+            if self.generation is not None:
+                self.invalidations += 1
+            self.clear()
+            self.generation = generation
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "generation": self.generation,
+        }
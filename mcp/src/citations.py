@@ -0,0 +1,217 @@
+import os
+import sys
+import glob
+import json
+from array import array
+from references import normalize_reference, split_references
+import shards
+
+# Citation graph between decisions, built by ingest.py from the 'zitate'
+# that xml_to_md extracts, and loaded by the server for the
+# get_citing_decisions / get_cited_decisions tools.
+#
+# The graph is stored in CSR form: nodes are numbered 0..n-1 (newest
+# decision first), the targets of node i are targets[offsets[i]:offsets[i+1]].
+# Lookups are O(degree) and the arrays take 4 bytes per edge.
+MARKDOWN_DIR = os.environ.get('MARKDOWN_DIR', '../markdown')
+CITATION_GRAPH_FILE = os.environ.get('CITATION_GRAPH_FILE', os.path.join(MARKDOWN_DIR, 'citations.graph'))
+
+MAGIC = b'CITATIONS1\n'
+# Order of the uint32 arrays after the JSON header line
+ARRAYS = ['cites_offsets', 'cites', 'cited_by_offsets', 'cited_by', 'unresolved_offsets', 'unresolved']
+
+def to_csr(adjacency):
+    """[[targets of node 0], [targets of node 1], ...] -> (offsets, targets)"""
+    offsets = array('I', [0])
+    targets = array('I')
+    for neighbours in adjacency:
+        targets.extend(sorted(neighbours))
+        offsets.append(len(targets))
+    return offsets, targets
+
+def resolve(citation, by_az, by_ecli):
+    """Return the node id of a cited decision, or None if it is not (unambiguously) in the corpus."""
+    if 'ecli' in citation:
+        return by_ecli.get(normalize_reference(citation['ecli']))
+    if 'az' not in citation:
+        return None
+    candidates = by_az.get(normalize_reference(citation['az']), [])
+    court = (citation.get('gericht') or '').lower()
+    if court:
+        candidates = [(node, gericht) for node, gericht in candidates
+                      if gericht.lower() == court or gericht.lower().startswith(court + ' ')]
+    if len(candidates) == 1:
+        return candidates[0][0]
+    return None
+
+def citation_label(citation):
+    if 'az' in citation:
+        return f"{citation.get('gericht', '')} {citation['az']}".strip()
+    return citation.get('ecli') or citation.get('fundstelle')
+
+def iter_metadata(markdown_dir):
+    """The metadata of the decisions below markdown_dir, from .json files and shards."""
+    for json_path in glob.iglob(os.path.join(markdown_dir, '**', '*.json'), recursive=True):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                yield json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {json_path}: {e}")
+    for shard_path in shards.find_shards(markdown_dir):
+        try:
+            for record in shards.iter_records(shard_path):
+                yield record['metadata']
+        except Exception as e:
+            print(f"Error reading {shard_path}: {e}")
+
+def citation_record(metadata):
+    """
+    What the graph needs of a decision: its DokNr, Aktenzeichen, court,
+    date, ECLI and citations. ingest.py keeps these records in its manifest,
+    so the graph can be rebuilt without reading the decisions again.
+    """
+    record = {
+        'doknr': metadata['doknr'],
+        'az': metadata.get('aktenzeichen') or '',
+        'gericht': f"{metadata.get('gertyp', '')} {metadata.get('gerort', '')}".strip(),
+        'datum': metadata.get('datum') or '',
+    }
+    if metadata.get('ecli'):
+        record['ecli'] = metadata['ecli']
+    if metadata.get('zitate'):
+        record['zitate'] = metadata['zitate']
+    return record
+
+def markdown_records(markdown_dir=MARKDOWN_DIR):
+    """The citation_record()s of the decisions below markdown_dir (.json files and shards)."""
+    return (citation_record(metadata) for metadata in iter_metadata(markdown_dir)
+            if isinstance(metadata, dict) and metadata.get('doknr'))
+
+def build_graph(markdown_dir=MARKDOWN_DIR, path=CITATION_GRAPH_FILE):
+    """
+    Read the metadata below markdown_dir (.json files and shards) and write
+    the citation graph of the decisions to path (see write_graph).
+    """
+    write_graph(markdown_records(markdown_dir), path)
+
+def write_graph(records, path=CITATION_GRAPH_FILE):
+    """
+    Resolve the citations of the citation_record()s to DokNrs (by
+    Aktenzeichen plus court, or ECLI) and write the graph to path.
+    Citations that cannot be resolved are kept as labels.
+    """
+    # Newest first, so neighbour lists come out sorted by date
+    decisions = sorted(records, key=lambda r: (r['datum'], r['doknr']), reverse=True)
+
+    nodes = []
+    by_az = {}
+    by_ecli = {}
+    for node, record in enumerate(decisions):
+        nodes.append([record['doknr'], record['az'], record['gericht'], record['datum']])
+        for ref in split_references(record['az']):
+            by_az.setdefault(ref, []).append((node, record['gericht']))
+        if record.get('ecli'):
+            by_ecli[normalize_reference(record['ecli'])] = node
+
+    cites = [set() for _ in nodes]
+    cited_by = [set() for _ in nodes]
+    unresolved = [[] for _ in nodes]
+    labels = {}
+    for node, record in enumerate(decisions):
+        for citation in record.get('zitate') or []:
+            target = resolve(citation, by_az, by_ecli)
+            if target is None:
+                label = citation_label(citation)
+                if label:
+                    label_id = labels.setdefault(label, len(labels))
+                    if label_id not in unresolved[node]:
+                        unresolved[node].append(label_id)
+            elif target != node:
+                cites[node].add(target)
+                cited_by[target].add(node)
+
+    arrays = {}
+    arrays['cites_offsets'], arrays['cites'] = to_csr(cites)
+    arrays['cited_by_offsets'], arrays['cited_by'] = to_csr(cited_by)
+    arrays['unresolved_offsets'], arrays['unresolved'] = to_csr(unresolved)
+    header = {
+        'nodes': nodes,
+        'labels': list(labels),
+        'lengths': {name: len(arrays[name]) for name in ARRAYS}
+    }
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n')
+        for name in ARRAYS:
+            data = arrays[name]
+            if sys.byteorder == 'big':
+                data = array('I', data)
+                data.byteswap()
+            data.tofile(f)
+    os.replace(tmp_path, path)
+    print(f"Citation graph with {len(nodes)} decisions, {len(arrays['cites'])} resolved and "
+          f"{len(arrays['unresolved'])} unresolved citations written to {path}.")
+
+class CitationGraph:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.readline() != MAGIC:
+                raise ValueError(f"{path} is not a citation graph file.")
+            header = json.loads(f.readline())
+            self.arrays = {}
+            for name in ARRAYS:
+                data = array('I')
+                data.fromfile(f, header['lengths'][name])
+                if sys.byteorder == 'big':
+                    data.byteswap()
+                self.arrays[name] = data
+        self.nodes = header['nodes']
+        self.labels = header['labels']
+        self.index = {node[0]: i for i, node in enumerate(self.nodes)}
+
+    def node(self, i):
+        doknr, az, gericht, datum = self.nodes[i]
+        return {"doknr": doknr, "az": az, "gericht": gericht, "date": datum}
+
+    def _neighbours(self, name, doknr):
+        i = self.index.get(doknr)
+        if i is None:
+            return None
+        offsets = self.arrays[name + '_offsets']
+        return self.arrays[name][offsets[i]:offsets[i + 1]]
+
+    def cites(self, doknr):
+        """Node ids of the decisions cited by doknr (newest first), or None if doknr is unknown."""
+        return self._neighbours('cites', doknr)
+
+    def cited_by(self, doknr):
+        """Node ids of the decisions citing doknr (newest first), or None if doknr is unknown."""
+        return self._neighbours('cited_by', doknr)
+
+    def unresolved_citations(self, doknr):
+        ids = self._neighbours('unresolved', doknr) or []
+        return [self.labels[i] for i in ids]
+
+_graph = None
+_graph_file = None
+
+def get_graph():
+    """
+    Return the citation graph, reloading it when ingest.py has written a
+    new file, or None if there is none yet.
+    """
+    global _graph, _graph_file
+    try:
+        stat = os.stat(CITATION_GRAPH_FILE)
+    except FileNotFoundError:
+        return None
+    file_id = (stat.st_ino, stat.st_mtime_ns)
+    if _graph is None or file_id != _graph_file:
+        _graph = CitationGraph(CITATION_GRAPH_FILE)
+        _graph_file = file_id
+    return _graph
+
+if __name__ == "__main__":
+    build_graph()
@@ -7,6 +7,7 @@ OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST', 'localhost')
 OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT', 9200))
 OPENSEARCH_USER = os.environ.get('OPENSEARCH_USER', 'admin')
 OPENSEARCH_PASSWORD = os.environ.get('OPENSEARCH_PASSWORD', 'ComplexPassword123!')
+# Alias maintained by ingest.py, always points to the live index generation
 INDEX_NAME = 'court-decisions'
 
 def get_opensearch_client():
@@ -43,7 +44,7 @@ def fetch_sample_docs(limit=3):
         print(f"Found {response['hits']['total']['value']} documents. Showing {len(hits)} sample(s):\n")
         
         for i, hit in enumerate(hits, 1):
-            print(f"--- Document {i} (ID: {hit['_id']}) ---")
+            print(f"--- Document {i} (ID: {hit['_id']}, index: {hit['_index']}) ---")
             print(json.dumps(hit['_source'], ensure_ascii=False, indent=2))
             print("\n")
 
@@ -0,0 +1,61 @@
+# Section fields of a decision in document order, with the headings used
+# by prepare_data/xml_to_md.py
+SECTIONS = [
+    ('leitsatz', 'Leitsatz'),
+    ('sonstosatz', 'Sonstosatz?'),
+    ('tenor', 'Tenor'),
+    ('tatbestand', 'Tatbestand'),
+    ('entscheidungsgruende', 'Entscheidungsgründe'),
+    ('gruende', 'Gründe'),
+    ('abwmeinung', 'Abwmeinung?'),
+    ('sonstlt', 'Sonstlt?')
+]
+
+SECTION_FIELDS = [field for field, _ in SECTIONS]
+
+# Fields returned with search hits. The section bodies are only fetched by
+# the get tools; search hits carry highlighted snippets of them instead.
+SEARCH_SOURCE_FIELDS = ['title', 'doknr', 'ecli', 'az', 'datum', 'gericht', 'spruchkoerper', 'normen']
+
+# Fields only used internally (Randnummer offsets), left out of get tool responses
+INTERNAL_FIELDS = ['randnummern']
+
+# Metadata returned alongside the text by get_decision_passage
+PASSAGE_SOURCE_FIELDS = ['title', 'doknr', 'az', 'datum', 'gericht']
+
+def render_markdown(source):
+    """
+    Rebuild the Markdown of a decision from its indexed fields, in the same
+    layout xml_to_md produces. Used for the 'compact' index layout, which
+    does not keep full_text in _source.
+    """
+    md_output = []
+    md_output.append(f"# {source.get('title') or ''}")
+    # xml_to_md writes "{gertyp} {gerort}" and gericht is that, stripped. The
+    # federal courts have no gerort, which leaves two spaces before the '|'.
+    gericht = source.get('gericht') or ''
+    court = gericht if ' ' in gericht else f"{gericht} "
+    md_output.append(f"\n**Gericht:** {court} | **Spruchkörper:** {source.get('spruchkoerper') or ''}")
+    md_output.append(f"**DokNr:** {source.get('doknr') or ''} | **ECLI:** {source.get('ecli') or ''} | "
+                     f"**Datum:** {source.get('datum') or ''} | **Az:** {source.get('az') or ''}")
+    if source.get('normen'):
+        md_output.append(f"**Normen:** {source['normen']}")
+    if source.get('vorinstanz'):
+        md_output.append(f"**Vorinstanz:** {source['vorinstanz']}")
+    md_output.append("\n---\n")
+
+    for field, display_name in SECTIONS:
+        content = source.get(field)
+        if content:
+            md_output.append(f"## {display_name}\n")
+            md_output.append(content)
+            md_output.append("\n---\n")
+
+    return "\n".join(md_output)
+
+def with_full_text(source):
+    """Return the document source with full_text, reconstructing it if the index does not store it."""
+    if source.get('full_text') is None:
+        source = dict(source)
+        source['full_text'] = render_markdown(source)
+    return source
@@ -0,0 +1,77 @@
+import os
+import re
+import math
+import zlib
+
+# Embedder for the passage index, used by ingest.py for the passages and by
+# the server for queries, so both must run with the same setting.
+# 'hash': deterministic feature-hashing stub without extra dependencies
+#         (words and character trigrams), mainly for tests and small setups
+# 'sentence-transformers': local CPU model (pip install sentence-transformers)
+EMBEDDER = os.environ.get('EMBEDDER', 'hash')
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+HASH_EMBEDDING_DIM = int(os.environ.get('HASH_EMBEDDING_DIM', 256))
+EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', 32))
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+class HashEmbedder:
+    """
+    Maps words and their character trigrams into a fixed number of signed
+    buckets (crc32, stable across processes) and L2-normalizes the result.
+    Trigrams make parts of German compounds ('Kündigungsfrist', 'Frist')
+    land close to each other.
+    """
+
+    def __init__(self, dimension=HASH_EMBEDDING_DIM):
+        self.dimension = dimension
+        self.name = f"hash-{dimension}"
+
+    def _features(self, text):
+        for word in WORD_RE.findall(text.lower()):
+            yield word, 2.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 1.0
+
+    def embed_one(self, text):
+        vector = [0.0] * self.dimension
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % self.dimension] += weight if h & 0x80000000 else -weight
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed(self, texts):
+        return [self.embed_one(text) for text in texts]
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("EMBEDDER 'sentence-transformers' requires the sentence-transformers package "
+                              "(pip install sentence-transformers).")
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.name = f"st:{model_name}"
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=EMBEDDING_BATCH_SIZE, normalize_embeddings=True)
+        return vectors.tolist()
+
+_embedder = None
+
+def get_embedder():
+    """Return the process-wide embedder (models are loaded once)."""
+    global _embedder
+    if _embedder is None:
+        if EMBEDDER == 'hash':
+            _embedder = HashEmbedder()
+        elif EMBEDDER == 'sentence-transformers':
+            _embedder = SentenceTransformerEmbedder()
+        else:
+            raise ValueError(f"Unknown EMBEDDER '{EMBEDDER}', use 'hash' or 'sentence-transformers'.")
+    return _embedder
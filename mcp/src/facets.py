@@ -0,0 +1,43 @@
+import os
+import json
+
+# Corpus-wide facet counts (decision_stats without query or filters),
+# computed by ingest.py after every run and served by the server without
+# asking the backend. The file records the index generation it was
+# computed for (see SearchBackend.generation); the server only uses it
+# while that generation is live.
+MARKDOWN_DIR = os.environ.get('MARKDOWN_DIR', '../markdown')
+FACETS_FILE = os.environ.get('FACETS_FILE', os.path.join(MARKDOWN_DIR, 'facets.json'))
+# Buckets per facet kept in the file, the most decision_stats can serve from it
+FACET_SIZE = int(os.environ.get('FACET_SIZE', 100))
+
+def write_facets(generation, stats, path=FACETS_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'generation': generation, 'size': FACET_SIZE, 'stats': stats}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"Facets of {stats['total']} decisions written to {path}.")
+
+_facets = None
+_facets_file = None
+
+def load_facets():
+    """Return the precomputed facets, reloading the file when ingest.py rewrote it, or None."""
+    global _facets, _facets_file
+    try:
+        stat = os.stat(FACETS_FILE)
+    except FileNotFoundError:
+        return None
+    file_id = (stat.st_ino, stat.st_mtime_ns)
+    if _facets is None or file_id != _facets_file:
+        with open(FACETS_FILE, 'r', encoding='utf-8') as f:
+            _facets = json.load(f)
+        _facets_file = file_id
+    return _facets
+
+def trim_stats(stats, size):
+    """Keep the top size buckets of the term facets (the year histogram is complete)."""
+    trimmed = dict(stats)
+    for facet in ('gericht', 'spruchkoerper'):
+        trimmed[facet] = dict(list(stats[facet].items())[:size])
+    return trimmed
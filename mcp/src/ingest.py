@@ -1,8 +1,31 @@
 import os
+import re
 import time
-import glob
 import json
+import hashlib
+import queue
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait, as_completed
+from contextlib import contextmanager
 from opensearchpy import OpenSearch, helpers
+from documents import SECTION_FIELDS
+from backend import SEARCH_BACKEND
+from passages import split_passages
+from embeddings import get_embedder
+import citations
+import facets
+from norms import norm_keys
+import shards
+
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_DECODER = 'orjson'
+except ImportError:
+    json_loads = json.loads
+    JSON_DECODER = 'json'
 
 # Configuration
 OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST', 'localhost')
@@ -10,11 +33,68 @@ OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT', 9200))
 OPENSEARCH_USER = os.environ.get('OPENSEARCH_USER', 'admin')
 OPENSEARCH_PASSWORD = os.environ.get('OPENSEARCH_PASSWORD', 'ComplexPassword123!')
 MARKDOWN_DIR = os.environ.get('MARKDOWN_DIR', '../markdown')
+# Alias the server reads through. Each build goes into a versioned index
+# (court-decisions-v1, -v2, ...) and the alias is swapped atomically.
 INDEX_NAME = 'court-decisions'
+# Alias of the passage index (one document per Randnummer, see passages.py).
+# Every generation court-decisions-vN has its court-decisions-passages-vN.
+PASSAGE_INDEX_NAME = 'court-decisions-passages'
+# Bump whenever mappings or analyzers in create_index change; the next
+# ingestion run then builds a new index generation automatically
+MAPPING_VERSION = 6
+# 'standard': full_text (the whole Markdown) is sent and stored with each document
+# 'compact': full_text is only an indexed field filled via copy_to from title,
+#            normen and the sections; it is not kept in _source and the server
+#            rebuilds the Markdown on fetch (roughly halves disk usage)
+INDEX_LAYOUT = os.environ.get('INDEX_LAYOUT', 'standard')
+# Number of index generations to keep (the live one included)
+INDEX_RETENTION = int(os.environ.get('INDEX_RETENTION', 2))
+# 'full': build a new generation if there is none or its mapping is outdated
+# 'delta': like 'full', but otherwise only send new/changed files and delete
+#          removed ones (see load_manifest)
+# 'rebuild': always build a new generation
+INGEST_MODE = os.environ.get('INGEST_MODE', 'full')
+MANIFEST_FILE = os.environ.get('MANIFEST_FILE', os.path.join(MARKDOWN_DIR, '.ingest-manifest.json'))
+# Written by prepare_data/stream_ingest.py for the decisions it indexes
+# straight from the ZIP files, read here for their citation records
+STREAM_MANIFEST_FILE = os.environ.get('STREAM_MANIFEST_FILE', os.path.join(MARKDOWN_DIR, '.stream-manifest.json'))
+# Bulk indexing: parallel requests, actions and bytes per request, retries on 429
+BULK_WORKERS = int(os.environ.get('BULK_WORKERS', 4))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 500))
+BULK_MAX_CHUNK_BYTES = int(os.environ.get('BULK_MAX_CHUNK_BYTES', 20 * 1024 * 1024))
+BULK_MAX_RETRIES = int(os.environ.get('BULK_MAX_RETRIES', 5))
+BULK_INITIAL_BACKOFF = float(os.environ.get('BULK_INITIAL_BACKOFF', 2))
+BULK_MAX_BACKOFF = float(os.environ.get('BULK_MAX_BACKOFF', 60))
+BULK_TIMEOUT = int(os.environ.get('BULK_TIMEOUT', 120))
+# Document preparation (reading, JSON decoding, building, passage embedding):
+# worker processes (0: in the ingesting process), files per task, and
+# whether documents reach the bulk sender in scan order ('ordered') or as
+# soon as they are ready ('unordered'). By default one of the cores this
+# process may use (its CPU affinity, which containers restrict, unlike
+# os.cpu_count) is left to the ingesting process, which serializes the bulk
+# requests, with at most PREPARE_WORKERS_MAX workers: every worker loads its
+# own embedding model, so memory grows with the worker count.
+PREPARE_WORKERS_MAX = int(os.environ.get('PREPARE_WORKERS_MAX', 8))
+AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+PREPARE_WORKERS = int(os.environ.get('PREPARE_WORKERS', min(max(AVAILABLE_CPUS - 1, 0), PREPARE_WORKERS_MAX)))
+PREPARE_BATCH_SIZE = int(os.environ.get('PREPARE_BATCH_SIZE', 64))
+PREPARE_ORDER = os.environ.get('PREPARE_ORDER', 'ordered')
+# Maximum share of failed documents before a new generation is rejected
+MAX_FAILED_RATIO = float(os.environ.get('MAX_FAILED_RATIO', 0.01))
+# Queries run against a new generation before it goes live
+WARMUP_QUERIES = [
+    {"size": 10, "query": {"multi_match": {"query": "Insolvenzverfahren", "fields": ["title^2", "leitsatz^2", "full_text"]}}},
+    {"size": 0, "aggs": {"gerichte": {"terms": {"field": "gericht"}}}},
+]
+# Seconds between progress messages
+PROGRESS_INTERVAL = int(os.environ.get('PROGRESS_INTERVAL', 10))
 
 def get_opensearch_client():
     client = OpenSearch(
         hosts=[{'host': OPENSEARCH_HOST, 'port': OPENSEARCH_PORT, 'scheme': 'https'}],
+        # One connection per bulk worker, bulk requests may take a while
+        pool_maxsize=BULK_WORKERS,
+        timeout=BULK_TIMEOUT,
         http_compress=True,
         http_auth=(OPENSEARCH_USER, OPENSEARCH_PASSWORD),
         use_ssl=True,
@@ -35,130 +115,923 @@ def wait_for_opensearch(client):
             print(f"Waiting... ({e})")
         time.sleep(5)
 
-def create_index(client):
+def create_index(client, index):
     index_body = {
         'settings': {
             'index': {
                 'number_of_shards': 1,
                 'number_of_replicas': 0
+            },
+            # Case and whitespace insensitive matching of references (see references.py)
+            'analysis': {
+                'char_filter': {
+                    'strip_whitespace': {'type': 'pattern_replace', 'pattern': '\\s+', 'replacement': ''}
+                },
+                'normalizer': {
+                    'reference': {'type': 'custom', 'char_filter': ['strip_whitespace'], 'filter': ['lowercase']}
+                },
+                'tokenizer': {
+                    # One token per Aktenzeichen if a decision lists several
+                    'reference_list': {'type': 'pattern', 'pattern': '[,;]'}
+                },
+                'analyzer': {
+                    'reference_list': {
+                        'type': 'custom', 'char_filter': ['strip_whitespace'],
+                        'tokenizer': 'reference_list', 'filter': ['lowercase']
+                    }
+                }
             }
         },
         'mappings': {
+            '_meta': {'mapping_version': MAPPING_VERSION, 'layout': INDEX_LAYOUT},
             'properties': {
                 'title': {'type': 'text', 'analyzer': 'german'},
                 'full_text': {'type': 'text', 'analyzer': 'german'},
-                'doknr': {'type': 'keyword'},
-                'ecli': {'type': 'keyword'},
-                'az': {'type': 'keyword'},
+                'doknr': {'type': 'keyword', 'fields': {'ref': {'type': 'keyword', 'normalizer': 'reference'}}},
+                'ecli': {'type': 'keyword', 'fields': {'ref': {'type': 'keyword', 'normalizer': 'reference'}}},
+                'az': {'type': 'keyword', 'fields': {
+                    'ref': {'type': 'text', 'analyzer': 'reference_list', 'index_options': 'docs', 'norms': False}
+                }},
                 'datum': {'type': 'date', 'format': 'basic_date'}, # 20100114
                 'gericht': {'type': 'keyword'},
                 'spruchkoerper': {'type': 'keyword'},
                 'normen': {'type': 'text', 'analyzer': 'german'},
-                'leitsatz': {'type': 'text', 'analyzer': 'german'},
-                'sonstosatz': {'type': 'text', 'analyzer': 'german'},
-                'tenor': {'type': 'text', 'analyzer': 'german'},
-                'tatbestand': {'type': 'text', 'analyzer': 'german'},
-                'entscheidungsgruende': {'type': 'text', 'analyzer': 'german'},
-                'gruende': {'type': 'text', 'analyzer': 'german'},
-                'abwmeinung': {'type': 'text', 'analyzer': 'german'},
-                'sonstlt': {'type': 'text', 'analyzer': 'german'}
+                # Normalized statute keys ('bgb §823', 'bgb §823 abs1', see norms.py)
+                'norm_keys': {'type': 'keyword'},
+                # Only kept for display, never searched
+                'vorinstanz': {'type': 'text', 'index': False},
+                # Randnummer offsets per section from xml_to_md, read by get_decision_passage
+                'randnummern': {'type': 'object', 'enabled': False}
             }
         }
     }
+    # Sections are highlighted per field. Storing offsets in the postings lets
+    # the unified highlighter find the fragments without re-analyzing the text.
+    for field in SECTION_FIELDS:
+        index_body['mappings']['properties'][field] = {
+            'type': 'text', 'analyzer': 'german', 'index_options': 'offsets'
+        }
+
+    if INDEX_LAYOUT == 'compact':
+        # Derive the searchable full_text from the fields instead of storing the Markdown again
+        properties = index_body['mappings']['properties']
+        for field in ['title', 'normen'] + SECTION_FIELDS:
+            properties[field]['copy_to'] = 'full_text'
     
-    if not client.indices.exists(index=INDEX_NAME):
-        client.indices.create(index=INDEX_NAME, body=index_body)
-        print(f"Index '{INDEX_NAME}' created.")
-    else:
-        # Note: Ideally we should update mappings if index exists, but for simplicity we rely on re-creation or existing compat
-        print(f"Index '{INDEX_NAME}' already exists.")
-
-def ingest_files(client):
-    print(f"Scanning files in {MARKDOWN_DIR}...")
-    # Pattern: markdown_dir/*/*.md
-    # Using glob.iglob for iterator to save memory if many files
-    # The structure is described as markdown/FOLDER/FILE.md
-    files = glob.iglob(os.path.join(MARKDOWN_DIR, '**', '*.md'), recursive=True)
+    client.indices.create(index=index, body=index_body)
+    print(f"Index '{index}' created.")
+
+def create_passage_index(client, index):
+    embedder = get_embedder()
+    index_body = {
+        'settings': {
+            'index': {
+                'number_of_shards': 1,
+                'number_of_replicas': 0,
+                'knn': True
+            }
+        },
+        'mappings': {
+            '_meta': {'mapping_version': MAPPING_VERSION, 'embedder': embedder.name},
+            # The vectors live in the k-NN graph, no need to store them twice
+            '_source': {'excludes': ['embedding']},
+            'properties': {
+                'doknr': {'type': 'keyword'},
+                'section': {'type': 'keyword'},
+                'rn': {'type': 'integer'},
+                'text': {'type': 'text', 'analyzer': 'german'},
+                'embedding': {
+                    'type': 'knn_vector',
+                    'dimension': embedder.dimension,
+                    'method': {'name': 'hnsw', 'space_type': 'cosinesimil', 'engine': 'lucene'}
+                },
+                # Copied from the decision for display and filtering
+                'title': {'type': 'text', 'index': False},
+                'az': {'type': 'keyword'},
+                'datum': {'type': 'date', 'format': 'basic_date'},
+                'gericht': {'type': 'keyword'},
+                'spruchkoerper': {'type': 'keyword'}
+            }
+        }
+    }
+    client.indices.create(index=index, body=index_body)
+    print(f"Passage index '{index}' created (embedder {embedder.name}).")
+
+def passage_index_for(index):
+    """court-decisions-v7 -> court-decisions-passages-v7"""
+    return f"{PASSAGE_INDEX_NAME}-v{index_generation(index)}"
+
+def index_generation(index):
+    # court-decisions-v7 -> 7, anything else (e.g. a legacy unversioned index) -> 0
+    match = re.fullmatch(re.escape(INDEX_NAME) + r'-v(\d+)', index)
+    return int(match.group(1)) if match else 0
+
+def get_live_index(client):
+    """
+    Return the concrete index the INDEX_NAME alias points to, INDEX_NAME
+    itself for a legacy unversioned index, or None if neither exists.
+    """
+    if client.indices.exists_alias(name=INDEX_NAME):
+        return next(iter(client.indices.get_alias(name=INDEX_NAME)))
+    if client.indices.exists(index=INDEX_NAME):
+        return INDEX_NAME
+    return None
+
+def is_outdated(client, index):
+    """
+    True if the index was built with another mapping version or layout, or
+    its passage index is missing or was embedded with another embedder.
+    """
+    mapping = client.indices.get_mapping(index=index)[index]['mappings']
+    meta = mapping.get('_meta', {})
+    if (meta.get('mapping_version', 0) != MAPPING_VERSION or
+            meta.get('layout', 'standard') != INDEX_LAYOUT):
+        return True
+    passage_index = passage_index_for(index)
+    if not client.indices.exists(index=passage_index):
+        return True
+    passage_meta = client.indices.get_mapping(index=passage_index)[passage_index]['mappings'].get('_meta', {})
+    return passage_meta.get('embedder') != get_embedder().name
+
+def bump_revision(client, index):
+    """
+    Refresh index and its passage index after a delta run changed documents
+    and count the run in the _meta of index. The revision is part of the
+    generation the server caches search results for, so they are flushed.
+    """
+    client.indices.refresh(index=[index, passage_index_for(index)])
+    meta = client.indices.get_mapping(index=index)[index]['mappings'].get('_meta', {})
+    meta['revision'] = meta.get('revision', 0) + 1
+    client.indices.put_mapping(index=index, body={'_meta': meta})
+
+def list_generations(client):
+    indices = client.indices.get(index=f"{INDEX_NAME}-v*", ignore_unavailable=True, allow_no_indices=True)
+    return sorted(indices, key=index_generation)
+
+def warm_index(client, index):
+    """Run a few representative queries so caches are populated before the index goes live."""
+    client.indices.refresh(index=index)
+    for body in WARMUP_QUERIES:
+        client.search(index=index, body=body, request_cache=True)
+    print(f"Index '{index}' warmed up.")
+
+def swap_alias(client, new_index, old_index):
+    """Atomically point INDEX_NAME (and PASSAGE_INDEX_NAME) at new_index."""
+    actions = [{'add': {'index': new_index, 'alias': INDEX_NAME}},
+               {'add': {'index': passage_index_for(new_index), 'alias': PASSAGE_INDEX_NAME}}]
+    if old_index == INDEX_NAME:
+        # Legacy unversioned index occupies the alias name, replace it in the same request
+        actions.append({'remove_index': {'index': old_index}})
+    elif old_index:
+        actions.append({'remove': {'index': old_index, 'alias': INDEX_NAME}})
+        if client.indices.exists_alias(name=PASSAGE_INDEX_NAME, index=passage_index_for(old_index)):
+            actions.append({'remove': {'index': passage_index_for(old_index), 'alias': PASSAGE_INDEX_NAME}})
+    client.indices.update_aliases(body={'actions': actions})
+    print(f"Alias '{INDEX_NAME}' now points to '{new_index}'.")
+
+def cleanup_generations(client, live_index):
+    """Delete old (and abandoned) generations beyond INDEX_RETENTION."""
+    older = [i for i in list_generations(client) if index_generation(i) < index_generation(live_index)]
+    keep = set(older[-(INDEX_RETENTION - 1):]) if INDEX_RETENTION > 1 else set()
+    keep.add(live_index)
+    for index in list_generations(client):
+        if index not in keep:
+            client.indices.delete(index=index)
+            client.indices.delete(index=passage_index_for(index), ignore_unavailable=True)
+            print(f"Deleted old index generation '{index}'.")
+
+def build_generation(client, live_index):
+    """
+    Build a complete new index generation next to the live one, warm it and
+    swap the alias. The server keeps answering from the old generation
+    until the swap.
+    """
+    generations = list_generations(client)
+    next_generation = max([index_generation(i) for i in generations] + [index_generation(live_index or '')]) + 1
+    new_index = f"{INDEX_NAME}-v{next_generation}"
+    new_passage_index = passage_index_for(new_index)
+
+    create_index(client, new_index)
+    create_passage_index(client, new_passage_index)
+    manifest = {}
+    try:
+        # Nobody reads the new index yet, so trade visibility for speed
+        with bulk_load_settings(client, new_index), bulk_load_settings(client, new_passage_index):
+            stats = ingest_files(client, manifest, new_index, new_passage_index)
+        if live_index and (stats['success'] == 0 or stats['failed'] > stats['success'] * MAX_FAILED_RATIO):
+            raise RuntimeError(f"{stats['failed']} of {stats['success'] + stats['failed']} documents failed")
+        warm_index(client, new_index)
+    except Exception as e:
+        print(f"Building '{new_index}' failed ({e}), keeping '{live_index}'.")
+        client.indices.delete(index=new_index, ignore_unavailable=True)
+        client.indices.delete(index=new_passage_index, ignore_unavailable=True)
+        raise
+
+    swap_alias(client, new_index, live_index)
+    save_manifest(manifest, new_index)
+    cleanup_generations(client, new_index)
+    return stats
+
+def load_manifest(index):
+    """
+    Load the manifest of files already ingested into the given index. It maps
+    the path of each Markdown file (relative to MARKDOWN_DIR) to the DokNr,
+    file stats and content hash of the .md/.json pair at the time it was
+    indexed. A manifest written for another index generation is ignored.
+    """
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read manifest {MANIFEST_FILE} ({e}), treating all files as new.")
+        return {}
+    if data.get('index') != index:
+        print(f"Manifest belongs to index '{data.get('index')}', not '{index}', treating all files as new.")
+        return {}
+    return data['files']
+
+def save_manifest(manifest, index):
+    # Write to a temporary file first so an interrupted run never leaves a truncated manifest
+    tmp_path = MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'index': index, 'files': manifest}, f, ensure_ascii=False)
+    os.replace(tmp_path, MANIFEST_FILE)
+    print(f"Manifest with {len(manifest)} entries written to {MANIFEST_FILE}.")
+
+def build_document(metadata, full_text, layout=INDEX_LAYOUT):
+    # Metadata keys from xml_to_md: 
+    # title, doknr, ecli, datum, aktenzeichen, gertyp, gerort, spruchkoerper, norm, vorinstanz
+    # Plus section keys: leitsatz, tenor, tatbestand, entscheidungsgruende, gruende, etc. (lowercase)
+    doc = {
+        'title': metadata.get('title'),
+        'full_text': full_text,
+        'doknr': metadata.get('doknr'),
+        'ecli': metadata.get('ecli'),
+        'az': metadata.get('aktenzeichen'),
+        'datum': metadata.get('datum'),
+        'gericht': f"{metadata.get('gertyp', '')} {metadata.get('gerort', '')}".strip(),
+        'spruchkoerper': metadata.get('spruchkoerper'),
+        'normen': metadata.get('norm'),
+        'norm_keys': norm_keys(metadata.get('norm')),
+        'vorinstanz': metadata.get('vorinstanz'),
+        
+        # Sections (keys match xml_to_md output, which are lowercase)
+        'leitsatz': metadata.get('leitsatz'),
+        'sonstosatz': metadata.get('sonstosatz'),
+        'tenor': metadata.get('tenor'),
+        'tatbestand': metadata.get('tatbestand'),
+        'entscheidungsgruende': metadata.get('entscheidungsgruende'),
+        'gruende': metadata.get('gruende'),
+        'abwmeinung': metadata.get('abwmeinung'),
+        'sonstlt': metadata.get('sonstlt'),
+        'randnummern': metadata.get('randnummern'),
+    }
     
-    def generate_actions():
-        count = 0
-        for md_path in files:
+    # Validation / Cleanup
+    # Datum format is YYYYMMDD. If empty, remove it to avoid parse error
+    if not doc.get('datum'):
+        doc.pop('datum', None)
+    if layout == 'compact':
+        # Filled via copy_to, rebuilt from the sections on fetch
+        doc.pop('full_text')
+    return doc
+
+def embed_passages(doc):
+    """Split a document into passages (see passages.py) and add their embeddings."""
+    passages = split_passages(doc)
+    vectors = get_embedder().embed([p['text'] for p in passages]) if passages else []
+    return [{**passage, 'embedding': vector} for passage, vector in zip(passages, vectors)]
+
+def passage_actions(doknr, passages, passage_index, previous_count=0):
+    """
+    Return the index actions for the embedded passages of a document plus
+    deletes for passages left over from a longer previous version.
+    Passage ids are '<doknr>-<n>'.
+    """
+    actions = []
+    for i, passage in enumerate(passages):
+        actions.append((('passage', None, None), {
+            "_index": passage_index,
+            "_id": f"{doknr}-{i}",
+            "_source": passage
+        }))
+    actions.extend(delete_passage_actions(doknr, passage_index, len(passages), previous_count))
+    return actions
+
+def delete_passage_actions(doknr, passage_index, start, end):
+    return [(('passage_delete', None, None), {"_op_type": "delete", "_index": passage_index, "_id": f"{doknr}-{i}"})
+            for i in range(start, end)]
+
+def scan_sources(root):
+    """
+    Yield ('pair', md_path, json_path, signature) for the Markdown/JSON pairs
+    and ('shard', shard_path, index_path, signature) for the decision shards
+    (see shards.py) below root. Walks with os.scandir, so the pairing and
+    the file stats come from the directory listing instead of a stat call
+    per path (hidden entries are skipped, as glob does).
+    """
+    directories = [root]
+    while directories:
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = [entry for entry in it if not entry.name.startswith('.')]
+        except OSError as e:
+            print(f"Error scanning {directory}: {e}")
+            continue
+        files = {}
+        for entry in entries:
+            if entry.is_dir():
+                directories.append(entry.path)
+            elif entry.is_file():
+                files[entry.name] = entry
+        for name, entry in files.items():
+            if name.endswith('.md'):
+                kind, companion = 'pair', files.get(name[:-3] + '.json')
+            elif shards.is_shard(name):
+                kind, companion = 'shard', files.get(os.path.basename(shards.index_path(name)))
+            else:
+                continue
+            if companion is None:
+                continue
             try:
-                # Construct JSON path from MD path
-                json_path = os.path.splitext(md_path)[0] + ".json"
-                
-                if not os.path.exists(json_path):
-                    # print(f"Warning: No JSON found for {md_path}")
-                    continue
-
-                # Load Metadata from JSON
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                # Load Full Text from Markdown
-                with open(md_path, 'r', encoding='utf-8') as f:
-                    full_text = f.read()
-                
-                # Build Document
-                # Metadata keys from xml_to_md: 
-                # title, doknr, ecli, datum, aktenzeichen, gertyp, gerort, spruchkoerper, norm, vorinstanz
-                # Plus section keys: leitsatz, tenor, tatbestand, entscheidungsgruende, gruende, etc. (lowercase)
-                
-                doc = {
-                    'title': metadata.get('title'),
-                    'full_text': full_text,
-                    'doknr': metadata.get('doknr'),
-                    'ecli': metadata.get('ecli'),
-                    'az': metadata.get('aktenzeichen'),
-                    'datum': metadata.get('datum'),
-                    'gericht': f"{metadata.get('gertyp', '')} {metadata.get('gerort', '')}".strip(),
-                    'spruchkoerper': metadata.get('spruchkoerper'),
-                    'normen': metadata.get('norm'),
-                    
-                    # Sections (keys match xml_to_md output, which are lowercase)
-                    'leitsatz': metadata.get('leitsatz'),
-                    'sonstosatz': metadata.get('sonstosatz'),
-                    'tenor': metadata.get('tenor'),
-                    'tatbestand': metadata.get('tatbestand'),
-                    'entscheidungsgruende': metadata.get('entscheidungsgruende'),
-                    'gruende': metadata.get('gruende'),
-                    'abwmeinung': metadata.get('abwmeinung'),
-                    'sonstlt': metadata.get('sonstlt'),
-                }
-                
-                # Validation / Cleanup
-                # Datum format is YYYYMMDD. If empty, remove it to avoid parse error
-                if not doc.get('datum'):
-                    doc.pop('datum', None)
-
-                action = {
-                    "_index": INDEX_NAME,
-                    "_source": doc
-                }
-                
-                # Use DokNr as ID if available to avoid duplicates
-                if doc.get('doknr'):
-                    action["_id"] = doc['doknr']
-                
+                stat = entry.stat()
+                companion_stat = companion.stat()
+            except OSError as e:
+                print(f"Error processing {entry.path}: {e}")
+                continue
+            signature = [stat.st_mtime_ns, stat.st_size, companion_stat.st_mtime_ns, companion_stat.st_size]
+            yield kind, entry.path, companion.path, signature
+
+def prepare_batch(tasks, with_passages):
+    """
+    Read, hash, decode and build the documents of a batch of
+    (rel_path, md_path, json_path, previous hash) tasks. Runs in the
+    PREPARE_WORKERS processes; returns per task
+    ('unchanged', rel_path, hash), ('document', rel_path, hash, doc, passages,
+    citation record, bytes) or ('error', md_path, message).
+    """
+    results = []
+    for rel_path, md_path, json_path, previous_hash in tasks:
+        try:
+            with open(json_path, 'rb') as f:
+                json_bytes = f.read()
+            with open(md_path, 'rb') as f:
+                md_bytes = f.read()
+
+            # Touched but identical content: only refresh the stats
+            content_hash = hashlib.blake2b(md_bytes + b'\0' + json_bytes, digest_size=16).hexdigest()
+            if content_hash == previous_hash:
+                results.append(('unchanged', rel_path, content_hash))
+                continue
+
+            # Load Metadata from JSON, Full Text from Markdown
+            metadata = json_loads(json_bytes)
+            full_text = md_bytes.decode('utf-8')
+            results.append(prepared_document(rel_path, content_hash, metadata, full_text,
+                                             len(md_bytes) + len(json_bytes), with_passages))
+        except Exception as e:
+            results.append(('error', md_path, str(e)))
+    return results
+
+def prepare_block(shard_path, offset, length, wanted, with_passages):
+    """
+    Like prepare_batch for one block of a shard; wanted maps the line
+    numbers to prepare to their (rel_path, previous hash).
+    """
+    results = []
+    try:
+        with open(shard_path, 'rb') as f:
+            lines = shards.read_block(f, offset, length, shards.decompressor(shard_path))
+    except Exception as e:
+        return [('error', shard_path, str(e))]
+    for line, (rel_path, previous_hash) in wanted.items():
+        try:
+            content_hash = hashlib.blake2b(lines[line], digest_size=16).hexdigest()
+            if content_hash == previous_hash:
+                results.append(('unchanged', rel_path, content_hash))
+                continue
+            record = json_loads(lines[line])
+            results.append(prepared_document(rel_path, content_hash, record['metadata'], record['markdown'],
+                                             len(lines[line]), with_passages))
+        except Exception as e:
+            results.append(('error', f"{shard_path}/{rel_path}", str(e)))
+    return results
+
+def prepared_document(rel_path, content_hash, metadata, full_text, size, with_passages):
+    doc = build_document(metadata, full_text)
+    passages = embed_passages(doc) if with_passages and doc.get('doknr') else None
+    citation = citations.citation_record(metadata) if doc.get('doknr') else None
+    return ('document', rel_path, content_hash, doc, passages, citation, size)
+
+def prepared_batches(jobs):
+    """
+    Run the (function, args) jobs (prepare_batch or prepare_block), inline
+    with PREPARE_WORKERS 0, otherwise in a process pool with at most two
+    jobs per worker in flight. PREPARE_ORDER 'ordered' yields the results
+    in scan order, 'unordered' as soon as a job is done.
+    """
+    if PREPARE_WORKERS <= 0:
+        for function, args in jobs:
+            yield function(*args)
+        return
+
+    # The bulk sender threads are already running, forking them is unsafe
+    context = multiprocessing.get_context('spawn')
+    max_in_flight = PREPARE_WORKERS * 2
+    with ProcessPoolExecutor(PREPARE_WORKERS, mp_context=context) as pool:
+        if PREPARE_ORDER == 'ordered':
+            pending = deque()
+            for function, args in jobs:
+                pending.append(pool.submit(function, *args))
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for function, args in jobs:
+                pending.add(pool.submit(function, *args))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+def generate_actions(manifest, stats, index, passage_index=None):
+    """
+    Yield (bookkeeping, action) pairs indexing the Markdown/JSON pairs and
+    the decision shards (OUTPUT_FORMAT=shards of convert_all_to_md.py)
+    below MARKDOWN_DIR into the given index.
+
+    Pairs whose file stats or content hash match their manifest entry are
+    skipped, and delete actions are generated for documents whose source
+    files have disappeared since the last run. An empty manifest therefore
+    means a full ingestion. The bookkeeping tuple (op, rel_path, entry) tells
+    the caller how to update the manifest once the action succeeded.
+
+    With a passage_index, the passages of each decision (see passages.py)
+    are indexed there as well, bookkept as 'passage'/'passage_delete'.
+    The manifest entry records their number so a delta run can remove
+    passages a decision no longer has, and the decision's citation record
+    for update_citation_graph.
+
+    Reading, decoding and building the documents (and embedding their
+    passages) runs in PREPARE_WORKERS processes, see prepared_batches.
+    """
+    print(f"Scanning files in {MARKDOWN_DIR} ({PREPARE_WORKERS} prepare workers, {PREPARE_ORDER}, "
+          f"JSON decoder: {JSON_DECODER})...")
+
+    # Snapshot, the manifest is updated concurrently by the bulk workers
+    previous_paths = set(manifest)
+    seen = set()
+    signatures = {}
+    indexed_ids = set()
+    # (DokNr, passage count) no longer produced by the file that used to carry them
+    stale_ids = []
+
+    with_passages = passage_index is not None
+
+    def pending(rel_path, signature):
+        """Previous hash of a file or shard record to (re)read, False if its signature is unchanged."""
+        seen.add(rel_path)
+        # Cheap check first: unchanged mtime and size
+        previous = manifest.get(rel_path)
+        # Entries from before the manifest kept citation records are indexed
+        # once more to record them
+        if previous and previous.get('doknr') and 'citation' not in previous:
+            signatures[rel_path] = signature
+            return None
+        if previous and previous['signature'] == signature:
+            stats['unchanged'] += 1
+            return False
+        signatures[rel_path] = signature
+        return previous['hash'] if previous else None
+
+    def shard_jobs(shard_path, signature):
+        # Records are keyed as '<shard>/<path>', their signature is the shard's
+        shard_rel_path = os.path.relpath(shard_path, MARKDOWN_DIR)
+        blocks = {}
+        for path, _, offset, length, line in shards.read_index(shard_path):
+            rel_path = f"{shard_rel_path}/{path}"
+            previous_hash = pending(rel_path, signature)
+            if previous_hash is not False:
+                blocks.setdefault((offset, length), {})[line] = (rel_path, previous_hash)
+        for (offset, length), wanted in blocks.items():
+            yield prepare_block, (shard_path, offset, length, wanted, with_passages)
+
+    def jobs():
+        batch = []
+        for kind, path, companion, signature in scan_sources(MARKDOWN_DIR):
+            if kind == 'shard':
+                try:
+                    yield from shard_jobs(path, signature)
+                except Exception as e:
+                    print(f"Error processing {path}: {e}")
+                continue
+            rel_path = os.path.relpath(path, MARKDOWN_DIR)
+            previous_hash = pending(rel_path, signature)
+            if previous_hash is False:
+                continue
+            batch.append((rel_path, path, companion, previous_hash))
+            if len(batch) >= PREPARE_BATCH_SIZE:
+                yield prepare_batch, (batch, with_passages)
+                batch = []
+        if batch:
+            yield prepare_batch, (batch, with_passages)
+
+    for results in prepared_batches(jobs()):
+        for result in results:
+            if result[0] == 'error':
+                print(f"Error processing {result[1]}: {result[2]}")
+                continue
+            rel_path = result[1]
+            signature = signatures.pop(rel_path)
+            previous = manifest.get(rel_path)
+            if result[0] == 'unchanged':
+                previous['signature'] = signature
+                stats['unchanged'] += 1
+                continue
+
+            _, _, content_hash, doc, passages, citation, size = result
+            entry = {'doknr': doc.get('doknr'), 'signature': signature, 'hash': content_hash}
+            if citation is not None:
+                entry['citation'] = citation
+
+            if previous and previous.get('doknr') and previous['doknr'] != entry['doknr']:
+                stale_ids.append((previous['doknr'], previous.get('passages', 0)))
+
+            action = {
+                "_index": index,
+                "_source": doc
+            }
+
+            # Use DokNr as ID if available to avoid duplicates
+            if doc.get('doknr'):
+                action["_id"] = doc['doknr']
+                indexed_ids.add(doc['doknr'])
+
+            extra = []
+            if passages is not None:
+                previous_count = previous.get('passages', 0) if previous and previous.get('doknr') == entry['doknr'] else 0
+                extra = passage_actions(doc['doknr'], passages, passage_index, previous_count)
+                entry['passages'] = len(passages)
+
+            stats['changed'] += 1
+            stats['bytes'] += size
+            yield ('index', rel_path, entry), action
+            yield from extra
+
+    # Deletes go last, so a decision that merely moved to another file
+    # (and was indexed again above) is not removed
+    for doknr, passage_count in stale_ids:
+        if doknr not in indexed_ids:
+            yield ('delete', None, None), {"_op_type": "delete", "_index": index, "_id": doknr}
+            if passage_index:
+                yield from delete_passage_actions(doknr, passage_index, 0, passage_count)
+
+    for rel_path in previous_paths - seen:
+        doknr = manifest[rel_path].get('doknr')
+        if not doknr or doknr in indexed_ids:
+            # Either indexed without an explicit id (cannot be addressed)
+            # or now provided by another file
+            manifest.pop(rel_path)
+            continue
+        stats['removed'] += 1
+        yield ('delete', rel_path, None), {"_op_type": "delete", "_index": index, "_id": doknr}
+        if passage_index:
+            yield from delete_passage_actions(doknr, passage_index, 0, manifest[rel_path].get('passages', 0))
+
+def bulk_send(client, actions, handle_result):
+    """
+    Send (bookkeeping, action) pairs with BULK_WORKERS parallel streaming_bulk
+    workers fed from a bounded queue. Each worker splits its actions into
+    requests of at most BULK_CHUNK_SIZE actions / BULK_MAX_CHUNK_BYTES bytes
+    and retries documents rejected with 429 using exponential backoff.
+    handle_result(bookkeeping, ok, info) is called from the worker threads.
+    """
+    work = queue.Queue(maxsize=BULK_WORKERS * BULK_CHUNK_SIZE * 2)
+
+    def worker():
+        # Retries may reorder results, so match them back by op type and _id.
+        # Documents without an explicit _id get one assigned by OpenSearch.
+        in_flight = {}
+
+        def pull():
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                bookkeeping, action = item
+                key = (action.get('_op_type', 'index'), action.get('_id'))
+                in_flight.setdefault(key, deque()).append(bookkeeping)
                 yield action
-                count += 1
-                if count % 100 == 0:
-                    print(f"Processed {count} files...")
-                    
-            except Exception as e:
-                print(f"Error processing {md_path}: {e}")
 
-    print("Starting bulk ingestion...")
-    success, failed = helpers.bulk(client, generate_actions(), stats_only=True)
-    print(f"Ingestion complete. Success: {success}, Failed: {failed}")
+        for ok, item in helpers.streaming_bulk(
+            client, pull(),
+            chunk_size=BULK_CHUNK_SIZE,
+            max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+            max_retries=BULK_MAX_RETRIES,
+            initial_backoff=BULK_INITIAL_BACKOFF,
+            max_backoff=BULK_MAX_BACKOFF,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            op, info = next(iter(item.items()))
+            key = (op, info.get('_id'))
+            if key not in in_flight:
+                key = (op, None)
+            pending = in_flight[key]
+            # Responses come back in request order
+            bookkeeping = pending.popleft()
+            if not pending:
+                del in_flight[key]
+            handle_result(bookkeeping, ok, info)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(BULK_WORKERS)]
+    for t in threads:
+        t.start()
+
+    def put(item):
+        while True:
+            try:
+                work.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not any(t.is_alive() for t in threads):
+                    raise RuntimeError("All bulk workers have stopped")
+
+    for item in actions:
+        put(item)
+    for _ in threads:
+        put(None)
+    for t in threads:
+        t.join()
+
+@contextmanager
+def bulk_load_settings(client, index):
+    """
+    Disable refreshes and replicas while bulk loading and restore the
+    previous index settings afterwards.
+    """
+    settings = client.indices.get_settings(index=index)
+    current = next(iter(settings.values()))['settings']['index']
+    restore = {
+        # None resets the setting to the cluster default
+        'refresh_interval': current.get('refresh_interval'),
+        'number_of_replicas': current.get('number_of_replicas', '1')
+    }
+    client.indices.put_settings(
+        index=index,
+        body={'index': {'refresh_interval': '-1', 'number_of_replicas': 0}}
+    )
+    print(f"Bulk-load settings applied (restoring {restore} afterwards).")
+    try:
+        yield
+    finally:
+        client.indices.put_settings(index=index, body={'index': restore})
+        client.indices.refresh(index=index)
+        print("Index settings restored.")
+
+def ingest_files(client, manifest, index, passage_index):
+    """
+    Index new and changed decisions into the given index (and their passages
+    into passage_index) and delete removed ones (see generate_actions).
+    The manifest is updated in place with every successful operation.
+    """
+    stats = {'changed': 0, 'unchanged': 0, 'removed': 0, 'bytes': 0,
+             'success': 0, 'failed': 0, 'passages': 0, 'passages_failed': 0}
+    lock = threading.Lock()
+    started = time.monotonic()
+    last_report = [started]
+
+    def handle_result(bookkeeping, ok, info):
+        op, rel_path, entry = bookkeeping
+        with lock:
+            if op in ('passage', 'passage_delete'):
+                if ok or (op == 'passage_delete' and info.get('status') == 404):
+                    stats['passages'] += 1
+                else:
+                    stats['passages_failed'] += 1
+                    print(f"Failed to {op} {info.get('_id')}: {info.get('error')}")
+                return
+            # Deleting a document that is already gone is fine
+            if ok or (op == 'delete' and info.get('status') == 404):
+                stats['success'] += 1
+                if op == 'index':
+                    manifest[rel_path] = entry
+                elif rel_path is not None:
+                    manifest.pop(rel_path, None)
+            else:
+                stats['failed'] += 1
+                print(f"Failed to {op} {info.get('_id')}: {info.get('error')}")
+
+            now = time.monotonic()
+            if now - last_report[0] >= PROGRESS_INTERVAL:
+                last_report[0] = now
+                done = stats['success'] + stats['failed']
+                print(f"Processed {done} documents ({done / (now - started):.0f} docs/s)...")
+
+    print(f"Starting bulk ingestion with {BULK_WORKERS} workers "
+          f"(chunk size {BULK_CHUNK_SIZE}, max {BULK_MAX_CHUNK_BYTES} bytes per request)...")
+    bulk_send(client, generate_actions(manifest, stats, index, passage_index), handle_result)
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    print(f"Ingestion complete in {elapsed:.1f}s. Success: {stats['success']}, Failed: {stats['failed']} "
+          f"(new/changed: {stats['changed']}, unchanged: {stats['unchanged']}, removed: {stats['removed']})")
+    print(f"Passages: {stats['passages']} indexed/deleted, {stats['passages_failed']} failed")
+    print(f"Throughput: {stats['success'] / elapsed:.1f} docs/s, "
+          f"{stats['bytes'] / elapsed / (1024 * 1024):.2f} MB/s")
+    return stats
+
+def ingest_sqlite(conn, manifest):
+    """
+    Apply the actions of generate_actions to the embedded SQLite database
+    (SEARCH_BACKEND=sqlite), committing every BULK_CHUNK_SIZE documents.
+    The manifest is updated in place like in ingest_files.
+    """
+    import sqlite_backend
+
+    stats = {'changed': 0, 'unchanged': 0, 'removed': 0, 'bytes': 0,
+             'success': 0, 'failed': 0}
+    started = time.monotonic()
+    for (op, rel_path, entry), action in generate_actions(manifest, stats, None):
+        if op == 'index':
+            sqlite_backend.upsert_document(conn, action['_source'])
+            manifest[rel_path] = entry
+        else:
+            sqlite_backend.delete_document(conn, action['_id'])
+            if rel_path is not None:
+                manifest.pop(rel_path, None)
+        stats['success'] += 1
+        if stats['success'] % BULK_CHUNK_SIZE == 0:
+            conn.commit()
+    conn.commit()
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    print(f"Ingestion complete in {elapsed:.1f}s. Success: {stats['success']} "
+          f"(new/changed: {stats['changed']}, unchanged: {stats['unchanged']}, removed: {stats['removed']})")
+    return stats
+
+def build_sqlite(path):
+    """Build a fresh SQLite database next to path and swap it in atomically."""
+    import sqlite_backend
+
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite_backend.connect(tmp_path)
+    manifest = {}
+    try:
+        stats = ingest_sqlite(conn, manifest)
+        sqlite_backend.optimize(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    # Running servers notice the new file and reopen their connections
+    os.replace(tmp_path, path)
+    save_manifest(manifest, path)
+    return stats
+
+def manifest_citations(index):
+    """
+    The citation records kept in the manifest of index, or None if there is
+    none, it belongs to another index or predates them.
+    """
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        files = data['files'] if data.get('index') == index else None
+    except (OSError, ValueError, KeyError):
+        return None
+    if files is None:
+        return None
+    records = {}
+    for entry in files.values():
+        if not entry.get('doknr'):
+            continue
+        if 'citation' not in entry:
+            return None
+        records[entry['doknr']] = entry['citation']
+    return list(records.values())
+
+def stream_citations(index):
+    """
+    The citation records of the decisions prepare_data/stream_ingest.py
+    streamed into index, empty if its manifest belongs to another index.
+    """
+    try:
+        with open(STREAM_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if data.get('index') != index:
+        return []
+    return [entry['citation'] for entries in data.get('zips', {}).values()
+            for entry in entries.values() if entry.get('citation')]
+
+def update_citation_graph(stats, index):
+    """
+    Rebuild the citation graph of index if documents changed (stats None:
+    nothing ran) or there is none yet, from the citation records in the
+    manifests of this script and of prepare_data/stream_ingest.py. Only a
+    manifest written before it kept them makes this read all decisions
+    below MARKDOWN_DIR again.
+    """
+    if not (stats and (stats['changed'] or stats['removed'])) and os.path.exists(citations.CITATION_GRAPH_FILE):
+        return
+    records = manifest_citations(index)
+    if records is None:
+        records = citations.markdown_records(MARKDOWN_DIR)
+    merged = {record['doknr']: record for record in records}
+    # Streamed decisions have no Markdown files, only stream manifest entries
+    merged.update((record['doknr'], record) for record in stream_citations(index))
+    citations.write_graph(merged.values())
+
+def update_facets(stats, client=None):
+    """
+    Precompute the corpus-wide facets of decision_stats after documents
+    changed, or if there are none yet. Without client, from the SQLite
+    database.
+    """
+    if not (stats and (stats['changed'] or stats['removed'])) and os.path.exists(facets.FACETS_FILE):
+        return
+    if client is None:
+        import asyncio
+        from sqlite_backend import SqliteBackend
+        backend = SqliteBackend()
+        generation = asyncio.run(backend.generation())
+        result, _ = asyncio.run(backend.stats('', {}, facets.FACET_SIZE))
+    else:
+        from opensearch_backend import stats_body, parse_stats, generation_from_responses, REVISION_FILTER
+        # Delta runs do not refresh on their own
+        client.indices.refresh(index=INDEX_NAME)
+        generation = generation_from_responses(
+            client.indices.get_settings(index=INDEX_NAME, name='index.uuid'),
+            client.indices.get_mapping(index=INDEX_NAME, filter_path=REVISION_FILTER))
+        result = parse_stats(client.search(index=INDEX_NAME, body=stats_body('', {}, facets.FACET_SIZE)))
+    facets.write_facets(generation, result)
+
+def run_sqlite():
+    """Returns the ingestion stats, or None if the database was up to date."""
+    import sqlite_backend
+
+    path = sqlite_backend.SQLITE_PATH
+    if not os.path.exists(path):
+        print(f"No SQLite database at '{path}' yet, building it.")
+        return build_sqlite(path)
+    elif INGEST_MODE == 'rebuild':
+        return build_sqlite(path)
+    elif sqlite_backend.schema_version(path) != sqlite_backend.SCHEMA_VERSION:
+        print(f"SQLite database '{path}' uses an outdated schema, rebuilding it.")
+        return build_sqlite(path)
+    elif INGEST_MODE == 'delta':
+        manifest = load_manifest(path)
+        conn = sqlite_backend.connect(path)
+        try:
+            stats = ingest_sqlite(conn, manifest)
+        finally:
+            conn.close()
+        save_manifest(manifest, path)
+        return stats
+    else:
+        print(f"SQLite database '{path}' exists. Skipping ingestion.")
+        return None
 
 if __name__ == "__main__":
     print('starting ingestion!')
+    if SEARCH_BACKEND == 'sqlite':
+        import sqlite_backend
+        stats = run_sqlite()
+        update_citation_graph(stats, sqlite_backend.SQLITE_PATH)
+        update_facets(stats)
+        raise SystemExit(0)
+
     client = get_opensearch_client()
     wait_for_opensearch(client)
     
-    if client.indices.exists(index=INDEX_NAME):
-        print(f"Index '{INDEX_NAME}' already exists. Skipping ingestion.")
+    live_index = get_live_index(client)
+    stats = None
+    if live_index is None:
+        print(f"No index behind '{INDEX_NAME}' yet, building the first generation.")
+        stats = build_generation(client, live_index)
+    elif INGEST_MODE == 'rebuild':
+        stats = build_generation(client, live_index)
+    elif live_index == INDEX_NAME or is_outdated(client, live_index):
+        print(f"Index '{live_index}' uses an outdated mapping or layout, building a new generation.")
+        stats = build_generation(client, live_index)
+    elif INGEST_MODE == 'delta':
+        manifest = load_manifest(live_index)
+        stats = ingest_files(client, manifest, live_index, passage_index_for(live_index))
+        save_manifest(manifest, live_index)
+        if stats['changed'] or stats['removed']:
+            bump_revision(client, live_index)
+        cleanup_generations(client, live_index)
     else:
-        create_index(client)
-        ingest_files(client)
+        print(f"Index '{live_index}' is up to date. Skipping ingestion.")
+    # A new generation is live after build_generation
+    update_citation_graph(stats, get_live_index(client))
+    update_facets(stats, client)
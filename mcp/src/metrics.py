@@ -0,0 +1,87 @@
+import time
+import functools
+from contextlib import contextmanager
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Prometheus metrics of the MCP tools, exposed by server.py under /metrics
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+TOOL_LATENCY = Histogram(
+    'mcp_tool_duration_seconds', 'Total duration of an MCP tool call',
+    ['tool'], buckets=LATENCY_BUCKETS
+)
+# Stages: backend_took (time reported by the search engine itself), network
+# (backend round trip minus took), postprocess (formatting the hits) and
+# serialize (JSON encoding of the response)
+STAGE_LATENCY = Histogram(
+    'mcp_tool_stage_duration_seconds', 'Duration of the stages of an MCP tool call',
+    ['tool', 'stage'], buckets=LATENCY_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    'mcp_tool_response_bytes', 'Size of the MCP tool response (UTF-8)',
+    ['tool'], buckets=SIZE_BUCKETS
+)
+SEARCH_HITS = Histogram(
+    'mcp_search_hits', 'Number of hits returned by search_decisions',
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+TOOL_ERRORS = Counter(
+    'mcp_tool_errors_total', 'Failed MCP tool calls by exception type',
+    ['tool', 'error_type']
+)
+REFERENCE_LOOKUPS = Counter(
+    'mcp_reference_lookups_total', 'Exact Aktenzeichen/ECLI/DokNr lookups (a miss falls back to full-text search)',
+    ['kind', 'result']
+)
+SEARCH_CACHE = Counter(
+    'mcp_search_cache_requests_total', 'Search cache lookups',
+    ['result']
+)
+# source: precomputed (facets file from ingest.py), cache or backend
+DECISION_STATS = Counter(
+    'mcp_decision_stats_total', 'decision_stats calls by where the counts came from',
+    ['source']
+)
+
+def instrumented(tool):
+    """
+    Decorator for MCP tools: records the total latency and response size.
+    functools.wraps keeps the signature FastMCP derives the tool schema from.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            finally:
+                TOOL_LATENCY.labels(tool).observe(time.perf_counter() - start)
+            RESPONSE_BYTES.labels(tool).observe(len(result.encode('utf-8')))
+            return result
+        return wrapper
+    return decorator
+
+@contextmanager
+def stage(tool, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(tool, name).observe(time.perf_counter() - start)
+
+def observe_backend(tool, seconds, took):
+    """Split a backend round trip into engine time (took, if known) and network/client overhead."""
+    if took is None:
+        STAGE_LATENCY.labels(tool, 'backend').observe(seconds)
+        return
+    STAGE_LATENCY.labels(tool, 'backend_took').observe(took)
+    STAGE_LATENCY.labels(tool, 'network').observe(max(0.0, seconds - took))
+
+def record_error(tool, error):
+    TOOL_ERRORS.labels(tool, type(error).__name__).inc()
+
+def render():
+    """Return (body, content type) of the Prometheus text exposition."""
+    return generate_latest(), CONTENT_TYPE_LATEST
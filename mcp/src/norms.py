@@ -0,0 +1,75 @@
+import re
+
+# Normalized keys of the cited statutes ('normen'), e.g.
+# "§ 823 Abs 1 BGB, §§ 280, 281 BGB" -> bgb §823, bgb §823 abs1, bgb §280, bgb §281
+# Every norm yields a key for the paragraph and, if given, one for the
+# Absatz, so "§ 823 BGB" also finds decisions citing "§ 823 Abs 1 BGB".
+# The only implementation: ingest.py and prepare_data/stream_ingest.py
+# compute the indexed keys with it, server.py the search_by_norm keys.
+
+NORM_SEPARATOR_RE = re.compile(r'[,;]|\bund\b|\bi\.\s?V\.\s?m\.')
+NORM_RE = re.compile(r'^(?:(?:§§?|[Aa]rt\.?|Artikel)\s*)?(\d+(?:[a-z]|\s[a-z](?=\s|$))?)\b\s*(.*)$')
+# Law in front of the paragraph, as often typed in queries ("BGB § 823 Abs 1")
+LAW_FIRST_RE = re.compile(r'^([A-ZÄÖÜ][\wÄÖÜäöüß]*(?:\s+(?:[IVX]+|\d{1,2}))?)\s+(?:§§?|[Aa]rt\.?|Artikel)\s*(.*)$')
+ABSATZ_RE = re.compile(r'\bAbs\.?\s*(\d+[a-z]?)\b', re.IGNORECASE)
+# Finer subdivisions (Satz, Nummer, ...) are not part of the keys
+QUALIFIER_RE = re.compile(r'\b(?:Abs|S|Satz|Nr|Buchst|Halbs|Hs|Alt|UAbs|Var|lit)\.?\s*(?:\d+[a-z]?|[a-z]\b)', re.IGNORECASE)
+# Book of a code ("SGB II", "SGB 5"); other trailing words like a year are dropped
+LAW_PART_RE = re.compile(r'^(?:[IVX]+|\d{1,2})$')
+
+def normalize_law(text):
+    tokens = text.replace('.', ' ').split()
+    if not tokens:
+        return None
+    law = tokens[0]
+    if len(tokens) > 1 and LAW_PART_RE.match(tokens[1]):
+        law += tokens[1]
+    return law.lower()
+
+def parse_norms(text):
+    """
+    Return (law, paragraph, absatz) tuples for the norms in text; absatz
+    may be None. Paragraphs listed before their law ("§§ 280, 281 BGB")
+    get the law that follows them.
+    """
+    norms = []
+    pending = []
+    for piece in NORM_SEPARATOR_RE.split(text or ''):
+        piece = piece.strip()
+        law_first = LAW_FIRST_RE.match(piece)
+        if law_first:
+            piece = f"{law_first.group(2)} {law_first.group(1)}"
+        match = NORM_RE.match(piece)
+        if not match:
+            continue
+        paragraph = match.group(1).replace(' ', '').lower()
+        rest = match.group(2)
+        absatz = ABSATZ_RE.search(rest)
+        pending.append((paragraph, absatz.group(1).lower() if absatz else None))
+        law = normalize_law(QUALIFIER_RE.sub(' ', rest))
+        if law:
+            norms.extend((law, p, a) for p, a in pending)
+            pending = []
+    return norms
+
+def norm_key(law, paragraph, absatz=None):
+    key = f"{law} §{paragraph}"
+    return f"{key} abs{absatz}" if absatz else key
+
+def norm_keys(text):
+    """All keys of the norms in a decision's normen field, without duplicates."""
+    keys = []
+    for law, paragraph, absatz in parse_norms(text):
+        for key in (norm_key(law, paragraph), norm_key(law, paragraph, absatz) if absatz else None):
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+def query_norm_keys(query):
+    """The most specific key of each norm in a search_by_norm query."""
+    keys = []
+    for law, paragraph, absatz in parse_norms(query):
+        key = norm_key(law, paragraph, absatz)
+        if key not in keys:
+            keys.append(key)
+    return keys
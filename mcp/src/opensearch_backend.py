@@ -0,0 +1,359 @@
+import os
+import asyncio
+from opensearchpy import AsyncOpenSearch, AIOHttpConnection, NotFoundError, TransportError
+from backend import SearchBackend
+from documents import SECTION_FIELDS, SEARCH_SOURCE_FIELDS, INTERNAL_FIELDS
+from embeddings import get_embedder
+
+# Configuration
+OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST', 'localhost')
+OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT', 9200))
+OPENSEARCH_USER = os.environ.get('OPENSEARCH_USER', 'admin')
+OPENSEARCH_PASSWORD = os.environ.get('OPENSEARCH_PASSWORD', 'ComplexPassword123!')
+# Alias maintained by ingest.py, always points to the live index generation
+INDEX_NAME = 'court-decisions'
+PASSAGE_INDEX_NAME = 'court-decisions-passages'
+# Size of the shared keep-alive connection pool and per-request timeout (seconds)
+OPENSEARCH_POOL_MAXSIZE = int(os.environ.get('OPENSEARCH_POOL_MAXSIZE', 25))
+OPENSEARCH_TIMEOUT = int(os.environ.get('OPENSEARCH_TIMEOUT', 30))
+# Snippets per section and their size (characters) in search results
+HIGHLIGHT_FRAGMENTS = int(os.environ.get('HIGHLIGHT_FRAGMENTS', 2))
+HIGHLIGHT_FRAGMENT_SIZE = int(os.environ.get('HIGHLIGHT_FRAGMENT_SIZE', 160))
+# Keep-alive of the point in time that search_decisions pages run on; every
+# page extends it, abandoned ones expire after this time
+PIT_KEEP_ALIVE = os.environ.get('PIT_KEEP_ALIVE', '2m')
+# Total order for search_after: score, then DokNr as tie-breaker
+SEARCH_SORT = [{"_score": {"order": "desc"}}, {"doknr": {"order": "asc"}}]
+# Hybrid passage search: candidates fetched per retriever (BM25 and k-NN)
+# and the weight of the vector score in the fused score (0 = BM25 only)
+PASSAGE_CANDIDATES = int(os.environ.get('PASSAGE_CANDIDATES', 50))
+PASSAGE_VECTOR_WEIGHT = float(os.environ.get('PASSAGE_VECTOR_WEIGHT', 0.5))
+
+# Process-wide client, created lazily on first use (it must be created
+# inside the running event loop)
+_client = None
+
+def get_opensearch_client():
+    """Return the shared AsyncOpenSearch client.
+
+    All tool calls reuse the same client, so concurrent requests multiplex
+    over a pool of warm keep-alive connections instead of opening a new
+    TLS connection per call.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOpenSearch(
+            hosts=[{'host': OPENSEARCH_HOST, 'port': OPENSEARCH_PORT, 'scheme': 'https'}],
+            connection_class=AIOHttpConnection,
+            maxsize=OPENSEARCH_POOL_MAXSIZE,
+            timeout=OPENSEARCH_TIMEOUT,
+            http_compress=True,
+            http_auth=(OPENSEARCH_USER, OPENSEARCH_PASSWORD),
+            use_ssl=True,
+            verify_certs=False,
+            ssl_assert_hostname=False,
+            ssl_show_warn=False
+        )
+    return _client
+
+def filter_clauses(filters):
+    """Translate the filters from backend.build_filters into bool.filter clauses."""
+    clauses = []
+    if 'gericht' in filters:
+        # gericht is "<gertyp> <gerort>", so 'BFH' also has to match 'BFH München'
+        clauses.append({
+            "bool": {
+                "should": [
+                    {"term": {"gericht": {"value": filters['gericht'], "case_insensitive": True}}},
+                    {"prefix": {"gericht": {"value": filters['gericht'] + " ", "case_insensitive": True}}}
+                ],
+                "minimum_should_match": 1
+            }
+        })
+    if 'spruchkoerper' in filters:
+        clauses.append({"term": {"spruchkoerper": {"value": filters['spruchkoerper'], "case_insensitive": True}}})
+    if 'date_from' in filters or 'date_to' in filters:
+        date_range = {"format": "basic_date"}
+        if 'date_from' in filters:
+            date_range["gte"] = filters['date_from']
+        if 'date_to' in filters:
+            date_range["lte"] = filters['date_to']
+        clauses.append({"range": {"datum": date_range}})
+    if 'doknr_prefix' in filters:
+        clauses.append({"prefix": {"doknr": {"value": filters['doknr_prefix'], "case_insensitive": True}}})
+    return clauses
+
+def highlight_config():
+    """
+    Bounded, per-section snippets. The query runs against full_text, the
+    fragments come from the sections it covers (require_field_match off),
+    which works the same for both index layouts. ingest.create_index
+    stores offsets for the sections, so the unified highlighter does not
+    re-analyze the (often huge) Gründe. The Leitsatz serves as fallback
+    snippet if nothing matched in the body.
+    """
+    fields = {field: {} for field in SECTION_FIELDS}
+    fields['leitsatz'] = {"no_match_size": HIGHLIGHT_FRAGMENT_SIZE}
+    return {
+        "type": "unified",
+        "require_field_match": False,
+        "order": "score",
+        "fragment_size": HIGHLIGHT_FRAGMENT_SIZE,
+        "number_of_fragments": HIGHLIGHT_FRAGMENTS,
+        "fields": fields
+    }
+
+def scoring_query(query):
+    if not query.strip():
+        return {"match_all": {}}
+    # Simple multi-match query
+    return {
+        "multi_match": {
+            "query": query,
+            "fields": [
+                "title^2", "leitsatz^2", "full_text", 
+                "az", "doknr", "normen"
+            ]
+        }
+    }
+
+def stats_body(query, filters, size):
+    """
+    Aggregations of decision_stats. size 0 makes the response eligible for
+    the shard request cache, which keys on the exact body, so the body is
+    built the same way for equal arguments.
+    """
+    return {
+        "size": 0,
+        "track_total_hits": True,
+        "query": {"bool": {"must": scoring_query(query), "filter": filter_clauses(filters)}},
+        "aggs": {
+            "gericht": {"terms": {"field": "gericht", "size": size}},
+            "spruchkoerper": {"terms": {"field": "spruchkoerper", "size": size}},
+            "jahr": {"date_histogram": {"field": "datum", "calendar_interval": "year", "format": "yyyy", "min_doc_count": 1}}
+        }
+    }
+
+def parse_stats(response):
+    aggs = response['aggregations']
+    return {
+        "total": response['hits']['total']['value'],
+        "gericht": {b['key']: b['doc_count'] for b in aggs['gericht']['buckets']},
+        "spruchkoerper": {b['key']: b['doc_count'] for b in aggs['spruchkoerper']['buckets']},
+        "jahr": {b['key_as_string']: b['doc_count'] for b in aggs['jahr']['buckets']}
+    }
+
+# Only the part of the get_mapping response generation_from_responses needs
+REVISION_FILTER = '*.mappings._meta.revision'
+
+def generation_from_responses(settings, mappings):
+    """
+    The value OpenSearchBackend.generation returns, from a
+    get_settings(name='index.uuid') and a get_mapping(filter_path=REVISION_FILTER)
+    response.
+    """
+    return sorted(
+        f"{name}:{body['settings']['index']['uuid']}:"
+        f"{mappings.get(name, {}).get('mappings', {}).get('_meta', {}).get('revision', 0)}"
+        for name, body in settings.items()
+    )
+
+def is_pit_missing(error):
+    # An expired or deleted point in time is reported as 404 or as missing search context
+    return isinstance(error, NotFoundError) or 'search_context_missing' in str(error)
+
+def parse_hits(response):
+    results = []
+    for hit in response['hits']['hits']:
+        highlight = hit.get('highlight', {})
+        results.append({
+            "source": hit['_source'],
+            "score": hit['_score'],
+            "snippets": {field: highlight[field] for field in SECTION_FIELDS if field in highlight}
+        })
+    return results
+
+def fuse_scores(bm25_hits, vector_hits, weight):
+    """
+    Convex combination of both result lists. Each list is normalized by its
+    best score first, since BM25 scores are unbounded while the cosine
+    scores of the k-NN query lie in [0, 1]. A passage missing from one list
+    scores 0 there.
+    """
+    fused = {}
+    for hits, w in ((bm25_hits, 1 - weight), (vector_hits, weight)):
+        top = max((hit['_score'] or 0 for hit in hits), default=0)
+        for hit in hits:
+            entry = fused.setdefault(hit['_id'], {"source": hit['_source'], "score": 0.0})
+            if top > 0:
+                entry["score"] += w * hit['_score'] / top
+    return sorted(fused.values(), key=lambda hit: hit["score"], reverse=True)
+
+class OpenSearchBackend(SearchBackend):
+    name = 'OpenSearch'
+
+    async def generation(self):
+        """
+        The set of concrete index UUIDs behind INDEX_NAME with their
+        revision, which changes whenever the index is recreated, the alias
+        is moved or a delta run has changed documents (see
+        ingest.bump_revision).
+        """
+        client = get_opensearch_client()
+        try:
+            settings = await client.indices.get_settings(index=INDEX_NAME, name='index.uuid')
+            mappings = await client.indices.get_mapping(index=INDEX_NAME, filter_path=REVISION_FILTER)
+        except Exception:
+            return None
+        return generation_from_responses(settings, mappings)
+
+    async def search(self, query, limit, filters=None, page=None):
+        client = get_opensearch_client()
+        scoring = scoring_query(query)
+
+        search_body = {
+            # One extra hit tells whether there is a next page
+            "size": limit + 1,
+            "query": {
+                "bool": {
+                    "must": scoring,
+                    # Filter context: not scored and cached by OpenSearch per segment
+                    "filter": filter_clauses(filters or {})
+                }
+            },
+            "sort": SEARCH_SORT,
+            # Leave full_text and the section bodies out of the response
+            "_source": {"includes": SEARCH_SOURCE_FIELDS},
+            "highlight": highlight_config()
+        }
+
+        pit_id = None
+        if page is None:
+            # Most searches never get past the first page, so it runs without a point in time
+            response = await client.search(index=INDEX_NAME, body=search_body)
+        else:
+            # Later pages continue after the last hit (search_after) on a point in time,
+            # so each page costs the same no matter how deep it is. The point in time is
+            # opened for the second page and reopened if it expired in between.
+            search_body["search_after"] = page['after']
+            pit_id = page.get('pit') or await self._open_pit()
+            try:
+                search_body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+                response = await client.search(body=search_body)
+            except TransportError as e:
+                if not page.get('pit') or not is_pit_missing(e):
+                    raise
+                pit_id = await self._open_pit()
+                search_body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+                response = await client.search(body=search_body)
+            pit_id = response.get('pit_id', pit_id)
+
+        raw_hits = response['hits']['hits']
+        next_page = None
+        if len(raw_hits) > limit:
+            next_page = {"after": raw_hits[limit - 1]['sort'], "pit": pit_id}
+        elif pit_id:
+            await self._close_pit(pit_id)
+        response['hits']['hits'] = raw_hits[:limit]
+        return parse_hits(response), response['took'] / 1000, next_page
+
+    async def _open_pit(self):
+        client = get_opensearch_client()
+        response = await client.create_pit(index=INDEX_NAME, keep_alive=PIT_KEEP_ALIVE)
+        return response['pit_id']
+
+    async def _close_pit(self, pit_id):
+        client = get_opensearch_client()
+        try:
+            await client.delete_pit(body={"pit_id": [pit_id]})
+        except TransportError:
+            # Already expired; nothing to clean up
+            pass
+
+    async def lookup(self, kind, value, limit, filters=None):
+        client = get_opensearch_client()
+
+        if kind == 'az':
+            # az.ref holds one normalized token per Aktenzeichen
+            reference = {"match": {"az.ref": {"query": value, "operator": "and"}}}
+        else:
+            # The 'reference' normalizer is applied to the term as well
+            reference = {"term": {f"{kind}.ref": value}}
+
+        search_body = {
+            "size": limit,
+            # Pure filter context: no scoring, cached bitsets
+            "query": {"bool": {"filter": [reference] + filter_clauses(filters or {})}},
+            "_source": {"includes": SEARCH_SOURCE_FIELDS},
+            "highlight": highlight_config()
+        }
+
+        response = await client.search(index=INDEX_NAME, body=search_body)
+        return parse_hits(response), response['took'] / 1000
+
+    async def stats(self, query, filters, size):
+        client = get_opensearch_client()
+        response = await client.search(index=INDEX_NAME, body=stats_body(query, filters, size), request_cache=True)
+        return parse_stats(response), response['took'] / 1000
+
+    async def search_by_norm(self, keys, limit, filters=None):
+        client = get_opensearch_client()
+        search_body = {
+            "size": limit,
+            # Exact term lookups in filter context, no scoring needed
+            "query": {"bool": {"filter": [{"term": {"norm_keys": key}} for key in keys] + filter_clauses(filters or {})}},
+            "sort": [{"datum": {"order": "desc", "missing": "_last"}}],
+            "_source": {"includes": SEARCH_SOURCE_FIELDS}
+        }
+        response = await client.search(index=INDEX_NAME, body=search_body)
+        return parse_hits(response), response['took'] / 1000
+
+    async def search_passages(self, query, limit, filters=None):
+        client = get_opensearch_client()
+        clauses = filter_clauses(filters or {})
+        candidates = max(limit, PASSAGE_CANDIDATES)
+        # Model inference is CPU bound, keep it off the event loop
+        vector = (await asyncio.to_thread(get_embedder().embed, [query]))[0]
+
+        bm25 = {
+            "size": candidates,
+            "query": {"bool": {"must": {"match": {"text": query}}, "filter": clauses}}
+        }
+        knn = {
+            "size": candidates,
+            # Filtering inside the k-NN query keeps k results after the filter
+            "query": {"knn": {"embedding": {"vector": vector, "k": candidates, "filter": {"bool": {"filter": clauses}}}}}
+        }
+        header = {"index": PASSAGE_INDEX_NAME}
+        response = await client.msearch(body=[header, bm25, header, knn])
+        bm25_response, knn_response = response['responses']
+        for part in (bm25_response, knn_response):
+            if 'error' in part:
+                raise RuntimeError(f"Passage search failed: {part['error']}")
+
+        hits = fuse_scores(bm25_response['hits']['hits'], knn_response['hits']['hits'], PASSAGE_VECTOR_WEIGHT)
+        took = max(bm25_response['took'], knn_response['took']) / 1000
+        return hits[:limit], took
+
+    async def get(self, doknr):
+        client = get_opensearch_client()
+        try:
+            # ingest.py uses the DokNr as document _id, so a real-time GET is enough
+            response = await client.get(index=INDEX_NAME, id=doknr, _source_excludes=INTERNAL_FIELDS)
+        except NotFoundError:
+            return None
+        return response['_source']
+
+    async def get_fields(self, doknr, fields):
+        client = get_opensearch_client()
+        try:
+            # Only the requested sections travel over the wire, not full_text
+            response = await client.get(index=INDEX_NAME, id=doknr, _source_includes=list(fields) + ['randnummern'])
+        except NotFoundError:
+            return None
+        return response['_source']
+
+    async def mget(self, doknrs):
+        client = get_opensearch_client()
+        response = await client.mget(index=INDEX_NAME, body={"ids": doknrs}, _source_excludes=INTERNAL_FIELDS)
+        return [(doc['_id'], doc['_source'] if doc.get('found') else None) for doc in response['docs']]
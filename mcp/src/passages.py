@@ -0,0 +1,157 @@
+import re
+import bisect
+from documents import SECTION_FIELDS
+
+# Randnummern (margin numbers) of decisions: splitting into passages for the
+# passage index and slicing of Rn ranges for get_decision_passage. xml_to_md
+# renders them as "**12** " at the start of a paragraph and stores their
+# offsets per section in the 'randnummern' metadata. Sections without
+# Randnummern are cut into paragraph chunks.
+
+RN_RE = re.compile(r'^\*\*(\d+)\*\* ', re.MULTILINE)
+# Upper bound for passages cut from sections without Randnummern
+PASSAGE_MAX_CHARS = 2000
+# Decision fields copied into every passage, for display and filtering
+PASSAGE_METADATA_FIELDS = ['title', 'az', 'gericht', 'spruchkoerper', 'datum']
+
+def find_randnummern(text):
+    """
+    Return [[rn, start, end], ...] of the Randnummern in a section, same
+    rule as xml_to_md.randnummer_offsets: nested lists (e.g. quoted
+    passages) restart their numbering, so only increasing numbers are taken
+    as Randnummern of the section itself.
+    """
+    found = []
+    last = 0
+    for match in RN_RE.finditer(text):
+        rn = int(match.group(1))
+        if rn > last:
+            if found:
+                found[-1][2] = match.start()
+            found.append([rn, match.start(), len(text)])
+            last = rn
+    return found
+
+def section_randnummern(doc, section):
+    """The precomputed offsets of a section, scanning only documents converted before they existed."""
+    precomputed = doc.get('randnummern')
+    if precomputed is not None:
+        return precomputed.get(section, [])
+    return find_randnummern(doc.get(section) or '')
+
+def chunk_paragraphs(text, max_chars=PASSAGE_MAX_CHARS):
+    chunk = []
+    size = 0
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if chunk and size + len(paragraph) > max_chars:
+            yield "\n\n".join(chunk)
+            chunk = []
+            size = 0
+        chunk.append(paragraph)
+        size += len(paragraph) + 2
+    if chunk:
+        yield "\n\n".join(chunk)
+
+def split_section(text, randnummern):
+    """Yield (rn, passage text) for one section; rn is None for text outside Randnummern."""
+    if not randnummern:
+        for chunk in chunk_paragraphs(text):
+            yield None, chunk
+        return
+    intro = text[:randnummern[0][1]].strip()
+    if intro:
+        yield None, intro
+    for rn, start, end in randnummern:
+        passage = text[start:end].strip()
+        if passage:
+            yield rn, passage
+
+def split_passages(doc):
+    """
+    Split a document (as built by ingest.build_document) into passage
+    documents with the parent DokNr, section and Randnummer.
+    """
+    metadata = {field: doc.get(field) for field in PASSAGE_METADATA_FIELDS if doc.get(field)}
+    passages = []
+    for section in SECTION_FIELDS:
+        content = doc.get(section)
+        if not content:
+            continue
+        for rn, text in split_section(content, section_randnummern(doc, section)):
+            passages.append({'doknr': doc.get('doknr'), 'section': section, 'rn': rn, 'text': text, **metadata})
+    return passages
+
+def select_spans(doc, sections, rn_from=None, rn_to=None):
+    """
+    Return [(section, start, end, randnummern)] for the requested sections,
+    narrowed to the Randnummern rn_from..rn_to (inclusive) if given.
+    Sections without text or without Randnummern in the range are left out.
+    """
+    spans = []
+    for section in sections:
+        text = doc.get(section)
+        if not text:
+            continue
+        randnummern = section_randnummern(doc, section)
+        if rn_from is None and rn_to is None:
+            spans.append((section, 0, len(text), randnummern))
+            continue
+        numbers = [rn for rn, _, _ in randnummern]
+        lo = bisect.bisect_left(numbers, rn_from) if rn_from is not None else 0
+        hi = bisect.bisect_right(numbers, rn_to) if rn_to is not None else len(numbers)
+        if lo < hi:
+            spans.append((section, randnummern[lo][1], randnummern[hi - 1][2], randnummern[lo:hi]))
+    return spans
+
+def cut_position(text, randnummern, start, limit):
+    """
+    Where to end a page that starts at start and may reach up to limit:
+    at the last Randnummer boundary, else the last paragraph break, else
+    at limit itself.
+    """
+    starts = [offset for _, offset, _ in randnummern]
+    i = bisect.bisect_right(starts, limit) - 1
+    if i >= 0 and starts[i] > start:
+        return starts[i]
+    paragraph = text.rfind('\n\n', start + 1, limit)
+    if paragraph > start:
+        return paragraph
+    return limit
+
+def read_spans(doc, spans, position, max_chars):
+    """
+    Collect the text of the spans from position (section, offset) on, up to
+    about max_chars characters. Returns (parts, next position or None).
+    Each part has its section, the Randnummern it covers and the text.
+    """
+    parts = []
+    budget = max_chars
+    started = position is None
+    for section, start, end, randnummern in spans:
+        if not started:
+            if section != position[0]:
+                continue
+            started = True
+            start = max(start, min(position[1], end))
+        if start >= end:
+            continue
+        if budget <= 0:
+            return parts, (section, start)
+        text = doc[section]
+        stop = end
+        if end - start > budget:
+            stop = cut_position(text, randnummern, start, start + budget)
+        covered = [rn for rn, offset, _ in randnummern if start <= offset < stop]
+        parts.append({
+            'section': section,
+            'rn_from': covered[0] if covered else None,
+            'rn_to': covered[-1] if covered else None,
+            'text': text[start:stop].strip()
+        })
+        budget -= stop - start
+        if stop < end:
+            return parts, (section, stop)
+    return parts, None
@@ -0,0 +1,48 @@
+import re
+
+# Detection and normalization of references (Aktenzeichen, ECLI, DokNr) in
+# search queries. A reference is looked up exactly instead of running the
+# full-text search; ingest.py builds the matching normalized fields.
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Separator between several Aktenzeichen of one decision ("IX ZB 72/08, IX ZB 73/08")
+AZ_SEPARATOR_RE = re.compile(r'[,;]')
+
+ECLI_RE = re.compile(r'ECLI:[A-Z]{2}:[A-Z0-9.]+:\d{4}:[A-Z0-9.]*[A-Z0-9]', re.IGNORECASE)
+DOKNR_RE = re.compile(r'[A-Z]{4}\d{6,12}', re.IGNORECASE)
+# Aktenzeichen of the federal courts, e.g. 'IX ZB 72/08', '1 BvR 123/20',
+# '10 C 5.19', 'B 14 AS 1/20 R', '35 W (pat) 1/20'
+AZ_RE = re.compile(
+    r'(?:(?:[IVX]+[a-z]?|\d{1,3}|B\s*\d{1,2})\s*)?'
+    r'[A-ZÄÖÜ]{1,6}(?:\s*\([A-Z]+\))?\s*'
+    r'\d{1,5}\s*[/.]\s*\d{2,4}'
+    r'(?:\s*[A-Z]{1,2})?',
+    re.IGNORECASE
+)
+
+def normalize_reference(value):
+    """Case and whitespace insensitive form, same as the 'reference' normalizer in ingest.create_index."""
+    return WHITESPACE_RE.sub('', value).lower()
+
+def split_references(az):
+    """The normalized Aktenzeichen of a decision; the az field may list several."""
+    refs = (normalize_reference(part) for part in AZ_SEPARATOR_RE.split(az or ''))
+    return [ref for ref in refs if ref]
+
+def detect_reference(query):
+    """
+    Return (kind, value, court) if the query is a single reference, with
+    kind 'ecli', 'doknr' or 'az', otherwise None. A court name in front of
+    an Aktenzeichen ('BGH IX ZB 72/08') is returned as court.
+    """
+    query = query.strip()
+    if ECLI_RE.fullmatch(query):
+        return 'ecli', query, None
+    if DOKNR_RE.fullmatch(query):
+        return 'doknr', query, None
+    if AZ_RE.fullmatch(query):
+        return 'az', query, None
+    parts = query.split(None, 1)
+    if len(parts) == 2 and parts[0].isalpha() and len(parts[0]) >= 3 and AZ_RE.fullmatch(parts[1]):
+        return 'az', parts[1], parts[0]
+    return None
@@ -1,129 +1,626 @@
 import os
 import json
+import time
+import base64
+import hashlib
 from mcp.server.fastmcp import FastMCP
-from opensearchpy import OpenSearch
+from starlette.responses import JSONResponse, Response
+from backend import get_backend, build_filters
+from cache import SearchCache, normalize_query
+from documents import SECTION_FIELDS, PASSAGE_SOURCE_FIELDS, with_full_text
+from passages import select_spans, read_spans
+from references import detect_reference
+import citations
+import facets
+from norms import query_norm_keys
+import metrics
 
-# Configuration
-OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST', 'localhost')
-OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT', 9200))
-OPENSEARCH_USER = os.environ.get('OPENSEARCH_USER', 'admin')
-OPENSEARCH_PASSWORD = os.environ.get('OPENSEARCH_PASSWORD', 'ComplexPassword123!')
-INDEX_NAME = 'court-decisions'
+# Configuration (connection settings live in the backend modules)
+# Search result cache (set SEARCH_CACHE_TTL=0 to disable)
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 1000))
+SEARCH_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 600))
+# How often (seconds) to check whether the index has been rebuilt
+SEARCH_CACHE_GENERATION_CHECK = int(os.environ.get('SEARCH_CACHE_GENERATION_CHECK', 30))
+# Characters of decision text returned per get_decision_passage call
+PASSAGE_PAGE_CHARS = int(os.environ.get('PASSAGE_PAGE_CHARS', 8000))
+# Largest limit of the search tools; search_decisions pages with cursors beyond it
+MAX_SEARCH_LIMIT = int(os.environ.get('MAX_SEARCH_LIMIT', 100))
 
 # Initialize FastMCP
 mcp = FastMCP("court-decisions-mcp", stateless_http=True, host='0.0.0.0', port=8002, debug=True)
 
-def get_opensearch_client():
-    return OpenSearch(
-        hosts=[{'host': OPENSEARCH_HOST, 'port': OPENSEARCH_PORT, 'scheme': 'https'}],
-        http_compress=True,
-        http_auth=(OPENSEARCH_USER, OPENSEARCH_PASSWORD),
-        use_ssl=True,
-        verify_certs=False,
-        ssl_assert_hostname=False,
-        ssl_show_warn=False
-    )
+# OpenSearch or SQLite, see backend.SEARCH_BACKEND
+backend = get_backend()
+
+search_cache = SearchCache(
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    ttl=SEARCH_CACHE_TTL
+)
+_generation_checked_at = 0.0
+
+# Load the citation graph at startup rather than on the first tool call
+try:
+    citations.get_graph()
+except Exception as e:
+    print(f"Warning: Could not load citation graph ({e}).")
+
+def invalid_limit(limit):
+    """Error message for a limit outside 1..MAX_SEARCH_LIMIT, otherwise None."""
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        return f"limit must be between 1 and {MAX_SEARCH_LIMIT}."
+    return None
+
+async def refresh_index_info():
+    """
+    Flush the search cache when the index has been rebuilt, i.e. when the
+    backend reports a new generation. It is only looked up every
+    SEARCH_CACHE_GENERATION_CHECK seconds.
+    """
+    global _generation_checked_at
+    now = time.monotonic()
+    if now - _generation_checked_at < SEARCH_CACHE_GENERATION_CHECK:
+        return
+    generation = await backend.generation()
+    if generation is None:
+        # Leave the cache alone; the search itself will surface the error
+        return
+    _generation_checked_at = now
+    search_cache.check_generation(generation)
+
+def cached_result(cache_key):
+    """Look up a rendered result, counting hits and misses only while the cache is enabled."""
+    if cache_key is None or not search_cache.enabled:
+        return None
+    cached = search_cache.get(cache_key)
+    metrics.SEARCH_CACHE.labels('miss' if cached is None else 'hit').inc()
+    return cached
+
+@mcp.custom_route("/cache-stats", methods=["GET"])
+async def cache_stats(request):
+    """Hit/miss counters and size of the search result cache."""
+    return JSONResponse(search_cache.stats())
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request):
+    """Tool latencies, stage timings, payload sizes and errors in Prometheus format."""
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+def format_hit(hit):
+    """Turn a backend hit into the compact result entry returned by search_decisions."""
+    source = hit['source']
+    
+    # Highlighted fragments per section, in document order
+    snippets = {}
+    for field in ['full_text'] + SECTION_FIELDS:
+        if hit['snippets'].get(field):
+            snippets[field] = "... " + " ... ".join(hit['snippets'][field]) + " ..."
+    
+    return {
+        "title": source.get('title', 'No Title'),
+        "az": source.get('az', 'N/A'),
+        "gericht": source.get('gericht', 'N/A'),
+        "normen": source.get('normen', 'N/A'),
+        "doknr": source.get('doknr', 'N/A'),
+        "date": source.get('datum', 'N/A'),
+        "score": hit['score'],
+        "snippets": snippets
+    }
+
+def query_fingerprint(query, filters):
+    data = json.dumps([normalize_query(query), sorted(filters.items())], ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=8).hexdigest()
+
+def encode_cursor(query, filters, page):
+    """Opaque cursor for the next page, bound to the query and filters it was issued for."""
+    data = json.dumps({"q": query_fingerprint(query, filters), "p": page}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, query, filters):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        fingerprint, page = data['q'], data['p']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor.")
+    if fingerprint != query_fingerprint(query, filters):
+        raise ValueError("The cursor belongs to another query, repeat the query and filters it was returned for.")
+    return page
 
 @mcp.tool()
-def search_decisions(query: str, limit: int = 10) -> str:
+@metrics.instrumented('search_decisions')
+async def search_decisions(
+    query: str,
+    limit: int = 10,
+    gericht: str | None = None,
+    spruchkoerper: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    doknr_prefix: str | None = None,
+    cursor: str | None = None
+) -> str:
     """Search for German court decisions by text or metadata.
     
+    Use the filters to restrict the search by court or date instead of
+    putting e.g. 'BGH 2019' into the query. With filters, query may be empty.
+    If there are more results, the response has a 'next_cursor': call again
+    with the same query and filters plus that cursor for the next page
+    instead of raising the limit.
+    
     Args:
         query: The search query (e.g. 'Insolvenzverfahren', 'BGH IX ZB 72/08').
         limit: Number of results to return (default 10).
+        gericht: Only decisions of this court (e.g. 'BGH', 'BVerwG', 'BFH').
+        spruchkoerper: Only decisions of this panel (e.g. '9. Zivilsenat').
+        date_from: Only decisions from this date on (YYYY, YYYY-MM or YYYY-MM-DD).
+        date_to: Only decisions up to this date (YYYY, YYYY-MM or YYYY-MM-DD, inclusive).
+        doknr_prefix: Only decisions whose DokNr starts with this prefix (e.g. 'KORE').
+        cursor: The 'next_cursor' of the previous page.
     """
-    client = get_opensearch_client()
-    
-    # Simple multi-match query
-    search_body = {
-        "size": limit,
-        "query": {
-            "multi_match": {
-                "query": query,
-                "fields": [
-                    "title^2", "leitsatz^2", "full_text", 
-                    "az", "doknr", "normen"
-                ]
-            }
-        },
-        "highlight": {
-            "fields": {
-                "full_text": {}
-            }
-        }
-    }
+    error = invalid_limit(limit)
+    if error:
+        return error
+    try:
+        filters = build_filters(gericht, spruchkoerper, date_from, date_to, doknr_prefix)
+    except ValueError as e:
+        return f"Invalid filter: {e}"
+    if not query.strip() and not filters:
+        return "No query given."
+    page = None
+    if cursor:
+        try:
+            page = decode_cursor(cursor, query, filters)
+        except ValueError as e:
+            return str(e)
+
+    await refresh_index_info()
+    # Only first pages are cached; their cursors do not refer to a point in time
+    cache_key = SearchCache.make_key(query, limit, **filters) if page is None else None
+    cached = cached_result(cache_key)
+    if cached is not None:
+        return cached
     
     try:
-        response = client.search(index=INDEX_NAME, body=search_body)
-        hits = response['hits']['hits']
+        hits = []
+        next_page = None
+        reference = detect_reference(query) if page is None else None
+        if reference is not None:
+            # Aktenzeichen, ECLI or DokNr: exact lookup on the normalized reference fields
+            kind, value, court = reference
+            lookup_filters = dict(filters)
+            if court and 'gericht' not in lookup_filters:
+                lookup_filters['gericht'] = court
+            start = time.perf_counter()
+            hits, took = await backend.lookup(kind, value, limit, lookup_filters)
+            metrics.observe_backend('search_decisions', time.perf_counter() - start, took)
+            metrics.REFERENCE_LOOKUPS.labels(kind, 'hit' if hits else 'miss').inc()
+
+        if not hits:
+            # Full-text search, also the fallback if a reference lookup found nothing
+            start = time.perf_counter()
+            hits, took, next_page = await backend.search(query, limit, filters, page)
+            metrics.observe_backend('search_decisions', time.perf_counter() - start, took)
+        metrics.SEARCH_HITS.observe(len(hits))
         
-        results_list = []
-        for hit in hits:
-            source = hit['_source']
-            score = hit['_score']
-            title = source.get('title', 'No Title')
-            az = source.get('az', 'N/A')
-            doknr = source.get('doknr', 'N/A')
-            datum = source.get('datum', 'N/A')
-            gericht = source.get('gericht', 'N/A')
-            normen = source.get('normen', 'N/A')
-            
-            # Get highlight if available
-            snippet = ""
-            if 'highlight' in hit and 'full_text' in hit['highlight']:
-                snippet = "... " + " ... ".join(hit['highlight']['full_text']) + " ..."
-            else:
-                snippet = source.get('full_text', '')[:200] + "..."
-            
-            results_list.append({
-                "title": title,
-                "az": az,
-                "gericht": gericht,
-                "normen": normen,
-                "doknr": doknr,
-                "date": datum,
-                "score": score,
-                "snippet": snippet
-            })
+        with metrics.stage('search_decisions', 'postprocess'):
+            response = {"results": [format_hit(hit) for hit in hits]}
+            if next_page is not None:
+                response["next_cursor"] = encode_cursor(query, filters, next_page)
         
-        if not results_list:
-            return "No results found."
+        with metrics.stage('search_decisions', 'serialize'):
+            if not hits:
+                result = "No results found." if page is None else "No more results."
+            else:
+                result = json.dumps(response, ensure_ascii=False, indent=2)
 
-        return json.dumps(results_list, ensure_ascii=False, indent=2)
+        if cache_key:
+            search_cache.put(cache_key, result)
+        return result
         
     except Exception as e:
-        return f"Error searching OpenSearch: {str(e)}"
+        metrics.record_error('search_decisions', e)
+        return f"Error searching {backend.name}: {str(e)}"
+
+@mcp.tool()
+@metrics.instrumented('search_by_norm')
+async def search_by_norm(
+    norm: str,
+    limit: int = 10,
+    gericht: str | None = None,
+    spruchkoerper: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None
+) -> str:
+    """Find decisions applying a statute, newest first.
+    
+    Exact lookup on the normalized norms of each decision, much more precise
+    than putting '§ 823 BGB' into search_decisions. A norm without Absatz
+    also finds decisions citing one of its Absätze. Several norms
+    (comma-separated) must all be cited.
+    
+    Args:
+        norm: The norm(s), e.g. '§ 823 Abs 1 BGB', 'Art 3 GG' or '§§ 280, 281 BGB'.
+        limit: Number of results to return (default 10).
+        gericht: Only decisions of this court (e.g. 'BGH').
+        spruchkoerper: Only decisions of this panel (e.g. '6. Zivilsenat').
+        date_from: Only decisions from this date on (YYYY, YYYY-MM or YYYY-MM-DD).
+        date_to: Only decisions up to this date (YYYY, YYYY-MM or YYYY-MM-DD, inclusive).
+    """
+    error = invalid_limit(limit)
+    if error:
+        return error
+    keys = query_norm_keys(norm)
+    if not keys:
+        return f"Could not parse the norm '{norm}', use a form like '§ 823 Abs 1 BGB' or 'Art 3 GG'."
+    try:
+        filters = build_filters(gericht, spruchkoerper, date_from, date_to)
+    except ValueError as e:
+        return f"Invalid filter: {e}"
+
+    await refresh_index_info()
+    cache_key = SearchCache.make_key(' '.join(keys), limit, tool='search_by_norm', **filters)
+    cached = cached_result(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        start = time.perf_counter()
+        hits, took = await backend.search_by_norm(keys, limit, filters)
+        metrics.observe_backend('search_by_norm', time.perf_counter() - start, took)
+
+        with metrics.stage('search_by_norm', 'serialize'):
+            if not hits:
+                result = f"No decisions found citing {', '.join(keys)}."
+            else:
+                result = json.dumps({"results": [format_hit(hit) for hit in hits]}, ensure_ascii=False, indent=2)
+
+        search_cache.put(cache_key, result)
+        return result
+
+    except Exception as e:
+        metrics.record_error('search_by_norm', e)
+        return f"Error searching {backend.name}: {str(e)}"
+
+@mcp.tool()
+@metrics.instrumented('decision_stats')
+async def decision_stats(
+    query: str = '',
+    gericht: str | None = None,
+    spruchkoerper: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    doknr_prefix: str | None = None,
+    size: int = 10
+) -> str:
+    """Count decisions by court, panel (Spruchkörper) and year.
+    
+    Answers questions like 'how many BGH decisions on X per year' in one
+    call instead of many searches. Without query and filters, the counts
+    cover the whole database.
+    
+    Args:
+        query: Optional search query the counted decisions must match (e.g. 'Mietminderung').
+        gericht: Only count decisions of this court (e.g. 'BGH').
+        spruchkoerper: Only count decisions of this panel (e.g. '8. Zivilsenat').
+        date_from: Only count decisions from this date on (YYYY, YYYY-MM or YYYY-MM-DD).
+        date_to: Only count decisions up to this date (YYYY, YYYY-MM or YYYY-MM-DD, inclusive).
+        doknr_prefix: Only count decisions whose DokNr starts with this prefix.
+        size: Number of courts and panels to list, largest first (default 10). Years are always complete.
+    """
+    try:
+        filters = build_filters(gericht, spruchkoerper, date_from, date_to, doknr_prefix)
+    except ValueError as e:
+        return f"Invalid filter: {e}"
+    size = max(1, size)
+
+    await refresh_index_info()
+    if not query.strip() and not filters:
+        # Corpus-wide counts are precomputed by ingest.py for the live generation
+        precomputed = facets.load_facets()
+        if (precomputed is not None and size <= precomputed['size'] and
+                search_cache.generation is not None and precomputed['generation'] == search_cache.generation):
+            metrics.DECISION_STATS.labels('precomputed').inc()
+            with metrics.stage('decision_stats', 'serialize'):
+                return json.dumps(facets.trim_stats(precomputed['stats'], size), ensure_ascii=False, indent=2)
+
+    cache_key = SearchCache.make_key(query, size, tool='decision_stats', **filters)
+    cached = cached_result(cache_key)
+    if cached is not None:
+        metrics.DECISION_STATS.labels('cache').inc()
+        return cached
+
+    try:
+        start = time.perf_counter()
+        stats, took = await backend.stats(query, filters, size)
+        metrics.observe_backend('decision_stats', time.perf_counter() - start, took)
+        metrics.DECISION_STATS.labels('backend').inc()
+        with metrics.stage('decision_stats', 'serialize'):
+            result = json.dumps(stats, ensure_ascii=False, indent=2)
+        search_cache.put(cache_key, result)
+        return result
+
+    except Exception as e:
+        metrics.record_error('decision_stats', e)
+        return f"Error computing statistics in {backend.name}: {str(e)}"
+
+def format_passage(hit):
+    """Result entry of search_passages: the passage text with its position in the decision."""
+    source = hit['source']
+    return {
+        "doknr": source.get('doknr', 'N/A'),
+        "az": source.get('az', 'N/A'),
+        "gericht": source.get('gericht', 'N/A'),
+        "date": source.get('datum', 'N/A'),
+        "section": source.get('section'),
+        "rn": source.get('rn'),
+        "score": round(hit['score'], 4),
+        "text": source.get('text', '')
+    }
+
+@mcp.tool()
+@metrics.instrumented('search_passages')
+async def search_passages(
+    query: str,
+    limit: int = 5,
+    gericht: str | None = None,
+    spruchkoerper: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    doknr_prefix: str | None = None
+) -> str:
+    """Search for the most relevant paragraphs (Randnummern) across all decisions.
+    
+    Combines keyword and semantic search and returns the matching passages
+    with DokNr, section and Randnummer, so a question can often be answered
+    without loading whole decisions. Filters work like in search_decisions.
+    
+    Args:
+        query: A question or legal statement (e.g. 'Wann beginnt die Verjährung bei Mängeln?').
+        limit: Number of passages to return (default 5).
+        gericht: Only passages from decisions of this court (e.g. 'BGH').
+        spruchkoerper: Only passages from decisions of this panel.
+        date_from: Only decisions from this date on (YYYY, YYYY-MM or YYYY-MM-DD).
+        date_to: Only decisions up to this date (YYYY, YYYY-MM or YYYY-MM-DD, inclusive).
+        doknr_prefix: Only decisions whose DokNr starts with this prefix.
+    """
+    error = invalid_limit(limit)
+    if error:
+        return error
+    try:
+        filters = build_filters(gericht, spruchkoerper, date_from, date_to, doknr_prefix)
+    except ValueError as e:
+        return f"Invalid filter: {e}"
+    if not query.strip():
+        return "No query given."
+
+    await refresh_index_info()
+    cache_key = SearchCache.make_key(query, limit, tool='search_passages', **filters)
+    cached = cached_result(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        start = time.perf_counter()
+        hits, took = await backend.search_passages(query, limit, filters)
+        metrics.observe_backend('search_passages', time.perf_counter() - start, took)
+
+        with metrics.stage('search_passages', 'serialize'):
+            if not hits:
+                result = "No passages found."
+            else:
+                result = json.dumps({"results": [format_passage(hit) for hit in hits]}, ensure_ascii=False, indent=2)
+
+        search_cache.put(cache_key, result)
+        return result
+
+    except NotImplementedError:
+        return f"Passage search is not supported by the {backend.name} backend."
+    except Exception as e:
+        metrics.record_error('search_passages', e)
+        return f"Error searching passages in {backend.name}: {str(e)}"
 
 @mcp.tool()
-def get_decision_by_doknr(doknr: str) -> str:
+@metrics.instrumented('get_decision_by_doknr')
+async def get_decision_by_doknr(doknr: str) -> str:
     """Get the full text of a court decision by its document number (DokNr).
     
     Args:
         doknr: The document number (e.g. 'KARE600052872').
     """
-    client = get_opensearch_client()
+    try:
+        start = time.perf_counter()
+        source = await backend.get(doknr)
+        metrics.observe_backend('get_decision_by_doknr', time.perf_counter() - start, None)
+        if source is None:
+            return f"No decision found with DokNr: {doknr}"
+        with metrics.stage('get_decision_by_doknr', 'serialize'):
+            return json.dumps(with_full_text(source), ensure_ascii=False, indent=2)
+        
+    except Exception as e:
+        metrics.record_error('get_decision_by_doknr', e)
+        return f"Error retrieving decision: {str(e)}"
+
+def parse_passage_cursor(cursor):
+    """Cursors are '<section>:<offset>' as produced by get_decision_passage."""
+    section, _, offset = cursor.rpartition(':')
+    if section not in SECTION_FIELDS or not offset.isdigit():
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+    return section, int(offset)
+
+@mcp.tool()
+@metrics.instrumented('get_decision_passage')
+async def get_decision_passage(
+    doknr: str,
+    sections: list[str] | None = None,
+    rn_from: int | None = None,
+    rn_to: int | None = None,
+    cursor: str | None = None,
+    max_chars: int = PASSAGE_PAGE_CHARS
+) -> str:
+    """Read part of a court decision: selected sections and/or a range of Randnummern.
+    
+    Prefer this over get_decision_by_doknr for long decisions, e.g. to read
+    Rn 12-25 of the Gründe found via search_passages. Long results are cut
+    at a Randnummer boundary and come with a 'next_cursor'; call again with
+    the same arguments plus that cursor to continue.
     
-    search_body = {
-        "query": {
-            "term": {
-                "doknr": doknr
-            }
+    Args:
+        doknr: The document number (e.g. 'KARE600052872').
+        sections: Sections to read, in document order (leitsatz, sonstosatz, tenor, tatbestand,
+            entscheidungsgruende, gruende, abwmeinung, sonstlt). Default: all.
+        rn_from: First Randnummer to read (inclusive).
+        rn_to: Last Randnummer to read (inclusive).
+        cursor: The 'next_cursor' of the previous call.
+        max_chars: Approximate maximum number of characters of text to return (default 8000).
+    """
+    sections = sections or SECTION_FIELDS
+    unknown = [section for section in sections if section not in SECTION_FIELDS]
+    if unknown:
+        return f"Unknown section(s): {', '.join(unknown)}. Valid sections: {', '.join(SECTION_FIELDS)}"
+    if rn_from is not None and rn_to is not None and rn_from > rn_to:
+        return "rn_from must not be greater than rn_to."
+    try:
+        position = parse_passage_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return str(e)
+    # Document order, whatever order the sections were given in
+    sections = [section for section in SECTION_FIELDS if section in sections]
+
+    try:
+        start = time.perf_counter()
+        source = await backend.get_fields(doknr, PASSAGE_SOURCE_FIELDS + sections)
+        metrics.observe_backend('get_decision_passage', time.perf_counter() - start, None)
+        if source is None:
+            return f"No decision found with DokNr: {doknr}"
+
+        with metrics.stage('get_decision_passage', 'postprocess'):
+            spans = select_spans(source, sections, rn_from, rn_to)
+            if not spans:
+                if rn_from is not None or rn_to is not None:
+                    return f"No Randnummern {rn_from or ''}-{rn_to or ''} in the requested sections of {doknr}."
+                return f"The requested sections are empty in {doknr}."
+            parts, next_position = read_spans(source, spans, position, max(max_chars, 1))
+
+        result = {
+            "doknr": source.get('doknr', doknr),
+            "title": source.get('title', 'No Title'),
+            "az": source.get('az', 'N/A'),
+            "gericht": source.get('gericht', 'N/A'),
+            "date": source.get('datum', 'N/A'),
+            "parts": parts
         }
-    }
+        if next_position is not None:
+            result["next_cursor"] = f"{next_position[0]}:{next_position[1]}"
+        with metrics.stage('get_decision_passage', 'serialize'):
+            return json.dumps(result, ensure_ascii=False, indent=2)
+
+    except Exception as e:
+        metrics.record_error('get_decision_passage', e)
+        return f"Error retrieving decision passage: {str(e)}"
+
+@mcp.tool()
+@metrics.instrumented('get_decisions_by_doknr')
+async def get_decisions_by_doknr(doknrs: list[str]) -> str:
+    """Get the full texts of several court decisions in a single request.
     
+    Prefer this over repeated get_decision_by_doknr calls when reading
+    multiple search results.
+    
+    Args:
+        doknrs: List of document numbers (e.g. ['KARE600052872', 'KVRE413181801']).
+    """
+    if not doknrs:
+        return "No DokNr given."
+
     try:
-        response = client.search(index=INDEX_NAME, body=search_body)
-        hits = response['hits']['hits']
+        decisions = []
+        missing = []
+        start = time.perf_counter()
+        found = await backend.mget(doknrs)
+        metrics.observe_backend('get_decisions_by_doknr', time.perf_counter() - start, None)
+        for found_doknr, source in found:
+            if source is not None:
+                decisions.append(with_full_text(source))
+            else:
+                missing.append(found_doknr)
         
-        if not hits:
-            return f"No decision found with DokNr: {doknr}"
+        if not decisions:
+            return f"No decisions found with DokNr: {', '.join(missing)}"
         
-        # Return the first match (should be unique)
-        source = hits[0]['_source']
-        return json.dumps(source, ensure_ascii=False, indent=2)
+        result = {"decisions": decisions}
+        if missing:
+            result["not_found"] = missing
+        with metrics.stage('get_decisions_by_doknr', 'serialize'):
+            return json.dumps(result, ensure_ascii=False, indent=2)
         
     except Exception as e:
-        return f"Error retrieving decision: {str(e)}"
+        metrics.record_error('get_decisions_by_doknr', e)
+        return f"Error retrieving decisions: {str(e)}"
+
+CITATION_GRAPH_MISSING = "The citation graph is not available yet (it is built by ingest.py)."
+
+@mcp.tool()
+@metrics.instrumented('get_citing_decisions')
+async def get_citing_decisions(doknr: str, limit: int = 50) -> str:
+    """List the decisions that cite a given decision (cited-by), newest first.
+    
+    Use this instead of full-text searches for the Aktenzeichen to trace how
+    a decision has been followed. Only citations by Aktenzeichen or ECLI of
+    decisions in the database are known.
+    
+    Args:
+        doknr: The document number of the cited decision (e.g. 'KARE600052872').
+        limit: Maximum number of citing decisions to return (default 50).
+    """
+    try:
+        graph = citations.get_graph()
+        if graph is None:
+            return CITATION_GRAPH_MISSING
+        citing = graph.cited_by(doknr)
+        if citing is None:
+            return f"No decision found with DokNr: {doknr}"
+        result = {
+            "doknr": doknr,
+            "total": len(citing),
+            "citing_decisions": [graph.node(i) for i in citing[:limit]]
+        }
+        with metrics.stage('get_citing_decisions', 'serialize'):
+            return json.dumps(result, ensure_ascii=False, indent=2)
+
+    except Exception as e:
+        metrics.record_error('get_citing_decisions', e)
+        return f"Error reading citation graph: {str(e)}"
+
+@mcp.tool()
+@metrics.instrumented('get_cited_decisions')
+async def get_cited_decisions(doknr: str) -> str:
+    """List the decisions cited by a given decision, newest first.
+    
+    Citations of decisions that are not in the database (or official
+    reports like 'BGHZ 154, 1') are listed as text under 'not_in_index'.
+    
+    Args:
+        doknr: The document number of the citing decision (e.g. 'KARE600052872').
+    """
+    try:
+        graph = citations.get_graph()
+        if graph is None:
+            return CITATION_GRAPH_MISSING
+        cited = graph.cites(doknr)
+        if cited is None:
+            return f"No decision found with DokNr: {doknr}"
+        result = {
+            "doknr": doknr,
+            "cited_decisions": [graph.node(i) for i in cited],
+            "not_in_index": graph.unresolved_citations(doknr)
+        }
+        with metrics.stage('get_cited_decisions', 'serialize'):
+            return json.dumps(result, ensure_ascii=False, indent=2)
+
+    except Exception as e:
+        metrics.record_error('get_cited_decisions', e)
+        return f"Error reading citation graph: {str(e)}"
 
 if __name__ == "__main__":
     mcp.run(transport="streamable-http")
\ No newline at end of file
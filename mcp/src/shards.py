@@ -0,0 +1,93 @@
+import os
+import sys
+import glob
+import gzip
+import json
+
+# Reading side of the sharded decision format written by
+# prepare_data/convert_all_to_md.py with OUTPUT_FORMAT=shards (see
+# prepare_data/shard_writer.py, which reads through this module too):
+#
+#   decisions-00000.jsonl.zst  blocks of JSON lines, each block an
+#                              independent zstd frame (.jsonl.gz: gzip member)
+#   decisions-00000.idx        one line per decision:
+#                              path, doknr, block offset, block length, line in block
+#
+# A line is {"path": ..., "metadata": ..., "markdown": ...}, metadata and
+# markdown being what the .json and .md file of the decision would contain.
+EXTENSIONS = ('.jsonl.zst', '.jsonl.gz')
+INDEX_EXTENSION = '.idx'
+
+def is_shard(name):
+    return name.endswith(EXTENSIONS)
+
+def decompressor(shard_path):
+    if shard_path.endswith('.jsonl.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading zstd shards requires the zstandard package (pip install zstandard).")
+        return zstandard.ZstdDecompressor().decompress
+    return gzip.decompress
+
+def index_path(shard_path):
+    for extension in EXTENSIONS:
+        if shard_path.endswith(extension):
+            return shard_path[:-len(extension)] + INDEX_EXTENSION
+    raise ValueError(f"{shard_path} is not a shard file.")
+
+def find_shards(root):
+    """Complete shards (with their index) below root, in name order."""
+    paths = []
+    for extension in EXTENSIONS:
+        paths.extend(glob.iglob(os.path.join(root, '**', '*' + extension), recursive=True))
+    return sorted(path for path in paths if os.path.exists(index_path(path)))
+
+def read_index(shard_path):
+    """Return [(path, doknr, offset, length, line)] of a shard."""
+    entries = []
+    with open(index_path(shard_path), 'r', encoding='utf-8') as f:
+        for row in f:
+            path, doknr, offset, length, line = row.rstrip('\n').split('\t')
+            entries.append((path, doknr, int(offset), int(length), int(line)))
+    return entries
+
+def read_block(f, offset, length, decompress):
+    f.seek(offset)
+    return decompress(f.read(length)).splitlines()
+
+def iter_lines(shard_path):
+    """Yield (path, doknr, raw JSON line) of a shard, reading it front to back."""
+    decompress = decompressor(shard_path)
+    block = None
+    lines = []
+    with open(shard_path, 'rb') as f:
+        for path, doknr, offset, length, line in read_index(shard_path):
+            if (offset, length) != block:
+                block = (offset, length)
+                lines = read_block(f, offset, length, decompress)
+            yield path, doknr, lines[line]
+
+def iter_records(shard_path):
+    for _, _, line in iter_lines(shard_path):
+        yield json.loads(line)
+
+def find_record(root, doknr):
+    """Return the record of a decision below root, or None."""
+    for shard_path in find_shards(root):
+        for path, entry_doknr, offset, length, line in read_index(shard_path):
+            if entry_doknr == doknr:
+                with open(shard_path, 'rb') as f:
+                    return json.loads(read_block(f, offset, length, decompressor(shard_path))[line])
+    return None
+
+if __name__ == "__main__":
+    # python shards.py <doknr>: print the Markdown of one decision
+    if len(sys.argv) != 2:
+        print("Usage: python shards.py <doknr>")
+        raise SystemExit(1)
+    record = find_record(os.environ.get('MARKDOWN_DIR', '../markdown'), sys.argv[1])
+    if record is None:
+        print(f"Decision {sys.argv[1]} not found.")
+        raise SystemExit(1)
+    print(record['markdown'])
@@ -0,0 +1,374 @@
+import os
+import re
+import json
+import asyncio
+import sqlite3
+import threading
+from backend import SearchBackend
+from documents import render_markdown, SEARCH_SOURCE_FIELDS, INTERNAL_FIELDS
+from references import normalize_reference, split_references
+
+# Embedded alternative to OpenSearch: a single SQLite file with an FTS5 index.
+# Written by ingest.py (SEARCH_BACKEND=sqlite), opened read-only by the server.
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(os.environ.get('MARKDOWN_DIR', '../markdown'), 'court-decisions.sqlite'))
+# Bytes of the database file the server memory-maps (shared between processes via the page cache)
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 1024 * 1024 * 1024))
+# Bump whenever the schema below changes; ingest.py then rebuilds the database
+SCHEMA_VERSION = 3
+
+# Columns of the FTS table and their BM25 weights, mirroring the OpenSearch
+# multi_match (title^2, leitsatz^2, full_text, az, doknr, normen)
+FTS_COLUMNS = ['title', 'leitsatz', 'full_text', 'az', 'doknr', 'normen']
+FTS_WEIGHTS = [2.0, 2.0, 1.0, 1.0, 1.0, 1.0]
+# Characters of the Leitsatz shown for hits without a snippet (filter-only searches, reference lookups)
+SNIPPET_FALLBACK_SIZE = 160
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    doknr TEXT UNIQUE,
+    source TEXT NOT NULL
+);
+-- Normalized references (see references.py) for exact Az/ECLI/DokNr lookups,
+-- and the norm keys (kind 'norm', see norms.py) for search_by_norm
+CREATE TABLE IF NOT EXISTS refs (
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_ref ON refs (kind, ref);
+CREATE INDEX IF NOT EXISTS refs_id ON refs (id);
+CREATE VIRTUAL TABLE IF NOT EXISTS decisions_fts USING fts5(
+    {', '.join(FTS_COLUMNS)},
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '4'
+);
+"""
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Common German stop words (subset of the list used by the OpenSearch german analyzer)
+GERMAN_STOPWORDS = frozenset("""
+aber alle allem allen aller alles als also am an ander andere anderem anderen anderer anderes
+auch auf aus bei bin bis bist da damit dann der den des dem die das dass daß du er sie es ein
+eine einem einen einer eines für fur gegen hat hatte hier ich ihr im in ist ja jede jedem jeden
+jeder jedes kann kein keine man mit nach nicht noch nun nur ob oder ohne sehr sein seine sich
+sind so soll über uber um und uns unter vom von vor war waren was weil wenn wer wie wir wird
+wurde zu zum zur zwischen
+""".split())
+
+UMLAUTS = str.maketrans({
+    'ä': 'a', 'à': 'a', 'á': 'a', 'â': 'a',
+    'ö': 'o', 'ò': 'o', 'ó': 'o', 'ô': 'o',
+    'ï': 'i', 'ì': 'i', 'í': 'i', 'î': 'i',
+    'ü': 'u', 'ù': 'u', 'ú': 'u', 'û': 'u',
+})
+
+ST_ENDING = frozenset('bdfghklmnt')
+
+def light_stem(word):
+    """
+    German light stemmer (the algorithm behind Lucene's GermanLightStemmer,
+    which the OpenSearch german analyzer uses). Expects a lowercase word.
+    """
+    s = word.translate(UMLAUTS)
+    # Step 1: inflection suffixes
+    n = len(s)
+    if n > 5 and s.endswith('ern'):
+        s = s[:-3]
+    elif n > 4 and s[-2:] in ('em', 'en', 'er', 'es'):
+        s = s[:-2]
+    elif n > 3 and s[-1] == 'e':
+        s = s[:-1]
+    elif n > 3 and s[-1] == 's' and s[-2] in ST_ENDING:
+        s = s[:-1]
+    # Step 2: comparison and verb suffixes
+    n = len(s)
+    if n > 5 and s.endswith('est'):
+        s = s[:-3]
+    elif n > 4 and s[-2:] in ('er', 'en'):
+        s = s[:-2]
+    elif n > 4 and s.endswith('st') and s[-3] in ST_ENDING:
+        s = s[:-2]
+    return s
+
+def build_match_query(query):
+    """
+    Turn a free-text query into an FTS5 MATCH expression. Words are combined
+    with OR (like multi_match); alphabetic words are stemmed and matched as
+    prefixes, so 'Insolvenzverfahren' also finds 'Insolvenzverfahrens'.
+    Returns None if nothing searchable is left.
+    """
+    terms = []
+    for word in WORD_RE.findall(query.lower()):
+        if word in GERMAN_STOPWORDS:
+            continue
+        if word.isalpha() and len(word) > 3:
+            terms.append(f'"{light_stem(word)}"*')
+        else:
+            terms.append(f'"{word}"')
+    if not terms:
+        return None
+    return " OR ".join(dict.fromkeys(terms))
+
+def connect(path, readonly=False):
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    else:
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+def schema_version(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def upsert_document(conn, doc):
+    """Insert a document built by ingest.build_document, replacing an older version with the same DokNr."""
+    if doc.get('doknr'):
+        delete_document(conn, doc['doknr'])
+    # full_text is only kept in the FTS table; compact-layout documents don't carry it
+    full_text = doc.get('full_text') or render_markdown(doc)
+    source = {k: v for k, v in doc.items() if k != 'full_text' and v is not None}
+    cursor = conn.execute(
+        "INSERT INTO decisions (doknr, source) VALUES (?, ?)",
+        (doc.get('doknr'), json.dumps(source, ensure_ascii=False))
+    )
+    values = [doc.get(column) for column in FTS_COLUMNS]
+    values[FTS_COLUMNS.index('full_text')] = full_text
+    conn.execute(
+        f"INSERT INTO decisions_fts (rowid, {', '.join(FTS_COLUMNS)}) VALUES (?, {', '.join('?' * len(FTS_COLUMNS))})",
+        [cursor.lastrowid] + values
+    )
+    refs = [('az', ref) for ref in split_references(doc.get('az'))]
+    refs += [(kind, normalize_reference(doc[kind])) for kind in ('ecli', 'doknr') if doc.get(kind)]
+    refs += [('norm', key) for key in doc.get('norm_keys') or []]
+    conn.executemany(
+        "INSERT INTO refs (kind, ref, id) VALUES (?, ?, ?)",
+        [(kind, ref, cursor.lastrowid) for kind, ref in refs]
+    )
+
+def delete_document(conn, doknr):
+    """Delete the document with the given DokNr. Returns False if there was none."""
+    row = conn.execute("SELECT id FROM decisions WHERE doknr = ?", (doknr,)).fetchone()
+    if row is None:
+        return False
+    conn.execute("DELETE FROM decisions_fts WHERE rowid = ?", row)
+    conn.execute("DELETE FROM refs WHERE id = ?", row)
+    conn.execute("DELETE FROM decisions WHERE id = ?", row)
+    return True
+
+def optimize(conn):
+    # Merge the FTS segments into one b-tree after a bulk load
+    conn.execute("INSERT INTO decisions_fts (decisions_fts) VALUES ('optimize')")
+
+def like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def filter_sql(filters):
+    """
+    Translate the filters from backend.build_filters into WHERE conditions
+    and parameters. LIKE without wildcards gives case-insensitive equality.
+    """
+    conditions = []
+    params = []
+    if 'gericht' in filters:
+        # gericht is "<gertyp> <gerort>", so 'BFH' also has to match 'BFH München'
+        conditions.append("(json_extract(decisions.source, '$.gericht') LIKE ? ESCAPE '\\' "
+                          "OR json_extract(decisions.source, '$.gericht') LIKE ? ESCAPE '\\')")
+        params += [like_escape(filters['gericht']), like_escape(filters['gericht']) + ' %']
+    if 'spruchkoerper' in filters:
+        conditions.append("json_extract(decisions.source, '$.spruchkoerper') LIKE ? ESCAPE '\\'")
+        params.append(like_escape(filters['spruchkoerper']))
+    if 'date_from' in filters:
+        conditions.append("json_extract(decisions.source, '$.datum') >= ?")
+        params.append(filters['date_from'])
+    if 'date_to' in filters:
+        conditions.append("json_extract(decisions.source, '$.datum') <= ?")
+        params.append(filters['date_to'])
+    if 'doknr_prefix' in filters:
+        conditions.append("decisions.doknr LIKE ? ESCAPE '\\'")
+        params.append(like_escape(filters['doknr_prefix']) + '%')
+    return conditions, params
+
+def make_hit(source, score, snippet):
+    source = json.loads(source)
+    # The FTS table has no per-section columns, so there is one snippet of the whole text
+    snippets = {'full_text': [snippet]} if snippet else {}
+    if not snippets and source.get('leitsatz'):
+        snippets = {'leitsatz': [source['leitsatz'][:SNIPPET_FALLBACK_SIZE]]}
+    return {
+        "source": {field: source[field] for field in SEARCH_SOURCE_FIELDS if field in source},
+        "score": score,
+        "snippets": snippets
+    }
+
+class SqliteBackend(SearchBackend):
+    name = 'SQLite'
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        # One read-only connection per worker thread, reopened when the file is replaced
+        self._local = threading.local()
+
+    def _file_generation(self):
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _connection(self):
+        generation = self._file_generation()
+        if getattr(self._local, 'generation', None) != generation:
+            if getattr(self._local, 'conn', None) is not None:
+                self._local.conn.close()
+            self._local.conn = connect(self.path, readonly=True)
+            self._local.generation = generation
+        return self._local.conn
+
+    async def generation(self):
+        try:
+            return list(self._file_generation())
+        except OSError:
+            return None
+
+    def _search(self, query, limit, filters, offset):
+        conditions, params = filter_sql(filters or {})
+        match = build_match_query(query)
+        if match is None:
+            if not conditions:
+                return [], None, None
+            # Filters only: no ranking, no snippets
+            rows = self._connection().execute(
+                f"""
+                SELECT source, 0.0, '' FROM decisions
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id
+                LIMIT ? OFFSET ?
+                """,
+                params + [limit + 1, offset]
+            ).fetchall()
+        else:
+            weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+            rows = self._connection().execute(
+                f"""
+                SELECT decisions.source,
+                       -bm25(decisions_fts, {weights}),
+                       snippet(decisions_fts, {FTS_COLUMNS.index('full_text')}, '<em>', '</em>', '', 32)
+                FROM decisions_fts JOIN decisions ON decisions.id = decisions_fts.rowid
+                WHERE {' AND '.join(['decisions_fts MATCH ?'] + conditions)}
+                ORDER BY bm25(decisions_fts, {weights})
+                LIMIT ? OFFSET ?
+                """,
+                [match] + params + [limit + 1, offset]
+            ).fetchall()
+        # Pages are plain offsets: skipping rows in-process is cheap compared to a round trip
+        next_page = {'offset': offset + limit} if len(rows) > limit else None
+        # In-process, there is no separate engine time
+        return [make_hit(*row) for row in rows[:limit]], None, next_page
+
+    def _lookup(self, kind, value, limit, filters):
+        conditions, params = filter_sql(filters or {})
+        rows = self._connection().execute(
+            f"""
+            SELECT DISTINCT decisions.source, 0.0, '' FROM refs
+            JOIN decisions ON decisions.id = refs.id
+            WHERE {' AND '.join(['refs.kind = ?', 'refs.ref = ?'] + conditions)}
+            LIMIT ?
+            """,
+            [kind, normalize_reference(value)] + params + [limit]
+        ).fetchall()
+        return [make_hit(*row) for row in rows], None
+
+    def _stats(self, query, filters, size):
+        conn = self._connection()
+        conditions, params = filter_sql(filters or {})
+        match = build_match_query(query)
+        if match is not None:
+            base = "FROM decisions_fts JOIN decisions ON decisions.id = decisions_fts.rowid"
+            conditions = ['decisions_fts MATCH ?'] + conditions
+            params = [match] + params
+        else:
+            base = "FROM decisions"
+
+        def grouped(expression, order, limit=-1):
+            where = ' AND '.join(conditions + [f"{expression} IS NOT NULL", f"{expression} != ''"])
+            return dict(conn.execute(
+                f"SELECT {expression} AS k, count(*) AS c {base} WHERE {where} GROUP BY k ORDER BY {order} LIMIT ?",
+                params + [limit]
+            ).fetchall())
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        total = conn.execute(f"SELECT count(*) {base} {where}", params).fetchone()[0]
+        return {
+            "total": total,
+            "gericht": grouped("json_extract(decisions.source, '$.gericht')", "c DESC, k", size),
+            "spruchkoerper": grouped("json_extract(decisions.source, '$.spruchkoerper')", "c DESC, k", size),
+            "jahr": grouped("substr(json_extract(decisions.source, '$.datum'), 1, 4)", "k")
+        }, None
+
+    def _search_by_norm(self, keys, limit, filters):
+        conditions, params = filter_sql(filters or {})
+        norm_conditions = ["decisions.id IN (SELECT id FROM refs WHERE kind = 'norm' AND ref = ?)"] * len(keys)
+        rows = self._connection().execute(
+            f"""
+            SELECT source, 0.0, '' FROM decisions
+            WHERE {' AND '.join(norm_conditions + conditions)}
+            ORDER BY json_extract(source, '$.datum') DESC
+            LIMIT ?
+            """,
+            list(keys) + params + [limit]
+        ).fetchall()
+        return [make_hit(*row) for row in rows], None
+
+    def _get_many(self, doknrs):
+        placeholders = ', '.join('?' * len(doknrs))
+        rows = self._connection().execute(
+            f"""
+            SELECT decisions.doknr, decisions.source, decisions_fts.full_text
+            FROM decisions JOIN decisions_fts ON decisions_fts.rowid = decisions.id
+            WHERE decisions.doknr IN ({placeholders})
+            """,
+            list(doknrs)
+        ).fetchall()
+        found = {}
+        for doknr, source, full_text in rows:
+            source = json.loads(source)
+            for field in INTERNAL_FIELDS:
+                source.pop(field, None)
+            found[doknr] = {**source, 'full_text': full_text}
+        return [(doknr, found.get(doknr)) for doknr in doknrs]
+
+    def _get_fields(self, doknr, fields):
+        # The sections are in the JSON source, no need to touch the FTS table
+        row = self._connection().execute("SELECT source FROM decisions WHERE doknr = ?", (doknr,)).fetchone()
+        if row is None:
+            return None
+        source = json.loads(row[0])
+        return {field: source[field] for field in list(fields) + ['randnummern'] if field in source}
+
+    async def search(self, query, limit, filters=None, page=None):
+        offset = page['offset'] if page else 0
+        return await asyncio.to_thread(self._search, query, limit, filters, offset)
+
+    async def lookup(self, kind, value, limit, filters=None):
+        return await asyncio.to_thread(self._lookup, kind, value, limit, filters)
+
+    async def stats(self, query, filters, size):
+        return await asyncio.to_thread(self._stats, query, filters, size)
+
+    async def search_by_norm(self, keys, limit, filters=None):
+        return await asyncio.to_thread(self._search_by_norm, keys, limit, filters)
+
+    async def get(self, doknr):
+        return (await asyncio.to_thread(self._get_many, [doknr]))[0][1]
+
+    async def get_fields(self, doknr, fields):
+        return await asyncio.to_thread(self._get_fields, doknr, fields)
+
+    async def mget(self, doknrs):
+        return await asyncio.to_thread(self._get_many, doknrs)
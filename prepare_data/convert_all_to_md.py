@@ -1,14 +1,20 @@
 import os
 import glob
+import shutil
 import json
 from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 from xml_to_md import convert_xml_to_md_text
+from worklist import load_worklist, folder_name
+import shard_writer
 
 EXTRACTED_DIR = "data/extracted"
 MARKDOWN_DIR = os.getenv("MARKDOWN_DIR", "../mcp/markdown")
 # Using ProcessPoolExecutor for CPU-bound XML parsing tasks
 MAX_WORKERS = os.cpu_count() or 4
+# 'files': a .md and a .json file per decision
+# 'shards': compressed JSON Lines shards with an offset index (see shard_writer.py)
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "files")
 
 def process_file(file_info):
     xml_path, md_path = file_info
@@ -32,14 +38,55 @@ def process_file(file_info):
     except Exception as e:
         return f"Error processing {xml_path}: {e}"
 
+def convert_file(file_info):
+    # OUTPUT_FORMAT=shards: the main process writes the shards
+    xml_path, md_path = file_info
+    try:
+        markdown_content, metadata = convert_xml_to_md_text(xml_path)
+        return os.path.relpath(md_path, MARKDOWN_DIR), metadata, markdown_content
+    except Exception as e:
+        return f"Error processing {xml_path}: {e}"
+
+def write_shards(executor, tasks, directory):
+    writer = shard_writer.ShardWriter(directory)
+    results = []
+    try:
+        for result in tqdm(executor.map(convert_file, tasks, chunksize=16), total=len(tasks), unit="file"):
+            if isinstance(result, str):
+                results.append(result)
+                continue
+            writer.add(*result)
+            results.append(True)
+    finally:
+        writer.close()
+    return results
+
 def main():
     if not os.path.exists(EXTRACTED_DIR):
         print(f"Error: '{EXTRACTED_DIR}' directory not found.")
         return
 
-    print(f"Scanning '{EXTRACTED_DIR}' for XML files...")
-    # Find all XML files recursively
-    xml_files = glob.glob(os.path.join(EXTRACTED_DIR, "**", "*.xml"), recursive=True)
+    shard_dir = os.path.join(MARKDOWN_DIR, shard_writer.SHARD_DIR_NAME)
+    worklist = load_worklist()
+    if worklist is not None:
+        # Sync mode: drop the output of removed and changed decisions, then
+        # convert only the folders of added and changed ones
+        for url in worklist['removed'] + worklist['changed']:
+            target_folder = os.path.join(MARKDOWN_DIR, folder_name(url))
+            if os.path.exists(target_folder):
+                shutil.rmtree(target_folder)
+        if OUTPUT_FORMAT == 'shards' and os.path.exists(shard_dir):
+            dropped = shard_writer.drop_folders(shard_dir, [folder_name(url) for url in worklist['removed'] + worklist['changed']])
+            print(f"Dropped {dropped} decisions from the shards.")
+        folders = [folder_name(url) for url in worklist['added'] + worklist['changed']]
+        print(f"Scanning {len(folders)} folders from the work list for XML files...")
+        xml_files = []
+        for folder in folders:
+            xml_files.extend(glob.glob(os.path.join(EXTRACTED_DIR, glob.escape(folder), "**", "*.xml"), recursive=True))
+    else:
+        print(f"Scanning '{EXTRACTED_DIR}' for XML files...")
+        # Find all XML files recursively
+        xml_files = glob.glob(os.path.join(EXTRACTED_DIR, "**", "*.xml"), recursive=True)
     
     if not xml_files:
         print("No XML files found.")
@@ -59,7 +106,19 @@ def main():
     print(f"Starting conversion with {MAX_WORKERS} processes...")
     
     with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        results = list(tqdm(executor.map(process_file, tasks), total=len(tasks), unit="file"))
+        if OUTPUT_FORMAT == 'shards' and worklist is not None:
+            # New shards after the existing ones
+            results = write_shards(executor, tasks, shard_dir)
+        elif OUTPUT_FORMAT == 'shards':
+            # Full run: build a new shard set and swap it in at the end. Hidden,
+            # so ingest and the citation graph never scan it next to the live set
+            tmp_dir = os.path.join(MARKDOWN_DIR, '.' + shard_writer.SHARD_DIR_NAME + '.tmp')
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+            results = write_shards(executor, tasks, tmp_dir)
+            shard_writer.replace_directory(tmp_dir, shard_dir)
+        else:
+            results = list(tqdm(executor.map(process_file, tasks), total=len(tasks), unit="file"))
 
     # Optional: Report errors
     errors = [r for r in results if r is not True]
@@ -1,76 +1,263 @@
 import os
+import sys
+import json
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
 from tqdm import tqdm
 from urllib.parse import urlparse
-import time
-import random
+from worklist import load_worklist, zip_name
 
-MAX_WORKERS = 5
-DOWNLOAD_DIR = "data/downloads"
-LINKS_FILE = "data/links.txt"
+DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "data/downloads")
+LINKS_FILE = os.getenv("LINKS_FILE", "data/links.txt")
+# ETag / Last-Modified of every downloaded file, used for conditional requests and resuming
+STATE_FILENAME = ".download-state.json"
+# Seconds between state saves while downloading
+STATE_SAVE_INTERVAL = 30
 MAX_RETRIES = 3
+# Concurrency adapts between MIN_WORKERS and MAX_WORKERS, starting at INITIAL_WORKERS
+MIN_WORKERS = 1
+INITIAL_WORKERS = 5
+MAX_WORKERS = int(os.getenv("DOWNLOAD_MAX_WORKERS", 16))
+# Response times (seconds until the headers arrive) above this count as a sign of overload
+TARGET_LATENCY = float(os.getenv("DOWNLOAD_TARGET_LATENCY", 2.0))
+TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to the server (AIMD): every fast, successful
+    response raises the limit by 1/limit, i.e. by one per full window, while
+    errors, 429/5xx responses and slow responses halve it.
+    """
+
+    def __init__(self, initial=INITIAL_WORKERS, minimum=MIN_WORKERS, maximum=MAX_WORKERS,
+                 target_latency=TARGET_LATENCY):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= int(self.limit):
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, latency=None, error=False):
+        with self._cond:
+            self.active -= 1
+            if error or (latency is not None and latency > 2 * self.target_latency):
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency is not None and latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+class DownloadState:
+    """Thread-safe persistent map of file name -> ETag, Last-Modified and completion flag."""
+
+    def __init__(self, download_dir):
+        self.path = os.path.join(download_dir, STATE_FILENAME)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._saved_at = time.monotonic()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                tqdm.write(f"[WARN] Could not read {self.path} ({e}), starting fresh")
+
+    def get(self, filename):
+        with self._lock:
+            return dict(self._entries.get(filename, {}))
+
+    def set(self, filename, entry):
+        with self._lock:
+            self._entries[filename] = entry
+            # Save now and then so partial downloads survive an interruption
+            if time.monotonic() - self._saved_at > STATE_SAVE_INTERVAL:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+def create_session(pool_size=MAX_WORKERS):
+    # One keep-alive connection pool shared by all download threads
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def validators(response):
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
 
-def download_url(url):
+def request_headers(filepath, part_path, entry):
+    """Conditional headers for a complete file, or Range headers to resume a partial one."""
+    headers = {}
+    if os.path.exists(part_path) and not entry.get('complete') and (entry.get('etag') or entry.get('last_modified')):
+        # Resume, but only if the file on the server is still the same (If-Range)
+        headers['Range'] = f"bytes={os.path.getsize(part_path)}-"
+        headers['If-Range'] = entry.get('etag') or entry['last_modified']
+    elif os.path.exists(filepath):
+        if entry.get('complete') and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('complete') and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        elif not entry:
+            # Downloaded before state was tracked, fall back to the file's mtime
+            headers['If-Modified-Since'] = formatdate(os.path.getmtime(filepath), usegmt=True)
+    return headers
+
+def retry_after(response, attempt):
+    value = response.headers.get('Retry-After') if response is not None else None
+    if value and value.isdigit():
+        return int(value)
+    return 2 ** attempt
+
+def download_url(url, session, state, limiter, download_dir=DOWNLOAD_DIR):
     if not url:
         return
-    
+
     parsed = urlparse(url)
     filename = os.path.basename(parsed.path)
     if not filename:
         filename = "unknown_file_" + str(hash(url))
-    
-    filepath = os.path.join(DOWNLOAD_DIR, filename)
-    
-    # Explicitly skip if the file already exists
-    if os.path.exists(filepath):
-        tqdm.write(f"[SKIP] {filename} already exists")
-        return "skipped"
-
-    # Rate limiting sleep
-    time.sleep(random.uniform(0.5, 1.5))
-    tqdm.write(f"[START] Downloading {filename}...")
+
+    filepath = os.path.join(download_dir, filename)
+    part_path = filepath + ".part"
 
     for attempt in range(MAX_RETRIES):
+        entry = state.get(filename)
+        headers = request_headers(filepath, part_path, entry)
+        limiter.acquire()
+        error = True
+        latency = None
+        response = None
+        backoff = None
         try:
-            response = requests.get(url, stream=True, timeout=30)
+            start = time.monotonic()
+            response = session.get(url, headers=headers, stream=True, timeout=TIMEOUT)
+            latency = time.monotonic() - start
+
+            if response.status_code == 304:
+                error = False
+                tqdm.write(f"[SKIP] {filename} not modified")
+                return "not_modified"
+            if response.status_code == 416:
+                # Range no longer satisfiable, start over
+                os.remove(part_path)
+                error = False
+                continue
             response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+
+            if response.status_code == 206:
+                tqdm.write(f"[RESUME] {filename} from byte {os.path.getsize(part_path)}")
+                mode = 'ab'
+            else:
+                tqdm.write(f"[START] Downloading {filename}...")
+                mode = 'wb'
+                # Remember the validators first, so an interrupted download can be resumed
+                state.set(filename, {**validators(response), 'complete': False})
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
                     f.write(chunk)
+            os.replace(part_path, filepath)
+            state.set(filename, {**state.get(filename), 'complete': True})
+            error = False
             tqdm.write(f"[SUCCESS] Downloaded {filename}")
             return True
         except requests.RequestException as e:
+            status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else None
+            if status is not None and status < 500 and status != 429:
+                # Client errors say nothing about server load
+                error = False
             if attempt < MAX_RETRIES - 1:
-                sleep_time = 2 ** attempt
-                tqdm.write(f"[RETRY] {filename} failed (attempt {attempt+1}), retrying in {sleep_time}s...")
-                time.sleep(sleep_time)
+                backoff = retry_after(response, attempt)
+                tqdm.write(f"[RETRY] {filename} failed (attempt {attempt+1}), retrying in {backoff}s...")
             else:
                 tqdm.write(f"[ERROR] Failed to download {filename} after {MAX_RETRIES} attempts: {e}")
                 return False
         except Exception as e:
             tqdm.write(f"[ERROR] Critical error for {filename}: {e}")
             return False
+        finally:
+            if response is not None:
+                response.close()
+            limiter.release(latency=latency, error=error)
+        if backoff is not None:
+            # Back off without holding a slot, the retry acquires a new one
+            time.sleep(backoff)
+    return False
 
-def main():
-    if not os.path.exists(LINKS_FILE):
-        print(f"Error: '{LINKS_FILE}' not found. Please run extract_links.py first.")
-        return
+def download_all(urls, download_dir=DOWNLOAD_DIR, session=None, limiter=None):
+    """
+    Download all URLs into download_dir and return the per-URL results.
+    Session and limiter can be passed in, e.g. to point the downloader at
+    a local test server.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    session = session or create_session()
+    limiter = limiter or AdaptiveLimiter()
+    state = DownloadState(download_dir)
 
-    if not os.path.exists(DOWNLOAD_DIR):
-        os.makedirs(DOWNLOAD_DIR)
+    # The limiter decides how many of the threads actually download at a time
+    with ThreadPoolExecutor(max_workers=limiter.maximum) as executor:
+        # tqdm.write allows printing while keeping the progress bar at the bottom
+        results = list(tqdm(
+            executor.map(lambda url: download_url(url, session, state, limiter, download_dir), urls),
+            total=len(urls), unit="file"
+        ))
+    state.save()
+    return results
 
-    with open(LINKS_FILE, 'r') as f:
-        urls = [line.strip() for line in f if line.strip()]
+def main():
+    worklist = load_worklist()
+    if worklist is not None:
+        # Sync mode: only fetch what the TOC diff reported, drop removed decisions
+        urls = worklist['added'] + worklist['changed']
+        for url in worklist['removed']:
+            filepath = os.path.join(DOWNLOAD_DIR, zip_name(url))
+            if os.path.exists(filepath):
+                os.remove(filepath)
+                tqdm.write(f"[REMOVED] {zip_name(url)}")
+    else:
+        if not os.path.exists(LINKS_FILE):
+            print(f"Error: '{LINKS_FILE}' not found. Please run extract_links.py first.")
+            return
+
+        with open(LINKS_FILE, 'r') as f:
+            urls = [line.strip() for line in f if line.strip()]
 
     print(f"Starting download of {len(urls)} files...")
-    
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # tqdm.write allows printing while keeping the progress bar at the bottom
-        list(tqdm(executor.map(download_url, urls), total=len(urls), unit="file"))
+    results = download_all(urls)
 
-    print(f"Finished. Check the '{DOWNLOAD_DIR}' folder.")
+    downloaded = sum(1 for r in results if r is True)
+    not_modified = sum(1 for r in results if r == "not_modified")
+    failed = sum(1 for r in results if r is False)
+    print(f"Finished. {downloaded} downloaded, {not_modified} not modified, {failed} failed. "
+          f"Check the '{DOWNLOAD_DIR}' folder.")
+    if failed:
+        # run.sh then keeps the TOC snapshot, so a sync lists them again
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
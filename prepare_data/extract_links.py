@@ -1,22 +1,40 @@
 import xml.etree.ElementTree as ET
 import sys
 import os
+import hashlib
+from email.utils import formatdate
 import requests
 from tqdm import tqdm
+from worklist import save_worklist
 
 def download_toc(url, filepath):
     if os.path.exists(filepath):
         print(f"File '{filepath}' already exists. Skipping download.")
         return
 
+    fetch_toc(url, filepath)
+
+def fetch_toc(url, filepath, if_modified_since=None):
+    """
+    Download the TOC to filepath. Returns False if the server reports it
+    unchanged since if_modified_since (a file whose mtime is used). The
+    file only appears once it is complete.
+    """
     print(f"Downloading {url} to {filepath}...")
+    headers = {}
+    if if_modified_since and os.path.exists(if_modified_since):
+        headers['If-Modified-Since'] = formatdate(os.path.getmtime(if_modified_since), usegmt=True)
     try:
-        response = requests.get(url, stream=True)
+        response = requests.get(url, stream=True, headers=headers)
+        if response.status_code == 304:
+            print("TOC not modified since the last sync.")
+            return False
         response.raise_for_status()
-        
+
         total_size = int(response.headers.get('content-length', 0))
-        
-        with open(filepath, 'wb') as f, tqdm(
+
+        part_file = filepath + ".part"
+        with open(part_file, 'wb') as f, tqdm(
             desc=filepath,
             total=total_size,
             unit='iB',
@@ -26,7 +44,9 @@ def download_toc(url, filepath):
             for chunk in response.iter_content(chunk_size=1024):
                 size = f.write(chunk)
                 bar.update(size)
+        os.replace(part_file, filepath)
         print(f"Successfully downloaded {filepath}")
+        return True
     except Exception as e:
         print(f"Error downloading {url}: {e}")
         sys.exit(1)
@@ -52,17 +72,89 @@ def extract_links(xml_file, output_file):
         print(f"Error parsing XML: {e}")
     except Exception as e:
         print(f"An error occurred: {e}")
-    
+
     print(f"Done. Extracted {count} links.")
 
+def read_toc_entries(xml_file):
+    """
+    Stream the TOC and return {link: signature} for every <item>. The
+    signature is the item's modification date if the TOC carries one,
+    otherwise a hash over all of its fields, so any change shows up.
+    """
+    entries = {}
+    if not os.path.exists(xml_file):
+        return entries
+    context = ET.iterparse(xml_file, events=('end',))
+    for event, elem in context:
+        if elem.tag != 'item':
+            continue
+        fields = {child.tag: (child.text or '').strip() for child in elem}
+        link = fields.get('link')
+        if link:
+            signature = fields.get('modified')
+            if not signature:
+                content = '\0'.join(f"{k}={v}" for k, v in sorted(fields.items()))
+                signature = hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+            entries[link] = signature
+        # Clear the element to free memory
+        elem.clear()
+    return entries
+
+def diff_toc(old_entries, new_entries):
+    added = sorted(link for link in new_entries if link not in old_entries)
+    changed = sorted(link for link in new_entries
+                     if link in old_entries and old_entries[link] != new_entries[link])
+    removed = sorted(link for link in old_entries if link not in new_entries)
+    return added, changed, removed
+
+def sync_toc(toc_url, toc_file, links_file, worklist_file):
+    """
+    Re-fetch the TOC, diff it against the snapshot of the last completed
+    run and write a work list of added, changed and removed decisions for
+    the following steps. The new TOC stays pending next to the snapshot
+    until commit_toc, so whatever a failed run left unprocessed is listed
+    again by the next sync.
+    """
+    new_file = toc_file + ".new"
+    # A TOC still pending from an unfinished run is only replaced by a newer one
+    fetch_toc(toc_url, new_file, if_modified_since=new_file if os.path.exists(new_file) else toc_file)
+    if os.path.exists(new_file):
+        try:
+            old_entries = read_toc_entries(toc_file)
+            new_entries = read_toc_entries(new_file)
+        except ET.ParseError as e:
+            print(f"Error parsing XML: {e}")
+            sys.exit(1)
+        added, changed, removed = diff_toc(old_entries, new_entries)
+    else:
+        added, changed, removed = [], [], []
+
+    save_worklist(worklist_file, added, changed, removed)
+    print(f"Sync: {len(added)} added, {len(changed)} changed, {len(removed)} removed. "
+          f"Work list written to {worklist_file}.")
+    # Keep the full link list in step with the work list
+    extract_links(new_file if os.path.exists(new_file) else toc_file, links_file)
+
+def commit_toc(toc_file):
+    """Make the TOC fetched by sync_toc the snapshot, once its work list has been processed."""
+    new_file = toc_file + ".new"
+    if os.path.exists(new_file):
+        os.replace(new_file, toc_file)
+        print(f"Synced TOC is now the snapshot in {toc_file}.")
+
 if __name__ == "__main__":
     toc_url = "https://www.rechtsprechung-im-internet.de/rii-toc.xml"
     toc_file = "data/rii-toc.xml"
     links_file = "data/links.txt"
-    
+    worklist_file = "data/worklist.json"
+
     # Ensure data directory exists
     os.makedirs("data", exist_ok=True)
-    
-    download_toc(toc_url, toc_file)
-    extract_links(toc_file, links_file)
 
+    if '--sync' in sys.argv[1:]:
+        sync_toc(toc_url, toc_file, links_file, worklist_file)
+    elif '--commit' in sys.argv[1:]:
+        commit_toc(toc_file)
+    else:
+        download_toc(toc_url, toc_file)
+        extract_links(toc_file, links_file)
@@ -1,6 +1,8 @@
 import os
+import shutil
 import zipfile
 from tqdm import tqdm
+from worklist import load_worklist, zip_name, folder_name
 
 DOWNLOAD_DIR = "data/downloads"
 EXTRACT_DIR = "data/extracted"
@@ -15,6 +17,17 @@ def extract_all_zips():
 
     zip_files = [f for f in os.listdir(DOWNLOAD_DIR) if f.lower().endswith('.zip')]
     
+    worklist = load_worklist()
+    refresh = set()
+    if worklist is not None:
+        # Sync mode: re-extract added/changed ZIPs, drop folders of removed ones
+        refresh = {zip_name(url) for url in worklist['added'] + worklist['changed']}
+        zip_files = [f for f in zip_files if f in refresh]
+        for url in worklist['removed']:
+            target_folder = os.path.join(EXTRACT_DIR, folder_name(url))
+            if os.path.exists(target_folder):
+                shutil.rmtree(target_folder)
+
     if not zip_files:
         print("No zip files found in downloads directory.")
         return
@@ -26,7 +39,10 @@ def extract_all_zips():
         folder_name = os.path.splitext(zip_filename)[0]
         target_folder = os.path.join(EXTRACT_DIR, folder_name)
         
-        if os.path.exists(target_folder):
+        if os.path.exists(target_folder) and zip_filename in refresh:
+            # Changed upstream, extract from scratch
+            shutil.rmtree(target_folder)
+        elif os.path.exists(target_folder):
             # print(f"Skipping {zip_filename}, folder exists.") # Optional: uncomment for verbose output
             continue
 
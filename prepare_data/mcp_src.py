@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Code shared with the MCP server is imported from mcp/src rather than
+# copied (the crawl image has it in /app/mcp_src). Importing this module
+# puts it at the front of sys.path; no module name exists on both sides.
+MCP_SRC_DIR = os.getenv("MCP_SRC_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mcp', 'src'))
+if MCP_SRC_DIR not in sys.path:
+    sys.path.insert(0, MCP_SRC_DIR)
@@ -1,14 +1,38 @@
 #!/bin/bash
 
-echo "Extracting links..."
-python extract_links.py
+if [ "$TOC_SYNC" = "1" ]; then
+    # Only process decisions added, changed or removed since the last run
+    echo "Syncing table of contents..."
+    python extract_links.py --sync || exit 1
+    export WORKLIST_FILE=data/worklist.json
+else
+    echo "Extracting links..."
+    python extract_links.py
+fi
+
+# Any failing step keeps the synced TOC pending (see below)
+status=0
 
 echo "Downloading files..."
-python download_files.py
+python download_files.py || status=1
 
-echo "Extracting ZIPs..."
-python extract_zips.py
+if [ "$PIPELINE_MODE" = "stream" ]; then
+    echo "Streaming ZIPs into OpenSearch..."
+    python stream_ingest.py || status=1
+else
+    echo "Extracting ZIPs..."
+    python extract_zips.py || status=1
 
-echo "Converting to Markdown..."
-python convert_all_to_md.py
+    echo "Converting to Markdown..."
+    python convert_all_to_md.py || status=1
+fi
 
+if [ "$TOC_SYNC" = "1" ]; then
+    if [ $status -eq 0 ]; then
+        # Everything processed: the synced TOC becomes the snapshot for the next diff
+        python extract_links.py --commit || exit 1
+    else
+        echo "Pipeline failed, keeping the previous TOC snapshot. The next sync lists these changes again."
+    fi
+fi
+exit $status
@@ -0,0 +1,158 @@
+import os
+import gzip
+import json
+import shutil
+import mcp_src  # Puts mcp/src on sys.path for the shards reader
+from shards import EXTENSIONS, find_shards, read_index, index_path, iter_lines
+
+# Sharded output of convert_all_to_md.py (OUTPUT_FORMAT=shards): instead of
+# a .md and a .json file per decision, the decisions are written as
+# compressed JSON Lines, SHARD_SIZE decisions per shard:
+#
+#   shards/decisions-00000.jsonl.zst  blocks of SHARD_BLOCK_SIZE lines, each
+#                                     block an independent zstd frame (or
+#                                     gzip member with SHARD_COMPRESSION=gzip)
+#   shards/decisions-00000.idx        one line per decision:
+#                                     path, doknr, block offset, block length, line in block
+#
+# A line is {"path": ..., "metadata": ..., "markdown": ...}, path being where
+# the .md file would have been (relative to MARKDOWN_DIR). Readers go
+# through the shards block by block; the index allows random access to a
+# single decision by decompressing only its block. The reading side is
+# mcp/src/shards.py, which this module uses as well.
+SHARD_DIR_NAME = 'shards'
+SHARD_SIZE = int(os.getenv('SHARD_SIZE', 10000))
+SHARD_BLOCK_SIZE = int(os.getenv('SHARD_BLOCK_SIZE', 64))
+SHARD_COMPRESSION = os.getenv('SHARD_COMPRESSION', 'zstd')
+SHARD_ZSTD_LEVEL = int(os.getenv('SHARD_ZSTD_LEVEL', 6))
+
+# File extension per SHARD_COMPRESSION, in the order of shards.EXTENSIONS
+COMPRESSION_EXTENSIONS = dict(zip(('zstd', 'gzip'), EXTENSIONS))
+
+def compressor(compression):
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd shards require the zstandard package (pip install zstandard), "
+                              "or use SHARD_COMPRESSION=gzip.")
+        return zstandard.ZstdCompressor(level=SHARD_ZSTD_LEVEL).compress
+    if compression == 'gzip':
+        return gzip.compress
+    raise ValueError(f"Unknown SHARD_COMPRESSION '{compression}', use 'zstd' or 'gzip'.")
+
+def encode_record(path, metadata, markdown):
+    record = {'path': path, 'metadata': metadata, 'markdown': markdown}
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class ShardFile:
+    """One shard being written; it only appears under its name once closed."""
+
+    def __init__(self, path, compression=SHARD_COMPRESSION):
+        self.path = path
+        self.compress = compressor(compression)
+        self.file = open(path + '.tmp', 'wb')
+        self.index = []
+        self.block = []
+        self.count = 0
+
+    def add(self, path, doknr, line):
+        # Tabs and newlines would break the index, xml_to_md never produces them
+        self.index.append([path, doknr or '', 0, 0, len(self.block)])
+        self.block.append(line)
+        self.count += 1
+        if len(self.block) >= SHARD_BLOCK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.block:
+            return
+        offset = self.file.tell()
+        self.file.write(self.compress(b'\n'.join(self.block) + b'\n'))
+        length = self.file.tell() - offset
+        for entry in self.index[-len(self.block):]:
+            entry[2], entry[3] = offset, length
+        self.block = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+        tmp_index = index_path(self.path) + '.tmp'
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            for entry in self.index:
+                f.write('\t'.join(str(value) for value in entry) + '\n')
+        os.replace(tmp_index, index_path(self.path))
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.path + '.tmp')
+
+class ShardWriter:
+    """
+    Write records into new shards of SHARD_SIZE decisions in directory,
+    numbered after the shards already there.
+    """
+
+    def __init__(self, directory, compression=SHARD_COMPRESSION):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compression = compression
+        numbers = [int(os.path.basename(path).split('-')[1].split('.')[0]) for path in find_shards(directory)]
+        self.number = max(numbers, default=-1) + 1
+        self.shard = None
+        self.written = 0
+
+    def add(self, path, metadata, markdown):
+        path = path.replace(os.sep, '/')
+        if self.shard is None:
+            name = f"decisions-{self.number:05d}{COMPRESSION_EXTENSIONS[self.compression]}"
+            self.shard = ShardFile(os.path.join(self.directory, name), self.compression)
+            self.number += 1
+        self.shard.add(path, metadata.get('doknr'), encode_record(path, metadata, markdown))
+        self.written += 1
+        if self.shard.count >= SHARD_SIZE:
+            self.close()
+
+    def close(self):
+        if self.shard is not None:
+            self.shard.close()
+            self.shard = None
+
+def drop_folders(directory, folders):
+    """
+    Rewrite the shards in directory without the decisions of the given
+    folders (first component of their path). Returns the number dropped.
+    """
+    folders = set(folders)
+    dropped = 0
+    for shard_path in find_shards(directory):
+        entries = read_index(shard_path)
+        if not any(path.split('/')[0] in folders for path, *_ in entries):
+            continue
+        compression = 'zstd' if shard_path.endswith(COMPRESSION_EXTENSIONS['zstd']) else 'gzip'
+        shard = ShardFile(shard_path, compression)
+        for path, doknr, line in iter_lines(shard_path):
+            if path.split('/')[0] in folders:
+                dropped += 1
+            else:
+                shard.add(path, doknr, line)
+        if shard.count:
+            shard.close()
+        else:
+            shard.discard()
+            os.remove(index_path(shard_path))
+            os.remove(shard_path)
+    return dropped
+
+def replace_directory(new_directory, directory):
+    """Swap a freshly written shard directory in for the old one."""
+    # Hidden like the new directory, the readers skip both
+    old_directory = os.path.join(os.path.dirname(directory), '.' + os.path.basename(directory) + '.old')
+    if os.path.exists(old_directory):
+        shutil.rmtree(old_directory)
+    if os.path.exists(directory):
+        os.rename(directory, old_directory)
+    os.rename(new_directory, directory)
+    if os.path.exists(old_directory):
+        shutil.rmtree(old_directory)
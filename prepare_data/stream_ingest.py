@@ -0,0 +1,351 @@
+import os
+import sys
+import json
+import queue
+import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from opensearchpy import OpenSearch, helpers
+from xml_to_md import convert_xml_bytes_to_md_text
+from worklist import load_worklist, zip_name
+import mcp_src  # Puts mcp/src on sys.path for the ingest code shared with the MCP server
+
+MARKDOWN_DIR = os.getenv("MARKDOWN_DIR", "../mcp/markdown")
+# The mcp/src modules write citations.graph and facets.json to MARKDOWN_DIR as well
+os.environ.setdefault("MARKDOWN_DIR", MARKDOWN_DIR)
+from embeddings import get_embedder
+import citations
+import ingest
+
+# Streams decisions from the downloaded ZIPs straight into OpenSearch, without
+# writing data/extracted/ or the Markdown/JSON files in between. Like
+# mcp/src/ingest.py it also indexes the passages of each decision and
+# updates the citation graph and the facets.
+
+DOWNLOAD_DIR = "data/downloads"
+# The DokNrs indexed from each ZIP with their passage count and citation
+# record (see citations.citation_record), to delete the decisions of
+# removed or changed ZIPs and to build the citation graph. Like the
+# manifest of mcp/src/ingest.py it belongs to one index generation. The
+# path is shared with ingest.update_citation_graph, which reads it.
+STREAM_MANIFEST_FILE = ingest.STREAM_MANIFEST_FILE
+# Using ProcessPoolExecutor for CPU-bound XML parsing tasks
+MAX_WORKERS = os.cpu_count() or 4
+# Conversions in flight per worker process
+MAX_PENDING_PER_WORKER = 4
+# Converted documents waiting for the bulk sender. Both limits apply
+# backpressure, so ZIP reading never runs far ahead of indexing.
+DOC_QUEUE_SIZE = int(os.getenv("DOC_QUEUE_SIZE", 2000))
+
+OPENSEARCH_HOST = os.environ.get('OPENSEARCH_HOST', 'localhost')
+OPENSEARCH_PORT = int(os.environ.get('OPENSEARCH_PORT', 9200))
+OPENSEARCH_USER = os.environ.get('OPENSEARCH_USER', 'admin')
+OPENSEARCH_PASSWORD = os.environ.get('OPENSEARCH_PASSWORD', 'ComplexPassword123!')
+# Alias maintained by mcp/src/ingest.py
+INDEX_NAME = 'court-decisions'
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 500))
+BULK_MAX_CHUNK_BYTES = int(os.environ.get('BULK_MAX_CHUNK_BYTES', 20 * 1024 * 1024))
+BULK_MAX_RETRIES = int(os.environ.get('BULK_MAX_RETRIES', 5))
+
+def get_opensearch_client():
+    return OpenSearch(
+        hosts=[{'host': OPENSEARCH_HOST, 'port': OPENSEARCH_PORT, 'scheme': 'https'}],
+        timeout=120,
+        http_compress=True,
+        http_auth=(OPENSEARCH_USER, OPENSEARCH_PASSWORD),
+        use_ssl=True,
+        verify_certs=False,
+        ssl_assert_hostname=False,
+        ssl_show_warn=False
+    )
+
+def load_manifest(index):
+    """Return {zip name: {doknr: entry}} of the given index, empty if there is none yet."""
+    if not os.path.exists(STREAM_MANIFEST_FILE):
+        return {}
+    try:
+        with open(STREAM_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read {STREAM_MANIFEST_FILE} ({e}), starting a new one.")
+        return {}
+    if data.get('index') != index:
+        print(f"Stream manifest belongs to index '{data.get('index')}', not '{index}', starting a new one.")
+        return {}
+    return data['zips']
+
+def save_manifest(manifest, index):
+    tmp_path = STREAM_MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'index': index, 'zips': manifest}, f, ensure_ascii=False)
+    os.replace(tmp_path, STREAM_MANIFEST_FILE)
+    print(f"Stream manifest with {len(manifest)} ZIPs written to {STREAM_MANIFEST_FILE}.")
+
+def get_index_layout(client):
+    mappings = client.indices.get_mapping(index=INDEX_NAME)
+    return next(iter(mappings.values()))['mappings'].get('_meta', {}).get('layout', 'standard')
+
+def get_passage_embedder(client, passage_index):
+    """Name of the embedder the passage index was built for, None if there is no passage index."""
+    if not client.indices.exists(index=passage_index):
+        return None
+    return client.indices.get_mapping(index=passage_index)[passage_index]['mappings'].get('_meta', {}).get('embedder')
+
+def list_zip_files():
+    return sorted(f for f in os.listdir(DOWNLOAD_DIR) if f.lower().endswith('.zip'))
+
+def iter_zip_members(worklist, read_zips):
+    """
+    Yield (ZIP name, member name, XML bytes) for every XML file inside the
+    downloaded ZIPs; read_zips collects the ZIPs read completely.
+    """
+    zip_files = list_zip_files()
+    if worklist is not None:
+        # Sync mode: only added and changed decisions (documents are upserted by DokNr)
+        wanted = {zip_name(url) for url in worklist['added'] + worklist['changed']}
+        zip_files = [f for f in zip_files if f in wanted]
+    print(f"Found {len(zip_files)} zip files.")
+    for zip_filename in zip_files:
+        zip_path = os.path.join(DOWNLOAD_DIR, zip_filename)
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                for info in zip_ref.infolist():
+                    if info.filename.lower().endswith('.xml'):
+                        yield zip_filename, f"{zip_filename}/{info.filename}", zip_ref.read(info)
+            read_zips.add(zip_filename)
+        except zipfile.BadZipFile:
+            print(f"Warning: '{zip_filename}' is not a valid zip file. Skipped.")
+        except Exception as e:
+            print(f"Error reading '{zip_filename}': {e}")
+
+def convert_member(item):
+    zip_filename, name, data, layout = item
+    try:
+        markdown_content, metadata = convert_xml_bytes_to_md_text(data)
+        doc = ingest.build_document(metadata, markdown_content, layout)
+        if not doc.get('doknr'):
+            return (zip_filename, doc, None, None), None
+        # Passages are embedded here, in the worker processes
+        return (zip_filename, doc, ingest.embed_passages(doc), citations.citation_record(metadata)), None
+    except Exception as e:
+        return (zip_filename, None, None, None), f"Error processing {name}: {e}"
+
+def convert_all(executor, layout, worklist, read_zips):
+    """
+    Convert ZIP members in the process pool, keeping a bounded window of
+    conversions in flight. Yields ((ZIP name, document, passages, citation
+    record), error) pairs.
+    """
+    pending = deque()
+    for zip_filename, name, data in iter_zip_members(worklist, read_zips):
+        pending.append(executor.submit(convert_member, (zip_filename, name, data, layout)))
+        if len(pending) >= MAX_WORKERS * MAX_PENDING_PER_WORKER:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def send_documents(client, docs, results, passage_index, previous, indexed, attempted):
+    """
+    Bulk index the converted items taken from the docs queue until None
+    arrives, and their passages into passage_index (previous maps DokNrs to
+    their passage count so far). indexed collects per ZIP the manifest
+    entries of the decisions indexed successfully, attempted all DokNrs sent.
+    """
+    sent = {}
+
+    def actions():
+        while True:
+            item = docs.get()
+            if item is None:
+                return
+            zip_filename, doc, passages, citation = item
+            action = {"_index": INDEX_NAME, "_source": doc}
+            # Use DokNr as ID if available to avoid duplicates
+            if not doc.get('doknr'):
+                yield action
+                continue
+            doknr = doc['doknr']
+            action["_id"] = doknr
+            sent[doknr] = (zip_filename, {'passages': len(passages), 'citation': citation})
+            attempted.add(doknr)
+            yield action
+            for _, passage_action in ingest.passage_actions(doknr, passages, passage_index, previous.get(doknr, 0)):
+                yield passage_action
+
+    for ok, item in helpers.streaming_bulk(
+        client, actions(),
+        chunk_size=BULK_CHUNK_SIZE,
+        max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+        max_retries=BULK_MAX_RETRIES,
+        raise_on_error=False,
+        raise_on_exception=False
+    ):
+        op, info = next(iter(item.items()))
+        if info.get('_index') == passage_index:
+            # Leftover passages of a longer previous version may be gone already
+            if ok or (op == 'delete' and info.get('status') == 404):
+                results['passages'] += 1
+            else:
+                results['passages_failed'] += 1
+                tqdm.write(f"Failed to {op} passage {info.get('_id')}: {info.get('error')}")
+            continue
+        sent_item = sent.pop(info.get('_id'), None)
+        if ok:
+            results['success'] += 1
+            if sent_item is not None:
+                zip_filename, entry = sent_item
+                indexed.setdefault(zip_filename, {})[info['_id']] = entry
+        else:
+            results['failed'] += 1
+            tqdm.write(f"Failed to index {info.get('_id')}: {info.get('error')}")
+
+def update_manifest(client, manifest, zips, passage_index, indexed, attempted, incomplete, results):
+    """
+    Bring the manifest entries of the given ZIPs (read in this run or
+    removed) up to date and delete the decisions they no longer provide,
+    except from the incomplete ZIPs (members that failed to convert).
+    Returns the number of decisions deleted.
+    """
+    indexed_ids = {doknr for entries in indexed.values() for doknr in entries}
+    stale = {}
+    for zip_filename in zips:
+        previous = manifest.pop(zip_filename, {})
+        # Failed to index this time: the previous version is still in the index
+        entries = {doknr: entry for doknr, entry in previous.items()
+                   if doknr in attempted and doknr not in indexed_ids}
+        if zip_filename in incomplete:
+            entries.update((doknr, entry) for doknr, entry in previous.items() if doknr not in attempted)
+        entries.update(indexed.get(zip_filename, {}))
+        if entries:
+            manifest[zip_filename] = entries
+        if zip_filename in incomplete:
+            continue
+        # Decisions that moved to another ZIP were sent again and stay
+        stale.update((doknr, (zip_filename, entry)) for doknr, entry in previous.items() if doknr not in attempted)
+
+    def actions():
+        for doknr, (_, entry) in stale.items():
+            yield {"_op_type": "delete", "_index": INDEX_NAME, "_id": doknr}
+            for _, action in ingest.delete_passage_actions(doknr, passage_index, 0, entry.get('passages', 0)):
+                yield action
+
+    deleted = 0
+    for ok, item in helpers.streaming_bulk(client, actions(), chunk_size=BULK_CHUNK_SIZE, max_retries=BULK_MAX_RETRIES,
+                                           raise_on_error=False, raise_on_exception=False):
+        info = item['delete']
+        # Deleting a document or passage that is already gone is fine
+        if info.get('_index') == passage_index:
+            if ok or info.get('status') == 404:
+                results['passages'] += 1
+            else:
+                results['passages_failed'] += 1
+                tqdm.write(f"Failed to delete passage {info.get('_id')}: {info.get('error')}")
+        elif ok or info.get('status') == 404:
+            deleted += 1
+        else:
+            results['failed'] += 1
+            tqdm.write(f"Failed to delete {info.get('_id')}: {info.get('error')}")
+            # Kept, so the next run tries again
+            zip_filename, entry = stale[info['_id']]
+            manifest.setdefault(zip_filename, {})[info['_id']] = entry
+    return deleted
+
+def main():
+    if not os.path.exists(DOWNLOAD_DIR):
+        print(f"Error: '{DOWNLOAD_DIR}' directory not found.")
+        return
+
+    client = get_opensearch_client()
+    if not client.indices.exists(index=INDEX_NAME):
+        # Writing to a missing alias would create an index with dynamic mappings
+        print(f"Error: Index '{INDEX_NAME}' not found. Run mcp/src/ingest.py once to create it.")
+        sys.exit(1)
+
+    live_index = ingest.get_live_index(client)
+    passage_index = ingest.passage_index_for(live_index)
+    embedder = get_embedder().name
+    if get_passage_embedder(client, passage_index) != embedder:
+        # ingest.py builds a new generation in this case, passages of another
+        # embedder cannot be mixed into the existing one
+        print(f"Error: Passage index '{passage_index}' is missing or not built for the embedder {embedder}. "
+              f"Run mcp/src/ingest.py with the same EMBEDDER settings first.")
+        sys.exit(1)
+    manifest = load_manifest(live_index)
+    previous = {doknr: entry.get('passages', 0) for entries in manifest.values() for doknr, entry in entries.items()}
+    worklist = load_worklist()
+    if worklist is not None:
+        removed = {zip_name(url) for url in worklist['removed']}
+    else:
+        # Full run: ZIPs no longer downloaded are gone
+        removed = set(manifest) - set(list_zip_files())
+    for zip_filename in sorted(removed - set(manifest)):
+        print(f"Warning: No decisions of '{zip_filename}' recorded in {STREAM_MANIFEST_FILE}, cannot delete them.")
+
+    layout = get_index_layout(client)
+    docs = queue.Queue(maxsize=DOC_QUEUE_SIZE)
+    results = {'success': 0, 'failed': 0, 'passages': 0, 'passages_failed': 0}
+    indexed = {}
+    attempted = set()
+    sender_errors = []
+
+    def run_sender():
+        try:
+            send_documents(client, docs, results, passage_index, previous, indexed, attempted)
+        except Exception as e:
+            sender_errors.append(e)
+
+    def put(item):
+        # A plain put would block forever once the sender has died on a full queue
+        while True:
+            try:
+                docs.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not sender.is_alive():
+                    raise RuntimeError("The bulk sender has stopped") from (sender_errors[0] if sender_errors else None)
+
+    sender = threading.Thread(target=run_sender, daemon=True)
+    sender.start()
+
+    errors = []
+    read_zips = set()
+    incomplete = set()
+    print(f"Starting streaming conversion with {MAX_WORKERS} processes...")
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for item, error in tqdm(convert_all(executor, layout, worklist, read_zips), unit="doc"):
+            if error:
+                errors.append(error)
+                incomplete.add(item[0])
+                continue
+            put(item)
+    put(None)
+    sender.join()
+    if sender_errors:
+        raise sender_errors[0]
+
+    deleted = update_manifest(client, manifest, read_zips | removed, passage_index, indexed, attempted, incomplete, results)
+    save_manifest(manifest, live_index)
+
+    print(f"Indexing complete. Success: {results['success']}, Deleted: {deleted}, Failed: {results['failed']}")
+    print(f"Passages: {results['passages']} indexed/deleted, {results['passages_failed']} failed")
+
+    stats = {'changed': results['success'], 'removed': deleted}
+    if stats['changed'] or stats['removed']:
+        # Flushes the search cache of the server
+        ingest.bump_revision(client, live_index)
+    # Merges the decisions of both manifests
+    ingest.update_citation_graph(stats, live_index)
+    ingest.update_facets(stats, client)
+    if errors:
+        print(f"\n{len(errors)} conversion errors occurred:")
+        for err in errors[:10]: # Print first 10 errors
+            print(err)
+        if len(errors) > 10:
+            print("...")
+    if results['failed'] or results['passages_failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+import json
+from urllib.parse import urlparse
+
+# Work list written by `extract_links.py --sync`. If WORKLIST_FILE is set,
+# the download, extract and convert steps only touch the decisions listed
+# there instead of the whole corpus.
+WORKLIST_FILE = os.getenv("WORKLIST_FILE")
+
+def load_worklist():
+    """
+    Return the work list ({'added': [...], 'changed': [...], 'removed': [...]},
+    each a list of TOC links) or None if the pipeline runs on everything.
+    """
+    if not WORKLIST_FILE:
+        return None
+    if not os.path.exists(WORKLIST_FILE):
+        print(f"Error: Work list '{WORKLIST_FILE}' not found. Please run extract_links.py --sync first.")
+        raise SystemExit(1)
+    with open(WORKLIST_FILE, 'r') as f:
+        return json.load(f)
+
+def save_worklist(path, added, changed, removed):
+    with open(path, 'w') as f:
+        json.dump({'added': added, 'changed': changed, 'removed': removed}, f, indent=2)
+
+def zip_name(url):
+    # Same naming as download_files.download_url
+    return os.path.basename(urlparse(url).path)
+
+def folder_name(url):
+    # Same naming as extract_zips: one folder per ZIP
+    return os.path.splitext(zip_name(url))[0]
@@ -3,24 +3,68 @@ import sys
 import re
 import os
 
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+# XML parser backend: 'etree' (standard library) or 'lxml' (optional dependency)
+XML_BACKEND = os.getenv("XML_BACKEND", "etree")
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Randnummer as rendered by render_dl, at the start of a line
+RANDNUMMER_RE = re.compile(r'^\*\*(\d+)\*\* ', re.MULTILINE)
+
+# Citations of other decisions. An Aktenzeichen counts as citation when it
+# follows a dash or "Az." as in "BGH, Urteil vom 14. Januar 2010 - IX ZR 78/09".
+# The citation patterns start without \b, which would keep the regex engine
+# from skipping ahead to the possible first characters.
+CITED_AZ_RE = re.compile(
+    r'(?:[-–]|Az\.?)\s*'
+    r'((?:[IVX]{1,5}[a-z]?|\d{1,2}|B\s?\d{1,2})\s+[A-Z][A-Za-z]{0,4}(?:\s*\([a-z]+\))?\s+\d{1,5}[/.]\d{2}'
+    r'(?:\s+[A-Z]{1,2}\b)?)'
+)
+# Court named shortly before a cited Aktenzeichen
+CITED_COURT_RE = re.compile(r'\b(BVerfG|BGH|BVerwG|BFH|BAG|BSG|BPatG)\b|\b(Senat)')
+CITED_COURT_WINDOW = 80
+# Official reports, e.g. "BGHZ 154, 1" or "BVerfGE 100, 313"
+CITED_REPORTS = ('BVerfGE', 'BGHZ', 'BGHSt', 'BVerwGE', 'BFHE', 'BAGE', 'BSGE')
+CITED_REPORT_RE = re.compile(r'(' + '|'.join(CITED_REPORTS) + r')\s+(\d{1,3}),\s*(\d{1,4})\b')
+CITED_ECLI_RE = re.compile(r'ECLI:[A-Z]{2}:[A-Z0-9.]+:\d{4}:[A-Z0-9.]*[A-Z0-9]')
+
+BOLD_TAGS = frozenset(('b', 'strong'))
+ITALIC_TAGS = frozenset(('i', 'em'))
+LIST_TAGS = frozenset(('ul', 'ol'))
+
 def clean_text(text):
     if text:
         # Replace newlines and multiple spaces with a single space
-        return re.sub(r'\s+', ' ', text)
+        return WHITESPACE_RE.sub(' ', text)
     return ""
 
 def parse_element_to_markdown(element, context=None):
     """
     Recursively converts an XML element and its children to Markdown.
     """
-    if context is None:
-        context = {}
-    
-    md = ""
-    
+    out = []
+    render_element(element, out)
+    return "".join(out)
+
+def render_stripped(element):
+    # Blocks whose content is stripped need their own buffer
+    out = []
+    render_element(element, out)
+    return "".join(out).strip()
+
+def render_element(element, out):
+    """
+    Appends the Markdown for the content of element to the list out.
+    All recursion writes into the same buffer, so the output is joined
+    exactly once instead of being re-copied on every level.
+    """
     # Handle text content of the current element (before children)
     if element.text:
-        md += clean_text(element.text)
+        out.append(clean_text(element.text))
         
     for child in element:
         tag = child.tag
@@ -28,77 +72,153 @@ def parse_element_to_markdown(element, context=None):
         # Dispatch based on tag
         if tag == 'p':
             # Add newlines before paragraphs
-            md += "\n\n" + parse_element_to_markdown(child, context).strip()
-        elif tag in ['b', 'strong']:
-            md += "**" + parse_element_to_markdown(child, context) + "**"
-        elif tag in ['i', 'em']:
-            md += "*" + parse_element_to_markdown(child, context) + "*"
+            out.append("\n\n")
+            out.append(render_stripped(child))
+        elif tag in BOLD_TAGS:
+            out.append("**")
+            render_element(child, out)
+            out.append("**")
+        elif tag in ITALIC_TAGS:
+            out.append("*")
+            render_element(child, out)
+            out.append("*")
         elif tag == 'u' or (tag == 'span' and 'underline' in child.get('style', '')):
-             md += "<u>" + parse_element_to_markdown(child, context) + "</u>"
+            out.append("<u>")
+            render_element(child, out)
+            out.append("</u>")
         elif tag == 'br':
-            md += "  \n"
+            out.append("  \n")
         elif tag == 'table':
-            md += "\n\n" + parse_table(child) + "\n\n"
+            out.append("\n\n")
+            out.append(parse_table(child))
+            out.append("\n\n")
         elif tag == 'dl':
-             md += parse_dl(child, context)
+            render_dl(child, out)
         elif tag == 'a':
-             text_content = parse_element_to_markdown(child, context)
-             href = child.get('href')
-             if href:
-                 md += f"[{text_content}]({href})"
-             else:
-                 # Just an anchor name or similar
-                 md += text_content
-        elif tag == 'div':
-             md += parse_element_to_markdown(child, context)
-        elif tag in ['ul', 'ol']:
+            href = child.get('href')
+            if href:
+                out.append("[")
+                render_element(child, out)
+                out.append(f"]({href})")
+            else:
+                # Just an anchor name or similar
+                render_element(child, out)
+        elif tag in LIST_TAGS:
             # Basic list support if encountered
-            md += "\n" + parse_list(child, context) + "\n"
+            out.append("\n")
+            out.append(parse_list(child))
+            out.append("\n")
         elif tag == 'li':
-             md += "\n- " + parse_element_to_markdown(child, context)
+            out.append("\n- ")
+            render_element(child, out)
         else:
-             # Fallback: process children transparently
-             md += parse_element_to_markdown(child, context)
+            # div and everything else: process children transparently
+            render_element(child, out)
              
         # Handle tail text (text after the child tag but before the next child or end of parent)
         if child.tail:
-            md += clean_text(child.tail)
-            
-    return md
+            out.append(clean_text(child.tail))
 
-def parse_dl(dl, context):
+def parse_dl(dl, context=None):
     """
     Parses <dl> lists, specifically targeting the margin number structure 
     (dt -> number, dd -> content)
     """
-    md = ""
+    out = []
+    render_dl(dl, out)
+    return "".join(out)
+
+def render_dl(dl, out):
     # We iterate manually to handle the dt/dd relationship
     for child in dl:
         if child.tag == 'dt':
-            dt_text = parse_element_to_markdown(child, context).strip()
+            dt_text = render_stripped(child)
             if dt_text:
                 # Margin number (Randnummer)
-                md += f"\n\n**{dt_text}** "
+                out.append(f"\n\n**{dt_text}** ")
             else:
                 # Empty dt, just ensure spacing
-                md += "\n\n"
+                out.append("\n\n")
         elif child.tag == 'dd':
             # Definition/Content
-            content = parse_element_to_markdown(child, context).strip()
-            md += content
-    return md
+            out.append(render_stripped(child))
+
+def randnummer_offsets(content):
+    """
+    Return [[rn, start, end], ...] character offsets of the Randnummern in a
+    section, so readers can slice an Rn range without scanning the text.
+    Nested lists restart their numbering; only increasing numbers count as
+    Randnummern of the section itself. Each one ends where the next starts.
+    """
+    offsets = []
+    last = 0
+    for match in RANDNUMMER_RE.finditer(content):
+        rn = int(match.group(1))
+        if rn > last:
+            if offsets:
+                offsets[-1][2] = match.start()
+            offsets.append([rn, match.start(), len(content)])
+            last = rn
+    return offsets
+
+def cited_court(text, position, own_court):
+    """The court named last before position; 'Senat' (Senatsurteil etc.) means the citing court."""
+    court = None
+    for match in CITED_COURT_RE.finditer(text, max(0, position - CITED_COURT_WINDOW), position):
+        court = match.group(1) or own_court
+    return court
+
+def extract_citations(content, own_court):
+    """
+    Return the decisions cited in a section as a list of {'az', 'gericht'},
+    {'ecli'} or {'fundstelle'} dicts in order of appearance. ingest.py
+    resolves them to DokNrs for the citation graph.
+    """
+    # Emphasis markers would break up references like "*BGHZ* 154, 1"
+    text = content.replace('*', '')
+    found = []
+    for match in CITED_AZ_RE.finditer(text):
+        citation = {'az': WHITESPACE_RE.sub(' ', match.group(1))}
+        court = cited_court(text, match.start(), own_court)
+        if court:
+            citation['gericht'] = court
+        found.append((match.start(), citation))
+    # Most sections cite no ECLI, skip that scan with a substring check. The
+    # report names need none: scanning for the literal alternatives is
+    # faster than seven substring checks.
+    if 'ECLI:' in text:
+        for match in CITED_ECLI_RE.finditer(text):
+            found.append((match.start(), {'ecli': match.group(0)}))
+    for match in CITED_REPORT_RE.finditer(text):
+        found.append((match.start(), {'fundstelle': f"{match.group(1)} {match.group(2)}, {match.group(3)}"}))
+    found.sort(key=lambda item: item[0])
+    return [citation for _, citation in found]
 
-def parse_list(list_elem, context):
-    md = ""
+def parse_list(list_elem, context=None):
+    out = []
     is_ordered = list_elem.tag == 'ol'
     for i, child in enumerate(list_elem):
         if child.tag == 'li':
-            item_content = parse_element_to_markdown(child, context).strip()
+            item_content = render_stripped(child)
             if is_ordered:
-                md += f"{i+1}. {item_content}\n"
+                out.append(f"{i+1}. {item_content}\n")
             else:
-                md += f"- {item_content}\n"
-    return md
+                out.append(f"- {item_content}\n")
+    return "".join(out)
+
+def row_cells(tr):
+    # All td cells followed by all th cells (document order within each),
+    # collected in a single pass over the row
+    tds = []
+    ths = []
+    for cell in tr.iter():
+        if cell is tr:
+            continue
+        if cell.tag == 'td':
+            tds.append(cell)
+        elif cell.tag == 'th':
+            ths.append(cell)
+    return tds + ths
 
 def parse_table(table):
     """
@@ -113,53 +233,33 @@ def parse_table(table):
     
     # First pass: Extract data into a grid
     for tr in rows:
-        row_cells = []
-        for cell in tr.findall('.//td') + tr.findall('.//th'):
-            cell_content = parse_element_to_markdown(cell).strip()
+        cells = []
+        for cell in row_cells(tr):
             # Replace newlines in cells with <br> or space to keep table structure
-            cell_content = cell_content.replace('\n', '<br>')
-            row_cells.append(cell_content)
+            cells.append(render_stripped(cell).replace('\n', '<br>'))
             
             # Simple colspan handling: add empty cells
             colspan = int(cell.get('colspan', 1))
-            for _ in range(colspan - 1):
-                row_cells.append("")
+            cells.extend([""] * (colspan - 1))
                 
-        grid.append(row_cells)
-        if len(row_cells) > max_cols:
-            max_cols = len(row_cells)
+        grid.append(cells)
+        if len(cells) > max_cols:
+            max_cols = len(cells)
             
-    if not grid:
-        return ""
-
-    
     # Second pass: Remove empty columns
-    if grid:
-        num_cols = len(grid[0])
-        cols_to_keep = []
-        for c in range(num_cols):
-            # Check if column is empty in all rows
-            if any(row[c].strip() for row in grid):
-                cols_to_keep.append(c)
-        
-        if cols_to_keep:
-            new_grid = []
-            for row in grid:
-                new_grid.append([row[c] for c in cols_to_keep])
-            grid = new_grid
-            max_cols = len(cols_to_keep)
-        else:
-            # All empty?
-            return ""
+    num_cols = len(grid[0])
+    cols_to_keep = [c for c in range(num_cols) if any(row[c].strip() for row in grid)]
+    if not cols_to_keep:
+        # All empty?
+        return ""
+    grid = [[row[c] for c in cols_to_keep] for row in grid]
+    max_cols = len(cols_to_keep)
 
     # Third pass: Construct Markdown lines
     lines = []
     
     # 1. Header Row
     header = grid[0]
-    # Pad header
-    while len(header) < max_cols:
-        header.append("")
     lines.append("| " + " | ".join(header) + " |")
     
     # 2. Separator Row
@@ -167,22 +267,60 @@ def parse_table(table):
     
     # 3. Data Rows
     for row in grid[1:]:
-        while len(row) < max_cols:
-            row.append("")
         lines.append("| " + " | ".join(row) + " |")
         
     return "\n".join(lines)
 
-def convert_xml_to_md_text(file_path):
+def get_lxml_parser():
+    if lxml_etree is None:
+        raise ImportError("XML_BACKEND 'lxml' requires the lxml package (pip install lxml).")
+    # Dropping comments and processing instructions makes lxml merge the
+    # surrounding text exactly like xml.etree does
+    return lxml_etree.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+
+def convert_xml_to_md_text(file_path, backend=None):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File '{file_path}' not found.")
         
+    backend = backend or XML_BACKEND
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
+        if backend == 'lxml':
+            parser = get_lxml_parser()
+            root = lxml_etree.parse(file_path, parser).getroot()
+        else:
+            tree = ET.parse(file_path)
+            root = tree.getroot()
     except ET.ParseError as e:
         raise ValueError(f"Error parsing XML: {e}")
+    except Exception as e:
+        if lxml_etree is not None and isinstance(e, lxml_etree.XMLSyntaxError):
+            raise ValueError(f"Error parsing XML: {e}")
+        raise
         
+    return convert_root_to_md_text(root)
+
+def convert_xml_bytes_to_md_text(data, backend=None):
+    """
+    Same as convert_xml_to_md_text, but for XML already in memory
+    (e.g. read straight from a ZIP archive).
+    """
+    backend = backend or XML_BACKEND
+    try:
+        if backend == 'lxml':
+            parser = get_lxml_parser()
+            root = lxml_etree.fromstring(data, parser)
+        else:
+            root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise ValueError(f"Error parsing XML: {e}")
+    except Exception as e:
+        if lxml_etree is not None and isinstance(e, lxml_etree.XMLSyntaxError):
+            raise ValueError(f"Error parsing XML: {e}")
+        raise
+
+    return convert_root_to_md_text(root)
+
+def convert_root_to_md_text(root):
     md_output = []
 
     # --- Metadata Extraction ---
@@ -243,6 +381,8 @@ def convert_xml_to_md_text(file_path):
         ('sonstlt', 'Sonstlt?')
     ]
     
+    # Citation dicts keyed by their items, deduplicated in order of appearance
+    citations = {}
     for tag_name, display_name in sections:
         node = root.find(tag_name)
         if node is not None:
@@ -256,6 +396,14 @@ def convert_xml_to_md_text(file_path):
                 # Add to metadata/JSON output
                 # Use the tag name as key for cleaner JSON structure
                 metadata[tag_name] = content
+                offsets = randnummer_offsets(content)
+                if offsets:
+                    metadata.setdefault('randnummern', {})[tag_name] = offsets
+                for citation in extract_citations(content, gertyp):
+                    citations.setdefault(tuple(citation.items()), citation)
+
+    if citations:
+        metadata['zitate'] = list(citations.values())
     
     return "\n".join(md_output), metadata
 